@@ -0,0 +1,1303 @@
+#!/usr/bin/env python3
+"""ReKo AI 性能基准测试
+
+用法:
+    python scripts/benchmark.py memory [--docs N] [--doc-len N] [--vocab N]
+    python scripts/benchmark.py predict [--docs N] [--doc-len N] [--vocab N] [--queries N]
+    python scripts/benchmark.py reply [--docs N] [--doc-len N] [--vocab N] [--queries N]
+    python scripts/benchmark.py incremental [--docs N] [--doc-len N] [--vocab N] [--batch N]
+    python scripts/benchmark.py parallel [--docs N] [--doc-len N] [--vocab N] [--workers 1,2,4,8,16]
+    python scripts/benchmark.py startup [--docs N] [--doc-len N] [--vocab N]
+    python scripts/benchmark.py preprocess [--repeat N] [--workers 1,2,4]
+    python scripts/benchmark.py clean [--repeat N]
+    python scripts/benchmark.py stream [--docs N] [--doc-len N] [--vocab N] [--chunk-size N] [--batch-tokens N]
+    python scripts/benchmark.py cache [--docs N] [--doc-len N] [--vocab N] [--queries N] [--size N]
+    python scripts/benchmark.py orders [--docs N] [--doc-len N] [--vocab N] [--queries N] [--orders 2,3,4,5,6]
+    python scripts/benchmark.py smoothing [--docs N] [--doc-len N] [--vocab N] [--queries N] [--order N]
+    python scripts/benchmark.py server [--docs N] [--doc-len N] [--vocab N] [--clients N] [--requests N] [--batch 1,32]
+    python scripts/benchmark.py concurrency [--docs N] [--doc-len N] [--vocab N] [--readers N] [--rebuilds N]
+    python scripts/benchmark.py replies [--docs N] [--doc-len N] [--vocab N] [--queries N] [--batch 1,8,64,256,1024]
+    python scripts/benchmark.py feedback [--docs N] [--doc-len N] [--vocab N] [--replies N] [--ratings N]
+    python scripts/benchmark.py feedbacklog [--docs N] [--doc-len N] [--vocab N] [--replies N] [--ratings N]
+    python scripts/benchmark.py policy [--docs N] [--doc-len N] [--vocab N] [--calls N] [--sizes 5,20,100,1000]
+    python scripts/benchmark.py ui [--docs N] [--doc-len N] [--vocab N] [--messages N] [--max-len N] [--frame-ms N]
+    python scripts/benchmark.py chart [--points N] [--capacity N] [--fps N] [--rate N]
+    python scripts/benchmark.py launch [--repeat N] [--top N]
+    python scripts/benchmark.py tokenize [--repeat N]
+    python scripts/benchmark.py reload [--docs N] [--doc-len N] [--vocab N]
+
+合成语料以空格分词，除 tokenize 外的子命令都使用按空白切分的分词器（analysis.tokenizer=whitespace）。
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import queue
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import analyzer as analyzer_module
+from src.core.analyzer import TextAnalyzer
+from src.core.cache import LRUCache
+from src.core.smoothing import build_scorer
+from src.data.preprocessor import TextPreprocessor
+from src.data.manifest import DocumentManifest
+from src.data.synthetic import synthetic_corpus
+from src.data.tokenizer import JiebaTokenizer, WhitespaceTokenizer
+from src.server import InferenceServer
+from src.utils.config import set_config
+from src.utils.file_utils import FileUtils
+
+import numpy as np
+
+
+def legacy_counts(texts):
+    """按旧版 dict-of-Counter 结构统计n-gram，作为对照"""
+    bigram_counts = defaultdict(Counter)
+    trigram_counts = defaultdict(Counter)
+    word_counts = Counter()
+    for text in texts:
+        words = text.split()
+        word_counts.update(words)
+        for i in range(len(words) - 1):
+            bigram_counts[words[i]][words[i + 1]] += 1
+        for i in range(len(words) - 2):
+            trigram_counts[(words[i], words[i + 1])][words[i + 2]] += 1
+    return bigram_counts, trigram_counts, word_counts
+
+
+def measure(func, *args):
+    """返回 (结果, 耗时秒, 常驻内存字节, 峰值内存字节)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current, peak
+
+
+def bench_memory(args):
+    """对比旧版字典结构和整数ID紧凑存储的内存占用"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    print(f"语料: {args.docs} 篇文档, 每篇 {args.doc_len} 词, 词表 {args.vocab}")
+
+    _, elapsed, current, peak = measure(legacy_counts, texts)
+    print(f"{'dict-of-Counter':<18} 构建 {elapsed:7.2f}s  常驻 {current / 2**20:9.1f} MB  峰值 {peak / 2**20:9.1f} MB")
+    gc.collect()
+
+    def build_store():
+        analyzer = TextAnalyzer()
+        analyzer.load_corpus(texts)
+        return analyzer
+
+    analyzer, elapsed, current, peak = measure(build_store)
+    print(f"{'NgramStore':<18} 构建 {elapsed:7.2f}s  常驻 {current / 2**20:9.1f} MB  峰值 {peak / 2**20:9.1f} MB")
+    print(f"NgramStore 数组占用 {analyzer.store.nbytes / 2**20:.1f} MB, 统计: {analyzer.get_stats()}")
+
+
+def legacy_predict(bigram_counts, trigram_counts, word_counts, context, k=5):
+    """旧版 predict_next：每次调用都对后继Counter执行 most_common"""
+    words = context.split()
+    if len(words) >= 2:
+        key = (words[-2], words[-1])
+        if key in trigram_counts and trigram_counts[key]:
+            return [w for w, _ in trigram_counts[key].most_common(k)]
+    if words and words[-1] in bigram_counts and bigram_counts[words[-1]]:
+        return [w for w, _ in bigram_counts[words[-1]].most_common(k)]
+    return [w for w, _ in word_counts.most_common(k)]
+
+
+def time_calls(func, contexts):
+    """返回逐次调用的平均延迟（微秒）"""
+    start = time.perf_counter()
+    for context in contexts:
+        func(context)
+    return (time.perf_counter() - start) / len(contexts) * 1e6
+
+
+def bench_predict(args):
+    """对比 most_common 扫描与预计算top-k表的 predict_next 延迟"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    rng = random.Random(1)
+    contexts = []
+    for _ in range(args.queries):
+        words = rng.choice(texts).split()
+        i = rng.randrange(len(words) - 2)
+        contexts.append(" ".join(words[i:i + rng.choice([1, 2])]))
+    # 高频“枢纽词”上下文的后继列表最长
+    hubs = ["w0", "w1", "w0 w1", "w1 w0"] * (args.queries // 4)
+
+    bigram_counts, trigram_counts, word_counts = legacy_counts(texts)
+    analyzer = TextAnalyzer()
+    start = time.perf_counter()
+    analyzer.load_corpus(texts)
+    print(f"构建耗时(含top-k表): {time.perf_counter() - start:.2f}s, top_k={analyzer.top_k}")
+
+    legacy = lambda c: legacy_predict(bigram_counts, trigram_counts, word_counts, c, analyzer.top_k)
+    for name, queries in (("随机上下文", contexts), ("枢纽词上下文", hubs)):
+        print(f"[{name}] {len(queries)} 次查询")
+        for label, func in (("most_common", legacy), ("top-k表", analyzer.predict_next)):
+            cold = time_calls(func, queries)
+            warm = time_calls(func, queries)
+            print(f"  {label:<12} 冷 {cold:8.1f} us/次  热 {warm:8.1f} us/次")
+
+
+def _summed_probability(table, row, word_id):
+    """旧版做法：每次查询都对整行计数求和"""
+    start, end = table.offsets[row], table.offsets[row + 1]
+    total = int(table.counts[start:end].sum())
+    return table.count(row, word_id) / total if total > 0 else 0.0
+
+
+def _legacy_action_values(model, rewards, state, actions, keys):
+    """旧版做法：逐个候选词查表并对整行求和"""
+    store = model.store
+    vocab = store.vocab
+    words = state.split()
+    table, row = None, -1
+    if words:
+        table, row = store.find_row([vocab.lookup(w) for w in words[-(store.order - 1):]])
+    values = []
+    for act, key in zip(actions, keys):
+        base_val = _summed_probability(table, row, vocab.lookup(act)) if row >= 0 else 0
+        values.append(base_val * (1 + rewards.get(key, 0)))
+    return np.array(values)
+
+
+def bench_reply(args):
+    """对比逐词求和与向量化打分时 generate_reply 的生成速度"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    # 关闭预测缓存和平滑，只比较原始频率的计算方式
+    analyzer.cache = LRUCache(0)
+    analyzer.smoothing = "none"
+    rng = random.Random(2)
+    queries = [" ".join(rng.choice(texts).split()[:2]) for _ in range(args.queries)]
+
+    def run():
+        random.seed(0)
+        analyzer.epsilon = 0.1
+        tokens = 0
+        start = time.perf_counter()
+        for query in queries:
+            tokens += len(analyzer.generate_reply(query).split()) - len(query.split())
+        return tokens / (time.perf_counter() - start)
+
+    analyzer._action_values = _legacy_action_values
+    try:
+        before = run()
+    finally:
+        del analyzer._action_values
+    after = run()
+    print(f"generate_reply: 逐词求和 {before:9.0f} 词/秒, 向量化打分 {after:9.0f} 词/秒 ({after / before:.2f}x)")
+
+
+def bench_incremental(args):
+    """对比 add/remove_documents 与全量重建的耗时（与全量重建的一致性见 tests/test_incremental.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    base, batch = texts[:-args.batch], texts[-args.batch:]
+
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(base)
+    start = time.perf_counter()
+    analyzer.add_documents(batch)
+    added = time.perf_counter() - start
+
+    rebuilt = TextAnalyzer()
+    start = time.perf_counter()
+    rebuilt.load_corpus(texts)
+    full = time.perf_counter() - start
+
+    removed_ids = list(range(0, len(texts), 3))
+    start = time.perf_counter()
+    analyzer.remove_documents(removed_ids)
+    removed = time.perf_counter() - start
+
+    print(f"全量重建 {full:.3f}s, 增量加入 {args.batch} 篇 {added:.3f}s, 删除 {len(removed_ids)} 篇 {removed:.3f}s")
+
+
+def bench_parallel(args):
+    """多进程分片构建的扩展性（与单进程构建逐位一致见 tests/test_parallel.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    serial = TextAnalyzer()
+    serial.build_workers = 1
+    start = time.perf_counter()
+    serial.load_corpus(texts)
+    baseline = time.perf_counter() - start
+    print(f"单进程: {baseline:.2f}s (CPU核数 {os.cpu_count()})")
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        analyzer = TextAnalyzer()
+        analyzer.build_workers = workers
+        start = time.perf_counter()
+        analyzer.load_corpus(texts)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:3d} 进程: {elapsed:6.2f}s  加速比 {baseline / elapsed:5.2f}x")
+
+
+def bench_startup(args):
+    """对比从TXT文件重建与打开模型快照的启动耗时（加载后与重建的模型一致见 tests/test_snapshot.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, text in enumerate(texts):
+            with open(os.path.join(tmp, f"{i}.txt"), "w", encoding="utf-8") as f:
+                f.write(text)
+        snapshot_path = os.path.join(tmp, "model.reko")
+
+        start = time.perf_counter()
+        documents = {}
+        for name in sorted(os.listdir(tmp)):
+            if name.endswith(".txt"):
+                with open(os.path.join(tmp, name), encoding="utf-8") as f:
+                    documents[name] = f.read()
+        rebuilt = TextAnalyzer()
+        rebuilt.load_corpus(list(documents.values()), doc_ids=list(documents))
+        rebuild_time = time.perf_counter() - start
+
+        rebuilt.save(snapshot_path)
+        size = os.path.getsize(snapshot_path)
+
+        for label, with_corpus in (("快照(含语料)", True), ("快照(仅模型)", False)):
+            start = time.perf_counter()
+            loaded = TextAnalyzer()
+            loaded.load(snapshot_path, with_corpus=with_corpus)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<10} {elapsed * 1000:9.1f} ms")
+        print(f"{'TXT重建':<10} {rebuild_time * 1000:9.1f} ms  (快照文件 {size / 2**20:.1f} MB)")
+
+
+def sample_documents():
+    """读取项目自带的示例文档"""
+    folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "sample_docs")
+    texts = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".txt"):
+            with open(os.path.join(folder, name), encoding="utf-8") as f:
+                texts.append(f.read())
+    return texts
+
+
+def bench_preprocess(args):
+    """批量预处理吞吐量（篇/秒、MB/秒；多进程与单进程结果一致见 tests/test_preprocessor.py）"""
+    texts = sample_documents() * args.repeat
+    megabytes = sum(len(t.encode("utf-8")) for t in texts) / 2**20
+    preprocessor = TextPreprocessor()
+    preprocessor.segment_text("预热")  # 加载jieba词典，不计入耗时
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        start = time.perf_counter()
+        preprocessor.preprocess_batch(texts, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:3d} 进程: {len(texts) / elapsed:8.1f} 篇/秒  {megabytes / elapsed:6.2f} MB/秒")
+
+
+def noisy_documents(count, seed=0):
+    """生成含HTML、URL、邮箱、混合标点和特殊空白的测试文本"""
+    rng = random.Random(seed)
+    pieces = ["人工智能", "Deep", "learning", "<b>", "</b>", "<a href='x'>", "http://example.com/a?b=1",
+              "https://t.cn/x", "user@mail.com", "a@b", "，", ",", "。", ".", "...", "！", "!!", "？", "?",
+              "；", "：", "\"", "'", "（", "）", "《", "》", "【", "】", "、", "\t", "\n", "\u3000", "\xa0",
+              " ", "  ", "😀", "#", "$", "%", "<", ">", "http", "@", "ĞÜŞ", "ΑΒΓ", "123", "中文"]
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 400))) for _ in range(count)]
+
+
+def bench_clean(args):
+    """对比融合清洗/标准化与逐步执行的每MB耗时（两者结果一致见 tests/test_preprocessor.py）"""
+    preprocessor = TextPreprocessor()
+    for name, corpus in (("示例文档", sample_documents() * args.repeat * 50),
+                         ("噪声文本", noisy_documents(2000) * args.repeat)):
+        megabytes = sum(len(t.encode("utf-8")) for t in corpus) / 2**20
+        timings = []
+        for clean, normalize in ((preprocessor.clean_text, preprocessor.normalize_text),
+                                 (preprocessor.clean_text_fused, preprocessor.normalize_text_fused)):
+            start = time.perf_counter()
+            for text in corpus:
+                normalize(clean(text))
+            timings.append((time.perf_counter() - start) / megabytes * 1000)
+        print(f"[{name}] 逐步执行 {timings[0]:7.1f} ms/MB, 融合模式 {timings[1]:7.1f} ms/MB ({timings[0] / timings[1]:.2f}x)")
+
+
+def bench_stream(args):
+    """对比流式构建与一次性读入构建的耗时和峰值内存（两者结果一致见 tests/test_stream.py）"""
+    texts = sample_documents() + synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    # 追加一个远大于块大小的文件
+    texts.append(" ".join(texts[8:8 + args.docs // 4]))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, text in enumerate(texts):
+            paths.append(os.path.join(tmp, f"{i:06d}.txt"))
+            with open(paths[-1], "w", encoding="utf-8") as f:
+                f.write(text)
+        del texts
+
+        def read_all():
+            analyzer = TextAnalyzer()
+            documents = [FileUtils.read_text_file(path) for path in paths]
+            analyzer.load_corpus(documents, doc_ids=paths)
+            return analyzer
+
+        def stream():
+            analyzer = TextAnalyzer()
+            analyzer.stream_batch_tokens = args.batch_tokens
+            analyzer.load_stream(FileUtils.iter_documents(paths, args.chunk_size))
+            return analyzer
+
+        full, full_time, _, full_peak = measure(read_all)
+        _, stream_time, _, stream_peak = measure(stream)
+        print(f"一次性读入: {full_time:6.2f}s  峰值 {full_peak / 2**20:7.1f} MB")
+        print(f"流式读取:   {stream_time:6.2f}s  峰值 {stream_peak / 2**20:7.1f} MB  (块 {args.chunk_size} 字符, 每批 {args.batch_tokens} 词)")
+
+
+def bench_cache(args):
+    """模拟交互式使用，对比开启/关闭预测缓存的耗时（结果一致与缓存失效见 tests/test_cache.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    rng = random.Random(3)
+    # 逐词输入时反复预测同一句子的各个前缀，对话查询也会重复出现
+    sentences = [rng.choice(texts).split()[:8] for _ in range(args.queries // 8)]
+    keystrokes = [" ".join(words[:i]) for words in sentences for i in range(1, len(words) + 1)]
+    queries = [" ".join(words[:2]) for words in sentences] * 2
+
+    def run(analyzer):
+        random.seed(0)
+        analyzer.epsilon = 0.1
+        start = time.perf_counter()
+        for context in keystrokes:
+            analyzer.predict_next(context)
+        for query in queries:
+            analyzer.generate_reply(query)
+        return time.perf_counter() - start
+
+    plain = TextAnalyzer()
+    plain.load_corpus(texts)
+    plain.cache = LRUCache(0)
+    cached = TextAnalyzer()
+    cached.load_corpus(texts)
+    cached.cache = LRUCache(args.size)
+
+    before = run(plain)
+    after = run(cached)
+    stats = cached.cache.stats()
+    print(f"{len(keystrokes)} 次预测 + {len(queries)} 次回复")
+    print(f"无缓存 {before:6.2f}s  有缓存 {after:6.2f}s ({before / after:.2f}x)  "
+          f"命中率 {stats['hit_rate']:.1%}  条目 {stats['size']}/{stats['maxsize']}")
+
+
+def legacy_order_counts(texts, order):
+    """旧版做法推广到N阶：每一阶各用一个以词元组为键的 dict-of-Counter"""
+    tables = {n: defaultdict(Counter) for n in range(2, order + 1)}
+    for text in texts:
+        words = text.split()
+        for n in range(2, order + 1):
+            table = tables[n]
+            for i in range(len(words) - n + 1):
+                table[tuple(words[i:i + n - 1])][words[i + n - 1]] += 1
+    return tables
+
+
+def bench_orders(args):
+    """比较不同阶数的构建耗时、内存与预测延迟，并与每阶一个字典的做法对比内存（计数与回退的正确性见 tests/test_orders.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    rng = random.Random(4)
+    contexts = []
+    for _ in range(args.queries):
+        words = rng.choice(texts).split()
+        i = rng.randrange(len(words) - 8)
+        contexts.append(" ".join(words[i:i + 8]))
+    print(f"语料: {args.docs} 篇文档, 每篇 {args.doc_len} 词, 词表 {args.vocab}")
+
+    for order in [int(n) for n in args.orders.split(",")]:
+        def build():
+            analyzer = TextAnalyzer()
+            analyzer.ngram_order = order
+            analyzer.cache = LRUCache(0)
+            analyzer.load_corpus(texts)
+            return analyzer
+
+        analyzer, elapsed, _, peak = measure(build)
+        latency = time_calls(analyzer.predict_next, contexts)
+        entries = sum(len(table) for table in analyzer.store.tables.values())
+        _, _, legacy_bytes, _ = measure(legacy_order_counts, texts, order)
+        gc.collect()
+        print(f"{order}阶: 构建 {elapsed:6.2f}s  峰值 {peak / 2**20:7.1f} MB  "
+              f"数组 {analyzer.store.nbytes / 2**20:7.1f} MB ({entries} 条目)  "
+              f"字典 {legacy_bytes / 2**20:8.1f} MB  预测 {latency:6.1f} us/次")
+
+
+def bench_smoothing(args):
+    """对比逐词打分与整组向量化打分的耗时（概率归一与两种打分一致见 tests/test_smoothing.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    analyzer = TextAnalyzer()
+    analyzer.ngram_order = args.order
+    analyzer.load_corpus(texts)
+    store = analyzer.store
+    rng = random.Random(5)
+    contexts = []
+    for _ in range(args.queries):
+        words = store.vocab.encode(rng.choice(texts).split())
+        i = rng.randrange(len(words) - args.order)
+        contexts.append(words[i:i + rng.randint(0, args.order - 1)].tolist())
+
+    for method in ("add_alpha", "kneser_ney"):
+        start = time.perf_counter()
+        scorer = build_scorer(store, method)
+        build_time = time.perf_counter() - start
+
+        candidates = [rng.sample(range(len(store.vocab)), 20) for _ in contexts]
+        start = time.perf_counter()
+        for context, cands in zip(contexts, candidates):
+            for w in cands:
+                scorer.score(context, [w])
+        loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for context, cands in zip(contexts, candidates):
+            scorer.score(context, cands)
+        batch_time = time.perf_counter() - start
+        print(f"{method:<11} 预计算 {build_time:6.2f}s  每组20个候选: "
+              f"逐词 {loop_time / len(contexts) * 1e6:7.1f} us  向量化 {batch_time / len(contexts) * 1e6:7.1f} us")
+
+
+async def _server_client(port, requests, rng, latencies):
+    """单个keep-alive连接上依次发送请求：预测为主，夹杂回复和反馈"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def post(path, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        headers = {}
+        assert (await reader.readline()).startswith(b"HTTP/1.1 200")
+        while (line := await reader.readline()) != b"\r\n":
+            key, _, value = line.decode().partition(":")
+            headers[key.lower()] = value.strip()
+        return json.loads(await reader.readexactly(int(headers["content-length"])))
+
+    for context, query in requests:
+        start = time.perf_counter()
+        if rng.random() < 0.8:
+            await post("/predict", {"context": context})
+        else:
+            reply_id = (await post("/reply", {"query": query}))["reply_id"]
+            if rng.random() < 0.5:
+                assert (await post("/feedback", {"reply_id": reply_id, "reward": rng.choice([1, -1])}))["ok"]
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+def bench_server(args):
+    """在本机启动推理服务并发起并发请求，对比不同批大小的吞吐量与延迟"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.reko")
+        builder = TextAnalyzer()
+        builder.load_corpus(texts)
+        builder.save(path)
+
+        rng = random.Random(6)
+        # 交互场景下上下文有重复
+        pool = [" ".join(rng.choice(texts).split()[:rng.choice([1, 2])]) for _ in range(args.requests)]
+        workload = [[(rng.choice(pool), rng.choice(pool)) for _ in range(args.requests // args.clients)]
+                    for _ in range(args.clients)]
+
+        for batch_size in [int(b) for b in args.batch.split(",")]:
+            analyzer = TextAnalyzer()
+            analyzer.load(path, with_corpus=False)
+
+            async def run():
+                server = InferenceServer(analyzer, max_batch_size=batch_size)
+                port = await server.start()
+                latencies = []
+                start = time.perf_counter()
+                await asyncio.gather(*(_server_client(port, requests, random.Random(i), latencies)
+                                       for i, requests in enumerate(workload)))
+                elapsed = time.perf_counter() - start
+                stats = server.stats()
+                await server.close()
+                return latencies, elapsed, stats
+
+            latencies, elapsed, stats = asyncio.run(run())
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f"批大小 {batch_size:>3}: {len(latencies) / elapsed:8.0f} 请求/秒  客户端 p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+            for name in ("predict", "reply", "feedback"):
+                s = stats[name]
+                if s['count']:
+                    print(f"    {name:<8} {s['count']:6d} 次  p50 {s['p50_ms']:6.2f} ms  p99 {s['p99_ms']:6.2f} ms  "
+                          f"平均批大小 {s['mean_batch_size']:.1f}")
+
+
+def bench_concurrency(args):
+    """多个线程持续预测和生成回复，同时主线程在语料A和B之间反复重建模型，测量读线程的吞吐量
+
+    读线程始终看到完整模型版本的校验见 tests/test_concurrency.py。
+    """
+    corpora = [synthetic_corpus(args.docs, args.doc_len, args.vocab, seed=seed) for seed in (0, 1)]
+    rng = random.Random(7)
+    contexts = [" ".join(rng.choice(corpora[i % 2]).split()[:rng.choice([1, 2])]) for i in range(200)]
+
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(corpora[0])
+    stop = threading.Event()
+    errors = []
+    counts = [0] * args.readers
+
+    def reader(index):
+        session = analyzer.new_session()
+        local = random.Random(index)
+        try:
+            while not stop.is_set():
+                context = local.choice(contexts)
+                analyzer.predict_next(context)
+                reply = analyzer.generate_reply(context, session=session)
+                if local.random() < 0.2:
+                    analyzer.update_reward(context, reply, local.choice([1, -1]), session=session)
+                counts[index] += 1
+        except Exception as e:
+            errors.append(f"读线程异常: {e!r}")
+
+    # 缩短线程切换间隔，增加交错执行的机会
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        for i in range(args.rebuilds):
+            analyzer.load_corpus(corpora[(i + 1) % 2])
+    except Exception as e:
+        errors.append(f"重建异常: {e!r}")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        sys.setswitchinterval(switch_interval)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.readers} 个读线程, {args.rebuilds} 次重建, 耗时 {elapsed:.2f}s, "
+          f"共 {sum(counts)} 轮预测+回复 ({sum(counts) / elapsed:.0f} 轮/秒)")
+    assert not errors, "\n".join(errors[:10])
+
+
+def bench_replies(args):
+    """测量不同批大小下每秒生成的回复数（批量生成与逐条生成的回复一致见 tests/test_replies.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    rng = random.Random(5)
+    queries = [" ".join(rng.choice(texts).split()[:rng.choice([0, 1, 2, 3])]) for _ in range(args.queries)]
+    # 含未登录词和超过最大长度的查询
+    queries[:3] = ["未登录词", "未登录词 " + queries[3], " ".join(texts[0].split()[:25])]
+    seeds = list(range(len(queries)))
+
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    start = time.perf_counter()
+    for query, seed in zip(queries, seeds):
+        analyzer.generate_reply(query, session=analyzer.new_session(), rng=random.Random(seed))
+    baseline = len(queries) / (time.perf_counter() - start)
+    print(f"逐条 generate_reply:          {baseline:8.0f} 条/秒")
+    threshold = analyzer.batch_reply_min_size
+    for size in (int(b) for b in args.batch.split(",")):
+        rates = []
+        # 先测同步推进的批量路径，再测按 batch_reply_min_size 选择路径的默认行为
+        for min_size in (0, threshold):
+            analyzer.batch_reply_min_size = min_size
+            analyzer.cache.clear()
+            start = time.perf_counter()
+            for i in range(0, len(queries), size):
+                analyzer.generate_replies(queries[i:i + size], session=analyzer.new_session(), seeds=seeds[i:i + size])
+            rates.append(len(queries) / (time.perf_counter() - start))
+        print(f"generate_replies 批大小 {size:5d}: 同步推进 {rates[0]:8.0f} 条/秒 ({rates[0] / baseline:.2f}x)  "
+              f"默认（少于 {threshold} 条逐条生成） {rates[1]:8.0f} 条/秒 ({rates[1] / baseline:.2f}x)")
+
+
+def legacy_update_reward(analyzer, history, rewards, query, reply, reward):
+    """旧版做法：线性查找回复，复制整个奖励表，逐条裁剪，超过5000条时按列表成员测试清理"""
+    for q, r, dialog in history:
+        if q == query and r == reply:
+            rewards = defaultdict(float, rewards)
+            current_reward = reward
+            lr = analyzer.learning_rate
+            if abs(reward) > 0.8:
+                lr *= 1.5
+            elif abs(reward) < 0.3:
+                lr *= 0.7
+            for state, action, prob in reversed(dialog):
+                key = (state, action)
+                rewards[key] = rewards.get(key, 0) + lr * current_reward * (1.0 / max(prob, 0.1))
+                current_reward *= analyzer.discount_factor
+            for k in list(rewards.keys()):
+                rewards[k] = max(-1.5, min(1.5, rewards[k]))
+            if len(rewards) > 5000:
+                keep_keys = list(rewards.keys())[-3000:]
+                for k in list(rewards.keys()):
+                    if k not in keep_keys:
+                        del rewards[k]
+            break
+    return rewards
+
+
+def bench_feedback(args):
+    """对比按 (查询, 回复) 线性查找与按回复ID评分的耗时，奖励表和历史记录均接近容量上限（奖励值一致见 tests/test_feedback.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    rng = random.Random(11)
+    random.seed(0)
+    queries = [" ".join(rng.choice(texts).split()[:2]) for _ in range(args.replies)]
+    reply_ids = []
+    for query in queries:
+        analyzer.generate_reply(query)
+        reply_ids.append(analyzer.session.last_reply_id)
+    history = analyzer.reply_history
+    reply_ids = reply_ids[-len(history):]
+    ratings = [(rng.randrange(len(history)), rng.choice([1.0, -0.5, 0.2])) for _ in range(args.ratings)]
+
+    legacy = defaultdict(float)
+
+    def timed(rate):
+        times = []
+        for index, reward in ratings:
+            start = time.perf_counter()
+            rate(index, reward)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        return sum(times) / len(times) * 1000, times[len(times) // 2] * 1000, times[-1] * 1000
+
+    def rate_legacy(index, reward):
+        nonlocal legacy
+        query, reply, _ = history[index]
+        legacy = legacy_update_reward(analyzer, history, legacy, query, reply, reward)
+
+    def rate_by_id(index, reward):
+        analyzer.reward_reply(reply_ids[index], reward)
+
+    print(f"历史记录 {len(history)} 条, 评分 {len(ratings)} 次")
+    for name, rate in (("线性查找+整表复制", rate_legacy), ("回复ID+LRU奖励表", rate_by_id)):
+        mean, p50, worst = timed(rate)
+        table = legacy if rate is rate_legacy else analyzer.rewards
+        print(f"  {name:<12} 平均 {mean:8.3f} ms  p50 {p50:8.3f} ms  最大 {worst:8.3f} ms  奖励表 {len(table)} 条")
+
+
+def bench_feedbacklog(args):
+    """反馈日志的写入吞吐量、对回复路径的影响，以及重放与压缩的耗时（重放后状态一致见 tests/test_feedback_log.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    rng = random.Random(13)
+    queries = [" ".join(rng.choice(texts).split()[:2]) for _ in range(args.replies)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "model.reko")
+        directory = os.path.join(tmp, "feedback")
+        builder = TextAnalyzer()
+        builder.load_corpus(texts)
+        builder.save(snapshot)
+
+        def run(analyzer):
+            random.seed(0)
+            start = time.perf_counter()
+            ids = []
+            for query in queries:
+                analyzer.generate_reply(query)
+                ids.append(analyzer.session.last_reply_id)
+            analyzer.generate_replies(queries[:64])
+            reply_rate = len(queries) / (time.perf_counter() - start)
+            start = time.perf_counter()
+            for _ in range(args.ratings):
+                analyzer.reward_reply(rng.choice(ids[-1000:]), rng.choice([1.0, -0.5, 0.2]))
+            return reply_rate, args.ratings / (time.perf_counter() - start)
+
+        plain = TextAnalyzer()
+        plain.load(snapshot)
+        plain_replies, plain_ratings = run(plain)
+
+        logged = TextAnalyzer()
+        logged.load(snapshot)
+        logged.attach_feedback_log(directory)
+        logged_replies, logged_ratings = run(logged)
+        start = time.perf_counter()
+        logged.feedback_log.flush()
+        flush_seconds = time.perf_counter() - start
+        stats = logged.feedback_log.stats()
+        print(f"回复: 无日志 {plain_replies:7.0f} 条/秒, 有日志 {logged_replies:7.0f} 条/秒")
+        print(f"评分: 无日志 {plain_ratings:7.0f} 次/秒, 有日志 {logged_ratings:7.0f} 次/秒")
+        print(f"共 {stats['events']} 个事件分 {stats['batches']} 批写入并 fsync, 最后一次 flush {flush_seconds * 1000:.1f} ms, "
+              f"日志 {os.path.getsize(os.path.join(directory, 'feedback.jsonl')) / 1e6:.1f} MB")
+        logged.close_feedback_log()
+
+        for stage in ("重放日志", "压缩后重放"):
+            restored = TextAnalyzer()
+            restored.load(snapshot)
+            start = time.perf_counter()
+            restored.attach_feedback_log(directory)
+            seconds = time.perf_counter() - start
+            print(f"{stage}: {seconds * 1000:7.1f} ms, 奖励表 {len(restored.rewards)} 条")
+            restored.feedback_log.compact()
+            restored.close_feedback_log()
+
+
+def legacy_select(values, rewards, action_counts, state, actions, epsilon, rng):
+    """旧版做法：以字符串元组为键逐个查奖励和计数，排序 (Q值, 动作) 元组后用 choices 抽样再 index 回查"""
+    if rng.random() < epsilon:
+        return rng.choice(actions), 1.0 / len(actions)
+    q_values = []
+    for act, base_val in zip(actions, values):
+        reward = rewards.get((state, act), 0)
+        count = action_counts[state].get(act, 0) + 1
+        q_values.append((base_val * (1 + reward) + 0.1 / count, act))
+    q_values.sort(reverse=True, key=lambda x: x[0])
+    total = sum(q[0] for q in q_values)
+    if total == 0:
+        weights = [1.0 / len(q_values)] * len(q_values)
+    else:
+        weights = [q[0] / total for q in q_values]
+    action_list = [q[1] for q in q_values]
+    chosen = rng.choices(action_list, weights=weights, k=1)[0]
+    return chosen, weights[action_list.index(chosen)]
+
+
+def bench_policy(args):
+    """对比旧版与新版 select_action 的耗时（选择分布及与逐个计算逐位一致见 tests/test_policy.py）
+
+    新版的加速分两部分列出：动作值缓存命中（对所有候选数都有效，默认 top_k=5 时的加速全部来自这里），
+    以及候选数超过 _VECTOR_MIN_ACTIONS 时数组抽样相对逐个计算的加速。
+    """
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    # 固定探索率，使每次选择服从同一个分布
+    analyzer.epsilon_decay = 1.0
+    words = analyzer.store.vocab.words
+    rng = random.Random(17)
+
+    for size in (int(k) for k in args.sizes.split(",")):
+        state = " ".join(rng.choice(texts).split()[:2])
+        actions = analyzer.predict_next(state)
+        actions += rng.sample([w for w in words if w not in actions], size - len(actions))
+        session = analyzer.new_session()
+        session.epsilon = 0.2
+        # 部分候选带有历史奖励（非负，旧版 choices 不接受负权重）和动作计数
+        rewards = {(state, act): rng.choice([0.0, 0.5, 1.5]) for act in rng.sample(actions, size // 2)}
+        action_counts = defaultdict(Counter)
+        for act in rng.sample(actions, size // 2):
+            action_counts[state][act] = rng.randrange(1, 5)
+            session.count_action(state, act, action_counts[state][act])
+        table = analyzer.rewards
+        table.add_many((analyzer._keys.key(s, a, add=True), value) for (s, a), value in rewards.items())
+        table.version += 1
+
+        legacy_rng, new_rng = random.Random(1), random.Random(2)
+
+        def timed(select):
+            start = time.perf_counter()
+            for _ in range(args.calls):
+                select()
+            return (time.perf_counter() - start) / args.calls * 1e6
+
+        def select_legacy():
+            # 旧版每次调用都重新计算各候选词的基础概率
+            scores = analyzer._score(analyzer.model, state, actions).tolist()
+            return legacy_select(scores, rewards, action_counts, state, actions, session.epsilon, legacy_rng)
+
+        def select_new():
+            return analyzer._select(analyzer.model, session, state, actions, new_rng)
+
+        cached = analyzer.cache
+        legacy = timed(select_legacy)
+        analyzer.cache = LRUCache(0)
+        uncached = timed(select_new)
+        analyzer.cache = cached
+        warm = timed(select_new)
+        line = (f"k={size:5d}: 旧版 {legacy:7.1f} us/次  新版未命中缓存 {uncached:7.1f} us/次 ({legacy / uncached:.1f}x)  "
+                f"缓存命中 {warm:7.1f} us/次 ({legacy / warm:.1f}x)")
+        if size > analyzer_module._VECTOR_MIN_ACTIONS:
+            # 同样命中缓存，但强制逐个计算，差别即为数组抽样的贡献
+            threshold, analyzer_module._VECTOR_MIN_ACTIONS = analyzer_module._VECTOR_MIN_ACTIONS, size
+            cached.clear()
+            scalar = timed(select_new)
+            analyzer_module._VECTOR_MIN_ACTIONS = threshold
+            cached.clear()
+            line += f"  其中数组抽样 {scalar / warm:.1f}x（逐个计算 {scalar:7.1f} us/次）"
+        else:
+            line += "  （加速全部来自缓存）"
+        print(line)
+
+
+def bench_ui(args):
+    """模拟图形界面主循环：推理线程生成长回复、后台线程重建模型时，主循环每帧的延迟
+
+    旧做法在主线程中播放10步×0.1秒的进度动画后同步生成回复，每条消息期间界面无响应；
+    新做法由推理线程生成并逐词放入结果队列，主循环按帧间隔取回进度。
+    """
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    rng = random.Random(19)
+    queries = [" ".join(rng.choice(texts).split()[:2]) for _ in range(args.messages)]
+    frame = args.frame_ms / 1000
+
+    start = time.perf_counter()
+    time.sleep(0.1 * 10)
+    analyzer.generate_reply(queries[0], max_len=args.max_len)
+    print(f"旧做法: 每条消息主线程阻塞 {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+    results = queue.Queue()
+    done = threading.Event()
+
+    def worker():
+        for query in queries:
+            analyzer.generate_reply(query, max_len=args.max_len, on_token=lambda word, prob: results.put(prob))
+        done.set()
+
+    def rebuild():
+        while not done.is_set():
+            analyzer.load_corpus(texts)
+
+    threads = [threading.Thread(target=worker), threading.Thread(target=rebuild)]
+    for thread in threads:
+        thread.start()
+    lateness = []
+    tokens = 0
+    deadline = time.perf_counter() + frame
+    while not done.is_set() or not results.empty():
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+        lateness.append(time.perf_counter() - deadline)
+        while True:
+            try:
+                results.get_nowait()
+            except queue.Empty:
+                break
+            tokens += 1
+        deadline = time.perf_counter() + frame
+    for thread in threads:
+        thread.join()
+    p50, p99, worst = np.percentile(lateness, [50, 99, 100]) * 1000
+    print(f"新做法: {len(queries)} 条回复共 {tokens} 个词的进度, 同时重建模型; "
+          f"{len(lateness)} 帧的延迟 p50 {p50:.2f} ms  p99 {p99:.2f} ms  最大 {worst:.2f} ms (帧间隔 {args.frame_ms} ms)")
+
+
+def legacy_chart_update(ax, canvas, time_points, match_scores, score):
+    """旧做法：每个数据点都切片列表、清空坐标轴重新作图并整幅重绘"""
+    time_points.append(len(time_points) + 1 if not time_points else time_points[-1] + 1)
+    match_scores.append(score)
+    if len(time_points) > 50:
+        time_points[:] = time_points[-50:]
+        match_scores[:] = match_scores[-50:]
+    ax.clear()
+    ax.plot(time_points, match_scores, 'b-')
+    ax.set_title("推理进度")
+    ax.set_xlabel("生成的词")
+    ax.set_ylabel("选中概率")
+    low, high = min(match_scores), max(match_scores)
+    padding = (high - low) * 0.1 if high > low else 0.1
+    ax.set_ylim(max(0, low - padding), high + padding)
+    canvas.draw()
+
+
+def bench_chart(args):
+    """进度图每秒重绘次数：旧做法整幅重绘，新做法常驻折线+背景缓存局部重绘，以及按帧率合并重绘
+
+    使用离屏的 Agg 画布（blit 为空操作），数值反映主线程上的绘制开销。缓冲区与重绘时机的正确性见 tests/test_chart.py。
+    """
+    import warnings
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from src.gui.chart import ProgressChart
+
+    # 没有中文字体时只会缺字，不影响计时
+    warnings.filterwarnings("ignore", message="Glyph")
+    rng = random.Random(23)
+    scores = [rng.uniform(0.05, 0.6) for _ in range(args.points)]
+
+    def axes():
+        fig = Figure(figsize=(4, 4))
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.set_title("推理进度", fontsize=14)
+        ax.set_xlabel("生成的词", fontsize=12)
+        ax.set_ylabel("选中概率", fontsize=12)
+        canvas.draw()
+        return ax, canvas
+
+    # 旧做法每次约数十毫秒，只取前200个点计时
+    ax, canvas = axes()
+    time_points, match_scores = [], []
+    start = time.perf_counter()
+    for score in scores[:200]:
+        legacy_chart_update(ax, canvas, time_points, match_scores, score)
+    legacy = len(scores[:200]) / (time.perf_counter() - start)
+
+    ax, canvas = axes()
+    chart = ProgressChart(ax, canvas, capacity=args.capacity, max_fps=0)
+    start = time.perf_counter()
+    for score in scores:
+        chart.add([score])
+        chart.render()
+    blitted = chart.draws / (time.perf_counter() - start)
+    print(f"每个点都重绘: 旧做法 {legacy:7.1f} 次/秒, 局部重绘 {blitted:7.1f} 次/秒 ({blitted / legacy:.1f}x), "
+          f"其中整幅重绘 {chart.full_draws} 次 / 共 {chart.draws} 次")
+
+    # 数据按 args.rate 个/秒到达，主循环每16ms调用一次 render（模拟时钟）
+    ax, canvas = axes()
+    chart = ProgressChart(ax, canvas, capacity=args.capacity, max_fps=args.fps)
+    clock, busy = 0.0, 0.0
+    arrivals = iter(scores)
+    pending = 0.0
+    while True:
+        clock += 0.016
+        pending += args.rate * 0.016
+        batch = [score for _, score in zip(range(int(pending)), arrivals)]
+        pending -= int(pending)
+        if not batch and not chart._dirty:
+            break
+        chart.add(batch)
+        start = time.perf_counter()
+        chart.render(now=clock)
+        busy += time.perf_counter() - start
+    print(f"数据 {args.rate} 点/秒, 帧率上限 {args.fps}: {len(scores)} 个点合并为 {chart.draws} 次重绘 "
+          f"({chart.draws / clock:.1f} 次/秒), 主线程绘制占用 {busy / clock:.1%}")
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, *options):
+    """在新的解释器中执行代码，返回 (标准输出, 标准错误)"""
+    result = subprocess.run([sys.executable, *options, "-c", code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    return result.stdout, result.stderr
+
+
+def import_times(module):
+    """用 -X importtime 在新进程中导入模块，返回 {模块: 累计微秒}"""
+    _, stderr = run_python(f"import {module}", "-X", "importtime")
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_launch(args):
+    """图形界面的启动耗时：入口模块的导入时间、jieba词典的加载方式，以及有显示器时的各阶段报告"""
+    # 旧的入口在模块顶层导入了 pyplot、Tk 后端、jieba 和 yaml
+    legacy = "matplotlib.pyplot, matplotlib.backends.backend_tkagg, jieba, yaml, src.core.analyzer"
+    print("导入耗时（-X importtime，取多次运行的最小值）")
+    for label, module in (("src.main", "src.main"), ("src.gui.app", "src.gui.app"), ("旧入口的顶层依赖", legacy)):
+        runs = [import_times(module) for _ in range(args.repeat)]
+        top_level = [name.strip() for name in module.split(",")]
+        total = min(sum(run.get(name, 0) for name in top_level) for run in runs)
+        print(f"  {label:<16} {total / 1000:8.1f} ms")
+    times = min((import_times("src.main") for _ in range(args.repeat)), key=lambda run: run.get("src.main", 0))
+    heaviest = sorted(times.items(), key=lambda item: item[1], reverse=True)[1:args.top + 1]
+    print("  src.main 中累计耗时最多的模块: " + ", ".join(f"{name} {us / 1000:.1f}ms" for name, us in heaviest))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        marshal_cache = os.path.join(tmp, "jieba.cache")
+        pickle_cache = os.path.join(tmp, "jieba_dict.pkl")
+        cases = (
+            ("重新构建", "import jieba; jieba.dt.cache_file = '/nonexistent/jieba.cache'; t = time.perf_counter(); "
+                        "jieba.dt.FREQ, jieba.dt.total = jieba.dt.gen_pfdict(jieba.dt.get_dict_file())"),
+            ("jieba自带marshal缓存", f"import jieba; jieba.dt.cache_file = {marshal_cache!r}; t = time.perf_counter(); "
+                                   "jieba.initialize()"),
+            ("pickle缓存", f"import jieba; from src.data.preprocessor import load_jieba_dictionary; t = time.perf_counter(); "
+                         f"assert load_jieba_dictionary(jieba, {pickle_cache!r})"),
+        )
+        # 先各运行一次写好两种缓存
+        run_python(cases[1][1].replace("t = time.perf_counter(); ", ""))
+        run_python(f"import jieba; from src.data.preprocessor import load_jieba_dictionary; "
+                   f"load_jieba_dictionary(jieba, {pickle_cache!r})")
+        print("jieba词典加载（新进程，不含导入jieba本身）")
+        for label, code in cases:
+            code = "import time, logging; logging.disable(logging.CRITICAL); " + code + "; print(time.perf_counter() - t)"
+            elapsed = min(float(run_python(code)[0].split()[-1]) for _ in range(args.repeat))
+            print(f"  {label:<20} {elapsed * 1000:8.1f} ms")
+
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        print("没有显示器（未设置 DISPLAY），跳过 src/main.py --profile-startup")
+        return
+    stdout, _ = run_python("import sys; sys.argv = ['main.py', '--profile-startup']; "
+                           "from src.main import main; main(sys.argv[1:])")
+    report = json.loads(stdout.strip().splitlines()[-1])
+    print("启动各阶段（距进程启动，ms）")
+    for stage, ms in report.items():
+        print(f"  {stage:<12} {ms:8.1f}")
+
+
+def bench_tokenize(args):
+    """按空白切分与jieba分词的词表规模对比，以及分词缓存命中时的重建耗时（结果与不使用缓存时一致见 tests/test_tokenizer.py）"""
+    texts = sample_documents()
+    # 去掉汉字与中文标点之间的空格，得到未分词的原始中文文本
+    joined = re.compile(r"(?<=[\u4e00-\u9fff，。、；：！？“”（）])\s+(?=[\u4e00-\u9fff，。、；：！？“”（）])")
+    raw = [joined.sub("", text) for text in texts]
+
+    print(f"{'语料':<8} {'分词器':<12} {'词数':>8} {'词表':>7} {'平均词长':>8} {'二元上下文':>10}")
+    for corpus, docs in (("已分词", texts), ("原始", raw)):
+        for tokenizer in (WhitespaceTokenizer(), JiebaTokenizer()):
+            analyzer = TextAnalyzer()
+            analyzer.tokenizer = tokenizer
+            stats = analyzer.load_corpus(docs)
+            words = analyzer.store.vocab.words
+            mean_len = sum(len(w) for w in words) / len(words) if words else 0.0
+            print(f"{corpus:<8} {tokenizer.name:<12} {stats['total_words']:>8} {stats['vocab_size']:>7} "
+                  f"{mean_len:>8.1f} {stats['bigram_pairs']:>10}")
+
+    # 重复的文档内容相同，只会写入一份缓存；给每份加上编号使其各不相同
+    docs = [f"{i} {text}" for i in range(args.repeat) for text in raw]
+    with tempfile.TemporaryDirectory() as tmp:
+        tokenizer = JiebaTokenizer(os.path.join(tmp, "tokens"))
+        tokenizer.tokenize("预热")
+        timings = {}
+        for label in ("无缓存", "写入缓存", "命中缓存"):
+            analyzer = TextAnalyzer()
+            analyzer.tokenizer = tokenizer if label != "无缓存" else JiebaTokenizer()
+            start = time.perf_counter()
+            analyzer.load_corpus(docs)
+            timings[label] = time.perf_counter() - start
+        print(f"重建 {len(docs)} 篇原始文档（jieba）")
+        for label, elapsed in timings.items():
+            print(f"  {label:<8} {elapsed * 1000:9.1f} ms")
+        print(f"  缓存命中率 {tokenizer.cache.hit_rate:.2f}")
+
+
+def bench_reload(args):
+    """按文档清单重新加载文件夹的耗时：修改、新增、删除少量文档后只处理这些文档（与全量重建一致见 tests/test_manifest.py）"""
+    texts = synthetic_corpus(args.docs, args.doc_len, args.vocab)
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "docs")
+        os.makedirs(folder)
+        for i, text in enumerate(texts):
+            with open(os.path.join(folder, f"{i:06d}.txt"), "w", encoding="utf-8") as f:
+                f.write(text)
+        snapshot_path = os.path.join(tmp, "model.reko")
+        manifest_dir = os.path.join(tmp, "manifest")
+
+        def reload():
+            """模拟图形界面重新启动后加载快照、列出文件并处理文档"""
+            start = time.perf_counter()
+            analyzer = TextAnalyzer()
+            if os.path.exists(snapshot_path):
+                analyzer.load(snapshot_path)
+            manifest = DocumentManifest(manifest_dir, analyzer.tokenizer.name)
+            manifest.load()
+            paths = [path for path in FileUtils.find_text_files(folder) if os.path.getsize(path) > 0]
+            stats = manifest.sync(analyzer, paths)
+            if stats['model_changed']:
+                analyzer.save(snapshot_path)
+            return analyzer, stats, time.perf_counter() - start
+
+        def rebuild():
+            analyzer = TextAnalyzer()
+            paths = sorted(FileUtils.find_text_files(folder))
+            start = time.perf_counter()
+            analyzer.load_stream(FileUtils.iter_documents(paths))
+            return time.perf_counter() - start
+
+        _, stats, first = reload()
+        full = rebuild()
+        print(f"{args.docs} 篇文档: 首次加载（建立清单） {first:.2f}s, 旧做法全部重新读取 {full:.2f}s")
+
+        rng = random.Random(1)
+        names = sorted(os.listdir(folder))
+        steps = (
+            ("未变化", lambda: None),
+            ("修改 1 篇", lambda: open(os.path.join(folder, names[0]), "a", encoding="utf-8").write(" w1 w2 w3")),
+            ("仅更新修改时间", lambda: os.utime(os.path.join(folder, names[1]))),
+            ("删除 1 篇", lambda: os.remove(os.path.join(folder, names[2]))),
+            ("新增 1 篇", lambda: open(os.path.join(folder, "new.txt"), "w", encoding="utf-8").write(
+                " ".join(rng.choice(texts).split()[:args.doc_len]))),
+        )
+        for label, change in steps:
+            change()
+            _, stats, elapsed = reload()
+            print(f"  {label:<12} {elapsed:6.2f}s  (修改 {stats['changed']}, 新增 {stats['added']}, "
+                  f"删除 {stats['removed']}, 仅时间变化 {stats['touched']})  "
+                  f"{'保存快照' if stats['model_changed'] else '模型未变，不保存快照'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ReKo AI 性能基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    memory = subparsers.add_parser("memory", help="n-gram存储内存占用对比")
+    memory.add_argument("--docs", type=int, default=2000)
+    memory.add_argument("--doc-len", type=int, default=500)
+    memory.add_argument("--vocab", type=int, default=20000)
+    memory.set_defaults(func=bench_memory)
+
+    predict = subparsers.add_parser("predict", help="predict_next 冷/热延迟")
+    predict.add_argument("--docs", type=int, default=2000)
+    predict.add_argument("--doc-len", type=int, default=500)
+    predict.add_argument("--vocab", type=int, default=20000)
+    predict.add_argument("--queries", type=int, default=20000)
+    predict.set_defaults(func=bench_predict)
+
+    reply = subparsers.add_parser("reply", help="generate_reply 生成速度")
+    reply.add_argument("--docs", type=int, default=2000)
+    reply.add_argument("--doc-len", type=int, default=500)
+    reply.add_argument("--vocab", type=int, default=20000)
+    reply.add_argument("--queries", type=int, default=500)
+    reply.set_defaults(func=bench_reply)
+
+    incremental = subparsers.add_parser("incremental", help="增量加入/删除文档的正确性与耗时")
+    incremental.add_argument("--docs", type=int, default=2000)
+    incremental.add_argument("--doc-len", type=int, default=500)
+    incremental.add_argument("--vocab", type=int, default=20000)
+    incremental.add_argument("--batch", type=int, default=1)
+    incremental.set_defaults(func=bench_incremental)
+
+    parallel = subparsers.add_parser("parallel", help="多进程分片构建的扩展性")
+    parallel.add_argument("--docs", type=int, default=2000)
+    parallel.add_argument("--doc-len", type=int, default=500)
+    parallel.add_argument("--vocab", type=int, default=20000)
+    parallel.add_argument("--workers", default="1,2,4,8,16")
+    parallel.set_defaults(func=bench_parallel)
+
+    startup = subparsers.add_parser("startup", help="模型快照与TXT重建的启动耗时")
+    startup.add_argument("--docs", type=int, default=2000)
+    startup.add_argument("--doc-len", type=int, default=500)
+    startup.add_argument("--vocab", type=int, default=20000)
+    startup.set_defaults(func=bench_startup)
+
+    preprocess = subparsers.add_parser("preprocess", help="批量预处理吞吐量")
+    preprocess.add_argument("--repeat", type=int, default=50)
+    preprocess.add_argument("--workers", default="1,2,4")
+    preprocess.set_defaults(func=bench_preprocess)
+
+    clean = subparsers.add_parser("clean", help="融合清洗/标准化的正确性与速度")
+    clean.add_argument("--repeat", type=int, default=5)
+    clean.set_defaults(func=bench_clean)
+
+    stream = subparsers.add_parser("stream", help="流式构建的正确性与峰值内存")
+    stream.add_argument("--docs", type=int, default=2000)
+    stream.add_argument("--doc-len", type=int, default=500)
+    stream.add_argument("--vocab", type=int, default=20000)
+    stream.add_argument("--chunk-size", type=int, default=65536)
+    stream.add_argument("--batch-tokens", type=int, default=100000)
+    stream.set_defaults(func=bench_stream)
+
+    cache = subparsers.add_parser("cache", help="预测缓存的命中率与加速比")
+    cache.add_argument("--docs", type=int, default=2000)
+    cache.add_argument("--doc-len", type=int, default=500)
+    cache.add_argument("--vocab", type=int, default=20000)
+    cache.add_argument("--queries", type=int, default=4000)
+    cache.add_argument("--size", type=int, default=4096)
+    cache.set_defaults(func=bench_cache)
+
+    orders = subparsers.add_parser("orders", help="2到6阶模型的构建、内存与预测延迟")
+    orders.add_argument("--docs", type=int, default=1000)
+    orders.add_argument("--doc-len", type=int, default=500)
+    orders.add_argument("--vocab", type=int, default=20000)
+    orders.add_argument("--queries", type=int, default=2000)
+    orders.add_argument("--orders", default="2,3,4,5,6")
+    orders.set_defaults(func=bench_orders)
+
+    smoothing = subparsers.add_parser("smoothing", help="平滑概率的归一性与批量打分速度")
+    smoothing.add_argument("--docs", type=int, default=1000)
+    smoothing.add_argument("--doc-len", type=int, default=500)
+    smoothing.add_argument("--vocab", type=int, default=20000)
+    smoothing.add_argument("--queries", type=int, default=1000)
+    smoothing.add_argument("--order", type=int, default=3)
+    smoothing.set_defaults(func=bench_smoothing)
+
+    server = subparsers.add_parser("server", help="本机推理服务的并发吞吐量与延迟")
+    server.add_argument("--docs", type=int, default=1000)
+    server.add_argument("--doc-len", type=int, default=500)
+    server.add_argument("--vocab", type=int, default=20000)
+    server.add_argument("--clients", type=int, default=32)
+    server.add_argument("--requests", type=int, default=4000)
+    server.add_argument("--batch", default="1,32")
+    server.set_defaults(func=bench_server)
+
+    concurrency = subparsers.add_parser("concurrency", help="后台重建期间并发预测的吞吐量")
+    concurrency.add_argument("--docs", type=int, default=200)
+    concurrency.add_argument("--doc-len", type=int, default=300)
+    concurrency.add_argument("--vocab", type=int, default=2000)
+    concurrency.add_argument("--readers", type=int, default=8)
+    concurrency.add_argument("--rebuilds", type=int, default=30)
+    concurrency.set_defaults(func=bench_concurrency)
+
+    replies = subparsers.add_parser("replies", help="批量生成回复的一致性与吞吐量")
+    replies.add_argument("--docs", type=int, default=1000)
+    replies.add_argument("--doc-len", type=int, default=500)
+    replies.add_argument("--vocab", type=int, default=20000)
+    replies.add_argument("--queries", type=int, default=4000)
+    replies.add_argument("--batch", default="1,8,64,256,1024")
+    replies.set_defaults(func=bench_replies)
+
+    feedback = subparsers.add_parser("feedback", help="按回复ID评分与旧版线性查找的耗时对比")
+    feedback.add_argument("--docs", type=int, default=300)
+    feedback.add_argument("--doc-len", type=int, default=500)
+    feedback.add_argument("--vocab", type=int, default=20000)
+    feedback.add_argument("--replies", type=int, default=2000)
+    feedback.add_argument("--ratings", type=int, default=2000)
+    feedback.set_defaults(func=bench_feedback)
+
+    feedbacklog = subparsers.add_parser("feedbacklog", help="反馈日志的吞吐量与重放一致性")
+    feedbacklog.add_argument("--docs", type=int, default=300)
+    feedbacklog.add_argument("--doc-len", type=int, default=500)
+    feedbacklog.add_argument("--vocab", type=int, default=20000)
+    feedbacklog.add_argument("--replies", type=int, default=2000)
+    feedbacklog.add_argument("--ratings", type=int, default=20000)
+    feedbacklog.set_defaults(func=bench_feedbacklog)
+
+    policy = subparsers.add_parser("policy", help="select_action 的向量化加速与分布一致性")
+    policy.add_argument("--docs", type=int, default=300)
+    policy.add_argument("--doc-len", type=int, default=500)
+    policy.add_argument("--vocab", type=int, default=20000)
+    policy.add_argument("--calls", type=int, default=2000)
+    policy.add_argument("--sizes", default="5,20,100,1000")
+    policy.set_defaults(func=bench_policy)
+
+    ui = subparsers.add_parser("ui", help="推理线程+结果队列下图形界面主循环的每帧延迟")
+    ui.add_argument("--docs", type=int, default=300)
+    ui.add_argument("--doc-len", type=int, default=500)
+    ui.add_argument("--vocab", type=int, default=20000)
+    ui.add_argument("--messages", type=int, default=50)
+    ui.add_argument("--max-len", type=int, default=200)
+    ui.add_argument("--frame-ms", type=float, default=16)
+    ui.set_defaults(func=bench_ui)
+
+    chart = subparsers.add_parser("chart", help="进度图的重绘速度与帧率合并")
+    chart.add_argument("--points", type=int, default=2000)
+    chart.add_argument("--capacity", type=int, default=50)
+    chart.add_argument("--fps", type=float, default=30)
+    chart.add_argument("--rate", type=float, default=500, help="每秒到达的数据点数")
+    chart.set_defaults(func=bench_chart)
+
+    launch = subparsers.add_parser("launch", help="图形界面的导入耗时、jieba词典缓存与启动各阶段")
+    launch.add_argument("--repeat", type=int, default=3)
+    launch.add_argument("--top", type=int, default=5, help="列出累计导入耗时最多的模块数")
+    launch.set_defaults(func=bench_launch)
+
+    tokenize = subparsers.add_parser("tokenize", help="jieba分词的词表规模与分词缓存的重建加速")
+    tokenize.add_argument("--repeat", type=int, default=20, help="原始文档重复的份数")
+    tokenize.set_defaults(func=bench_tokenize)
+
+    reload = subparsers.add_parser("reload", help="按文档清单增量重新加载文件夹的耗时")
+    reload.add_argument("--docs", type=int, default=2000)
+    reload.add_argument("--doc-len", type=int, default=500)
+    reload.add_argument("--vocab", type=int, default=20000)
+    reload.set_defaults(func=bench_reload)
+
+    args = parser.parse_args()
+    # 合成语料与旧版对照实现都按空白切分
+    set_config("analysis.tokenizer", WhitespaceTokenizer.name)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""ReKo AI 模型评估
+
+在训练集上构建模型，在留出集上计算困惑度、top-k预测准确率和吞吐量，结果以JSON输出，
+便于在性能优化前后对比模型质量。
+
+用法:
+    python scripts/evaluate.py [--corpus sample|synthetic|<目录>] [--holdout 0.1] [--seed N]
+                               [--order N] [--smoothing kneser_ney,add_alpha,none] [--top-k N]
+                               [--docs N] [--doc-len N] [--vocab N] [--tokenizer jieba|whitespace]
+                               [--output 结果.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.evaluation import run_evaluation, split_corpus
+from src.data.synthetic import markov_corpus
+from src.data.tokenizer import get_tokenizer
+from src.utils.file_utils import FileUtils
+
+
+def load_texts(args):
+    """按 --corpus 读取语料：自带示例文档、合成语料或指定目录下的TXT文件"""
+    if args.corpus == "synthetic":
+        return markov_corpus(args.docs, args.doc_len, args.vocab, seed=args.seed)
+    folder = args.corpus
+    if folder == "sample":
+        folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "sample_docs")
+    paths = FileUtils.find_text_files(folder)
+    if not paths:
+        raise SystemExit(f"目录中没有TXT文件: {folder}")
+    texts = (FileUtils.read_text_file(path) for path in paths)
+    return [text for text in texts if text]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ReKo AI 模型评估")
+    parser.add_argument("--corpus", default="sample", help="sample、synthetic 或包含TXT文件的目录")
+    parser.add_argument("--holdout", type=float, default=0.1, help="留出集占文档数的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--order", type=int, default=None, help="n-gram阶数，缺省时读取配置")
+    parser.add_argument("--smoothing", default="kneser_ney,add_alpha", help="逗号分隔的平滑方法")
+    parser.add_argument("--top-k", type=int, default=None)
+    parser.add_argument("--docs", type=int, default=2000, help="合成语料的文档数")
+    parser.add_argument("--doc-len", type=int, default=500, help="合成语料每篇的词数")
+    parser.add_argument("--vocab", type=int, default=20000, help="合成语料的词表大小")
+    parser.add_argument("--tokenizer", default=None,
+                        help="jieba 或 whitespace，缺省时合成语料按空白分词，其余读取配置")
+    parser.add_argument("--output", default=None, help="结果JSON文件，缺省时输出到标准输出")
+    args = parser.parse_args()
+
+    texts = load_texts(args)
+    train, heldout = split_corpus(texts, args.holdout, args.seed)
+    # 合成语料本身以空格分隔，不需要经过jieba
+    tokenizer = args.tokenizer or ("whitespace" if args.corpus == "synthetic" else None)
+    report = run_evaluation(train, heldout, order=args.order,
+                            smoothing=args.smoothing.split(","), k=args.top_k,
+                            tokenizer=get_tokenizer(tokenizer))
+    report['corpus'] = args.corpus if args.corpus in ("sample", "synthetic") else os.path.abspath(args.corpus)
+    report['holdout'] = args.holdout
+    report['seed'] = args.seed
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -50,6 +50,8 @@ setup(
     entry_points={
         'console_scripts': [
             'reko-ai=src.main:main',
+            'reko-ai-cli=src.cli:main',
+            'reko-ai-server=src.server:main',
         ],
     },
     project_urls={
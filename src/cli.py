@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""ReKo AI - 无界面命令行入口
+
+只依赖 core/data/utils，不导入 Tkinter 和 matplotlib，可在没有显示器的服务器上使用。
+predict/reply 从标准输入按行读取，按批处理后以JSONL写到标准输出。
+
+用法:
+    python -m src.cli build [目录] [--snapshot 路径] [--order N] [--chunk-size N]
+    python -m src.cli predict [--snapshot 路径] [--top-k N] [--batch-size N] [--stats]
+    python -m src.cli reply [--snapshot 路径] [--max-len N] [--seed N] [--batch-size N] [--stats]
+"""
+
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+from itertools import islice
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.analyzer import TextAnalyzer
+from src.utils.config import get_config, get_path
+from src.utils.file_utils import FileUtils
+
+
+def default_snapshot_path():
+    """与图形界面共用的默认快照路径"""
+    return os.path.join(get_path("paths.models", "models"), "model.reko")
+
+
+def read_batches(stream, batch_size):
+    """按行读取输入，每次返回至多 batch_size 行（去掉行尾换行符）"""
+    while True:
+        batch = [line.rstrip("\r\n") for line in islice(stream, batch_size)]
+        if not batch:
+            return
+        yield batch
+
+
+def load_analyzer(args):
+    """以只读方式加载模型快照（不加载原文）"""
+    if not os.path.exists(args.snapshot):
+        raise SystemExit(f"模型快照不存在: {args.snapshot}，请先运行 build")
+    analyzer = TextAnalyzer()
+    try:
+        analyzer.load(args.snapshot, with_corpus=False)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    return analyzer
+
+
+def run_batches(args, handle):
+    """逐批处理标准输入并输出JSONL，--stats 时在标准错误输出耗时统计"""
+    ready = time.perf_counter()
+    lines = 0
+    for batch in read_batches(sys.stdin, args.batch_size):
+        records = handle(batch)
+        sys.stdout.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        sys.stdout.flush()
+        lines += len(batch)
+
+    if args.stats:
+        elapsed = time.perf_counter() - ready
+        stats = {
+            'startup_seconds': ready - _START,
+            'lines': lines,
+            'seconds': elapsed,
+            'lines_per_sec': lines / elapsed if elapsed > 0 else 0.0,
+        }
+        print(json.dumps(stats), file=sys.stderr)
+
+
+def cmd_build(args):
+    """流式读取目录下的TXT文件构建模型并保存快照"""
+    paths = FileUtils.find_text_files(args.folder)
+    if not paths:
+        raise SystemExit(f"目录中没有TXT文件: {args.folder}")
+    analyzer = TextAnalyzer()
+    if args.order is not None:
+        analyzer.ngram_order = args.order
+
+    start = time.perf_counter()
+    stats = analyzer.load_stream(FileUtils.iter_documents(paths, args.chunk_size))
+    stats['documents'] = len(paths)
+    stats['build_seconds'] = time.perf_counter() - start
+    analyzer.save(args.snapshot)
+    stats['snapshot'] = args.snapshot
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+def cmd_predict(args):
+    """对每行上下文输出预测的下一个词及其平滑概率"""
+    analyzer = load_analyzer(args)
+    if args.top_k is not None:
+        analyzer.top_k = args.top_k
+
+    def handle(batch):
+        records = []
+        for context in batch:
+            words = analyzer.predict_next(context)
+            scores = analyzer.score_candidates(context, words).tolist() if words else []
+            records.append({'context': context, 'predictions': words, 'scores': scores})
+        return records
+
+    run_batches(args, handle)
+
+
+def cmd_reply(args):
+    """对每行查询输出生成的回复"""
+    analyzer = load_analyzer(args)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    def handle(batch):
+        replies = analyzer.generate_replies(batch, max_len=args.max_len)
+        return [{'query': query, 'reply': reply} for query, reply in zip(batch, replies)]
+
+    run_batches(args, handle)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ReKo AI 命令行（无界面）")
+    parser.add_argument("--log-level", default="WARNING", help="日志级别，日志输出到标准错误")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="从TXT文件构建模型快照")
+    build.add_argument("folder", nargs="?", default=get_path("paths.sample_docs", "resources/sample_docs"))
+    build.add_argument("--snapshot", default=default_snapshot_path())
+    build.add_argument("--order", type=int, default=None, help="n-gram阶数，缺省时读取配置")
+    build.add_argument("--chunk-size", type=int, default=get_config("analysis.stream_chunk_size", 1 << 20))
+    build.set_defaults(func=cmd_build)
+
+    for name, func, help_text in (("predict", cmd_predict, "按行预测下一个词"),
+                                  ("reply", cmd_reply, "按行生成回复")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--snapshot", default=default_snapshot_path())
+        sub.add_argument("--batch-size", type=int, default=256, help="每批读取的行数")
+        sub.add_argument("--stats", action="store_true", help="在标准错误输出启动耗时和吞吐量")
+        sub.set_defaults(func=func)
+    subparsers.choices["predict"].add_argument("--top-k", type=int, default=None)
+    subparsers.choices["reply"].add_argument("--max-len", type=int, default=20)
+    subparsers.choices["reply"].add_argument("--seed", type=int, default=None)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()), stream=sys.stderr,
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,134 +1,507 @@
+import bisect
+import functools
 import random
-from collections import Counter, defaultdict
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, repeat
+
+import numpy as np
+
+from .cache import LRUCache
+from .feedback_log import FeedbackLog
+from .ngram_store import NgramStore, Vocabulary
+from .snapshot import load_snapshot, save_snapshot
+from .state import KeySpace, ModelState, RewardTable, Session
+from ..data.tokenizer import create_tokenizer, get_tokenizer
 from ..utils.config import get_config
 
+# 候选数超过该值时 _select 改用数组版本的 _choose_array，两者结果逐位一致；
+# 默认 top_k=5 的候选集不会用到，只在调用方传入大量候选时生效
+_VECTOR_MIN_ACTIONS = 32
+
+
+def _synchronized(method):
+    """写操作（重建、增量更新、奖励更新）之间串行执行，读操作不加锁"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class TextAnalyzer:
-    """文本分析器，处理文本统计和词语预测"""
+    """文本分析器，处理文本统计和词语预测
+
+    读操作（预测、打分、生成回复）每次调用开始时取得当前的只读模型状态，
+    写操作完成后整体替换，因此可以在多个线程中并发读取，同时在后台重建模型。
+    对话相关的强化学习状态按会话（Session）分开保存，奖励表在写锁内原地更新。
+    """
     
     def __init__(self):
-        self.corpus = []
-        self.bigram_counts = defaultdict(Counter)
-        self.trigram_counts = defaultdict(Counter)
-        self.vocabulary = set()
-        self.word_counts = Counter()
+        self.corpus = {}
+        self._next_doc_id = 0
+        # 文档清单的标识，由按清单增量加载文档的调用方设置，随快照保存，用于核对清单与模型是否一致
+        self.manifest_id = None
+        self._write_lock = threading.RLock()
+        # n-gram阶数，至少为2（一元组之外至少需要一层上下文）
+        self.ngram_order = max(2, int(get_config("analysis.ngram_order", 3)))
+        self._model = ModelState(NgramStore.empty(order=self.ngram_order), 0)
         self.is_ready = False
-        
-        # 强化学习相关参数
-        self.reply_history = []
-        self.action_counts = defaultdict(Counter)
-        self.rewards = defaultdict(float)
+        # 上次保存或加载快照时的 (模型版本, 奖励表版本)，以及当前模型是否可能引用快照的内存映射
+        self._saved_versions = None
+        self._mapped = False
+        # 分词器：文档用 tokenize_document（可缓存），查询和上下文用 tokenize；
+        # 内部的上下文状态是以空格连接的词，直接按空白切分即可还原
+        self.tokenizer = get_tokenizer()
         
         # 从配置文件获取强化学习参数
         self.learning_rate = get_config("reinforcement_learning.learning_rate", 0.1)
         self.discount_factor = get_config("reinforcement_learning.discount_factor", 0.9)
-        self.epsilon = get_config("reinforcement_learning.exploration_rate", 0.1)
         self.epsilon_decay = 0.995
         self.min_epsilon = 0.05
+        
+        # 强化学习相关状态：奖励表为各会话共享，未指定会话时使用默认会话
+        # 奖励表和动作计数都以 (上下文, 词) 的整数键索引，编码表由它们共用
+        self._keys = KeySpace()
+        self._rewards = RewardTable(self._keys)
+        self.session = self.new_session()
+        # 反馈日志，挂载后默认会话和奖励表的变化都会持久化
+        self.feedback_log = None
+        
+        # 预测时返回的候选词数量
+        self.top_k = get_config("analysis.prediction_top_k", 5)
+        # 批量生成回复时，少于该数量的查询逐条生成（批很小时同步推进的固定开销超过收益）
+        self.batch_reply_min_size = get_config("analysis.batch_reply_min_size", 64)
+        # 构建模型时使用的进程数，1为单进程
+        self.build_workers = get_config("analysis.build_workers", 1)
+        # 流式构建时每批统计的词数
+        self.stream_batch_tokens = get_config("analysis.stream_batch_tokens", 1000000)
+        # 预测结果缓存，0为不缓存
+        self.cache = LRUCache(get_config("analysis.prediction_cache_size", 4096))
+        # 概率平滑方法：none / add_alpha / kneser_ney
+        self.smoothing = get_config("analysis.smoothing_method", "kneser_ney")
+        self.smoothing_alpha = get_config("analysis.smoothing_alpha", 0.1)
+    
+    def new_session(self):
+        """创建一个新的对话会话，探索率取配置中的初始值"""
+        return Session(self._keys, get_config("reinforcement_learning.exploration_rate", 0.1))
+    
+    @property
+    def model(self):
+        """当前的只读模型状态"""
+        return self._model
+    
+    @property
+    def store(self):
+        """当前的n-gram存储"""
+        return self._model.store
+    
+    @store.setter
+    def store(self, store):
+        # 每次替换模型都更新版本号，旧的缓存条目随之失效
+        self._model = ModelState(store, self._model.version + 1)
+        # 模型已变化，与文档清单的对应关系由清单同步完成后重新设置
+        self.manifest_id = None
+    
+    @property
+    def rewards(self):
+        """当前的奖励表"""
+        return self._rewards
+    
+    @property
+    def reply_history(self):
+        return self.session.reply_history
     
-    def load_corpus(self, texts):
+    @property
+    def action_counts(self):
+        return self.session.action_counts
+    
+    @property
+    def epsilon(self):
+        return self.session.epsilon
+    
+    @epsilon.setter
+    def epsilon(self, value):
+        self.session.epsilon = value
+    
+    @property
+    def vocabulary(self):
+        """当前语料中出现过的词语集合"""
+        words = self.store.vocab.words
+        return {words[i] for i in np.flatnonzero(self.store.unigram_counts)}
+    
+    @_synchronized
+    def load_corpus(self, texts, doc_ids=None):
         """加载语料库并构建统计信息"""
-        self.corpus = texts
+        if doc_ids is None:
+            doc_ids = range(len(texts))
+        self.corpus = dict(zip(doc_ids, texts))
+        self._next_doc_id = len(texts)
         
-        # 重置统计信息
-        self.bigram_counts = defaultdict(Counter)
-        self.trigram_counts = defaultdict(Counter)
-        self.vocabulary = set()
-        self.word_counts = Counter()
+        # 将词语转换为整数ID后统一构建n-gram统计
+        if self.build_workers > 1 and len(texts) > 1:
+            self.store = self._build_parallel(list(texts), order=self.ngram_order)
+        else:
+            vocab = Vocabulary()
+            docs = [vocab.encode(self.tokenizer.tokenize_document(text), add=True) for text in texts]
+            self.store = NgramStore.from_token_ids(vocab, docs, order=self.ngram_order, top_k=self.top_k)
         
-        # 处理每个文本，构建n-gram统计
-        for text in texts:
-            words = text.split()
-            if not words:
-                continue
-            
-            self.vocabulary.update(words)
-            self.word_counts.update(words)
+        self.is_ready = True
+        return self.get_stats()
+    
+    @property
+    def scorer(self):
+        """当前模型的平滑打分器，模型或平滑参数变化后首次使用时重建"""
+        return self._model.scorer(self.smoothing, self.smoothing_alpha)
+    
+    def _build_parallel(self, texts, order):
+        """多进程分片分词、统计后归并，结果与单进程构建完全一致
+
+        分词（jieba时是最耗时的一步）也在子进程中进行，子进程按名称和缓存目录重建同样的分词器，
+        共用磁盘上的分词缓存。
+        """
+        shards = _split_shards(texts, self.build_workers * 4)
+        tokenizer = self.tokenizer
+        with ProcessPoolExecutor(max_workers=self.build_workers) as executor:
+            partials = list(executor.map(_count_shard, shards, repeat(order),
+                                         repeat(tokenizer.name), repeat(tokenizer.cache_dir)))
+        
+        # 按分片顺序合并局部词表，保持与顺序扫描相同的词ID分配
+        vocab = Vocabulary()
+        stores = []
+        for part in partials:
+            mapping = vocab.encode(part.vocab.words, add=True)
+            stores.append(part.remap_words(mapping, vocab))
+        merged = NgramStore.merge_all(stores)
+        
+        unigram_counts = np.zeros(len(vocab), dtype=np.int64)
+        unigram_counts[:len(merged.unigram_counts)] = merged.unigram_counts
+        return NgramStore(vocab, unigram_counts, merged.tables, order, self.top_k)
+    
+    @_synchronized
+    def add_documents(self, texts, doc_ids=None):
+        """增量加入文档，只统计新文档并合并到现有模型
+
+        doc_ids 缺省时按顺序自动编号；已存在的ID视为替换原文档。
+        """
+        if doc_ids is None:
+            doc_ids = range(self._next_doc_id, self._next_doc_id + len(texts))
+        doc_ids = list(doc_ids)
+        self._next_doc_id = max([self._next_doc_id] + [i + 1 for i in doc_ids if isinstance(i, int)])
+        
+        replaced = [i for i in doc_ids if i in self.corpus]
+        if replaced:
+            self.remove_documents(replaced)
+        
+        # 在词表副本上追加新词，正在使用旧模型的调用不受影响
+        vocab = self.store.vocab.copy()
+        docs = [vocab.encode(self.tokenizer.tokenize_document(text), add=True) for text in texts]
+        delta = NgramStore.from_token_ids(vocab, docs, order=self.store.order, top_k=0)
+        self.store = self.store.merge(delta)
+        self.corpus.update(zip(doc_ids, texts))
+        
+        self.is_ready = True
+        return self.get_stats()
+    
+    @_synchronized
+    def load_stream(self, chunks):
+        """从 (文档ID, 文本块) 流构建模型，不在内存中保留原文"""
+        return self.load_token_stream(self._tokenize_chunks(chunks))
+    
+    @_synchronized
+    def add_stream(self, chunks):
+        """增量消费 (文档ID, 文本块) 流，同一文档的块需连续出现
+
+        流式加入的文档不保留原文，之后不能用 remove_documents 扣除。
+        """
+        return self.add_token_stream(self._tokenize_chunks(chunks))
+    
+    def _tokenize_chunks(self, chunks):
+        for doc_id, chunk in chunks:
+            yield doc_id, self.tokenizer.tokenize_document(chunk)
+    
+    @_synchronized
+    def load_token_stream(self, chunks):
+        """从 (文档ID, 词列表) 流构建模型"""
+        self.corpus = {}
+        self._next_doc_id = 0
+        self.store = NgramStore.empty(order=self.ngram_order, top_k=self.top_k)
+        return self.add_token_stream(chunks)
+    
+    @_synchronized
+    def add_token_stream(self, chunks):
+        """增量消费已分词的 (文档ID, 词列表) 流，同一文档的块需连续出现
+
+        每累计 stream_batch_tokens 个词统计一批并按大小分层归并，内存占用与语料总量无关。
+        上一块末尾的 order-1 个词作为下一块的上下文，跨块的n-gram不会丢失。
+        这样加入的文档不保留原文，扣除时需用 subtract_token_streams 提供其完整的词列表。
+        """
+        order = self.store.order
+        vocab = self.store.vocab.copy()
+        pending = []
+        batch, skips, batch_tokens = [], [], 0
+        doc_id, carry = None, np.zeros(0, dtype=np.int64)
+        
+        for chunk_doc_id, words in chunks:
+            if chunk_doc_id != doc_id:
+                doc_id, carry = chunk_doc_id, np.zeros(0, dtype=np.int64)
+                if doc_id in self.corpus:
+                    self.remove_documents([doc_id])
             
-            # 构建二元组和三元组统计
-            for i in range(len(words) - 1):
-                self.bigram_counts[words[i]][words[i + 1]] += 1
+            ids = vocab.encode(words, add=True)
+            if not len(ids):
+                continue
+            batch.append(np.concatenate([carry, ids]))
+            skips.append(len(carry))
+            carry = batch[-1][-(order - 1):]
+            self.corpus[doc_id] = None
             
-            for i in range(len(words) - 2):
-                key = (words[i], words[i + 1])
-                self.trigram_counts[key][words[i + 2]] += 1
+            batch_tokens += len(ids)
+            if batch_tokens >= self.stream_batch_tokens:
+                _push_merge(pending, NgramStore.from_token_ids(vocab, batch, order, top_k=0, skips=skips))
+                batch, skips, batch_tokens = [], [], 0
+        
+        if batch:
+            _push_merge(pending, NgramStore.from_token_ids(vocab, batch, order, top_k=0, skips=skips))
+        if pending:
+            self.store = self.store.merge(NgramStore.merge_all(pending))
         
         self.is_ready = True
+        return self.get_stats()
+    
+    @_synchronized
+    def remove_documents(self, doc_ids):
+        """从模型中扣除指定文档的统计信息，未知的ID会被忽略"""
+        detached = [i for i in doc_ids if i in self.corpus and self.corpus[i] is None]
+        if detached:
+            raise ValueError(f"文档原文未保留，无法扣除: {detached[:5]}")
+        texts = [self.corpus.pop(i) for i in doc_ids if i in self.corpus]
+        if texts:
+            vocab = self.store.vocab
+            docs = [vocab.encode(self.tokenizer.tokenize_document(text)) for text in texts]
+            delta = NgramStore.from_token_ids(vocab, docs, order=self.store.order, top_k=0)
+            self.store = self.store.merge(delta, sign=-1)
+        return self.get_stats()
+    
+    @_synchronized
+    def subtract_token_streams(self, docs):
+        """从模型中扣除 [(文档ID, 完整词列表), ...] 的统计信息，用于不保留原文的文档"""
+        docs = list(docs)
+        if docs:
+            vocab = self.store.vocab
+            delta = NgramStore.from_token_ids(vocab, [vocab.encode(words) for _, words in docs],
+                                              order=self.store.order, top_k=0)
+            self.store = self.store.merge(delta, sign=-1)
+            for doc_id, _ in docs:
+                self.corpus.pop(doc_id, None)
+        return self.get_stats()
+    
+    @_synchronized
+    def save(self, path):
+        """保存模型快照（词表、n-gram数组、语料和强化学习奖励表）"""
+        meta = {
+            'next_doc_id': self._next_doc_id,
+            'tokenizer': self.tokenizer.name,
+            'manifest_id': self.manifest_id,
+            'epsilon': self.epsilon,
+            'rewards': [[state, action, value] for (state, action), value in self.rewards.items()],
+            'action_counts': self.session.counts_by_context(),
+        }
+        if self._mapped:
+            # 先把引用快照内存映射的数组复制到内存，映射随旧模型释放后才能替换快照文件（Windows上）；
+            # 内容不变，版本号保持不变
+            self._model = ModelState(self.store.to_memory(), self._model.version)
+            self._mapped = False
+        save_snapshot(path, self.store, self.corpus, meta)
+        self._saved_versions = (self._model.version, self._rewards.version)
+    
+    @property
+    def has_unsaved_changes(self):
+        """模型在上次保存或加载快照之后是否有变化
+
+        挂载了反馈日志时奖励已由日志持久化，不计入；否则奖励表的变化也需要保存快照。
+        """
+        if not self.is_ready:
+            return False
+        if self._saved_versions is None:
+            return True
+        model_version, rewards_version = self._saved_versions
+        if self._model.version != model_version:
+            return True
+        return self.feedback_log is None and self._rewards.version != rewards_version
+    
+    @_synchronized
+    def load(self, path, with_corpus=True):
+        """从快照加载模型，n-gram数组以只读内存映射方式打开
+
+        with_corpus=False 时不加载原文，适合只读推理；此时无法删除快照中的文档。
+        """
+        store, corpus, meta = load_snapshot(path, with_corpus=with_corpus)
+        # 分词方式不同的模型词表不兼容，需要重新构建（早期的快照按空白分词）
+        tokenizer = meta.get('tokenizer', "whitespace")
+        if tokenizer != self.tokenizer.name:
+            raise ValueError(f"快照 {path} 按 {tokenizer} 分词，与当前的 {self.tokenizer.name} 不一致，请重新构建")
+        self.store = store
+        self.corpus = corpus
+        self._next_doc_id = meta.get('next_doc_id', len(corpus))
+        self.manifest_id = meta.get('manifest_id')
+        # 挂载了反馈日志时以日志中的强化学习状态为准
+        if self.feedback_log is None:
+            rewards = (((state, action), value) for state, action, value in meta.get('rewards', []))
+            self._rewards = RewardTable(self._keys, rewards, version=self._rewards.version + 1)
+            # 快照中的探索率和动作计数恢复到默认会话
+            self.session.epsilon = meta.get('epsilon', self.session.epsilon)
+            self.session.action_counts = {}
+            for state, counts in meta.get('action_counts', {}).items():
+                for action, count in counts.items():
+                    self.session.count_action(state, action, count)
         
-        stats = {
-            'vocab_size': len(self.vocabulary),
-            'total_words': sum(self.word_counts.values()),
-            'bigram_pairs': len(self.bigram_counts),
-            'trigram_pairs': len(self.trigram_counts)
+        self._mapped = True
+        self._saved_versions = (self._model.version, self._rewards.version)
+        self.is_ready = True
+        return self.get_stats()
+    
+    @_synchronized
+    def attach_feedback_log(self, directory):
+        """把奖励表和默认会话的强化学习状态持久化到目录中的反馈日志
+
+        目录中已有记录时重放日志，替换当前的奖励表和默认会话；否则以当前状态作为起点。
+        """
+        self.close_feedback_log()
+        log = FeedbackLog(directory, self._keys,
+                          flush_interval=get_config("reinforcement_learning.feedback_flush_ms", 200) / 1000,
+                          compact_events=get_config("reinforcement_learning.feedback_compact_events", 20000))
+        state = log.load(self.session.epsilon)
+        if state is not None:
+            rewards, self.session = state
+            rewards.version = self._rewards.version + 1
+            self._rewards = rewards
+        log.start(self._rewards, self.session)
+        self.feedback_log = log
+        return {'rewards': len(self._rewards), 'replies': len(self.session.replies), 'epsilon': self.session.epsilon}
+    
+    def close_feedback_log(self):
+        """写完缓冲的反馈事件并关闭日志"""
+        log, self.feedback_log = self.feedback_log, None
+        if log is not None:
+            log.close()
+    
+    def _record_reply(self, session, query, reply, states):
+        """在会话中记录回复，默认会话的回复同时写入反馈日志"""
+        reply_id = session.record(query, reply, states)
+        log = self.feedback_log
+        if log is not None and session is self.session:
+            log.log_reply(reply_id, query, reply, states, session.epsilon)
+        return reply_id
+    
+    def get_stats(self):
+        """返回当前模型的统计信息"""
+        store = self.store
+        tables = store.tables
+        return {
+            'vocab_size': store.vocab_size,
+            'total_words': store.total_words,
+            'ngram_order': store.order,
+            'bigram_pairs': tables[2].num_contexts,
+            'trigram_pairs': tables[3].num_contexts if 3 in tables else 0,
+            'ngram_contexts': {n: table.num_contexts for n, table in tables.items()},
+            'cache_hit_rate': self.cache.hit_rate
         }
-        return stats
     
     def predict_next(self, context):
         """预测下一个词"""
         if not self.is_ready:
             return []
+        return self._predict(self._model, " ".join(self.tokenizer.tokenize(context)))
+    
+    def _predict(self, model, context):
+        """在给定的模型状态上预测，结果按模型版本缓存"""
+        store = model.store
+        # 以上下文末尾词的ID为键，空白差异和未登录词不影响命中
+        ids = [store.vocab.lookup(w) for w in context.split()[-(store.order - 1):]]
+        key = ('predict', self.top_k, tuple(ids))
+        cached = self.cache.get(key, model.version)
+        if cached is None:
+            cached = self._predict_ids(store, ids)
+            self.cache.put(key, model.version, cached)
+        return list(cached)
+    
+    def _predict_ids(self, store, ids):
+        """按词ID上下文查表预测"""
+        # 从最长的上下文逐级回退，都没有时用全局常见词
+        table, row = store.backoff_row(ids)
+        if row >= 0:
+            return store.vocab.decode(table.top_successors(row, self.top_k))
         
-        words = context.split()
-        if not words:
-            return [word for word, _ in self.word_counts.most_common(5)]
-        
-        # 优先用三元组预测，其次二元组，最后全局常见词
-        if len(words) >= 2:
-            trigram_key = (words[-2], words[-1])
-            if trigram_key in self.trigram_counts and self.trigram_counts[trigram_key]:
-                return [word for word, _ in self.trigram_counts[trigram_key].most_common(5)]
-        
-        if len(words) >= 1:
-            last_word = words[-1]
-            if last_word in self.bigram_counts and self.bigram_counts[last_word]:
-                return [word for word, _ in self.bigram_counts[last_word].most_common(5)]
-        
-        return [word for word, _ in self.word_counts.most_common(5)]
+        return store.vocab.decode(store.top_unigrams(self.top_k))
+    
+    def score_candidates(self, context, candidates):
+        """返回各候选词在给定上下文下的平滑概率（numpy数组，与 candidates 顺序一致）"""
+        return self._score(self._model, " ".join(self.tokenizer.tokenize(context)), candidates)
+    
+    def _score(self, model, context, candidates):
+        vocab = model.store.vocab
+        context_ids = [vocab.lookup(w) for w in context.split()]
+        scorer = model.scorer(self.smoothing, self.smoothing_alpha)
+        return scorer.score(context_ids, vocab.encode(candidates))
     
-    def generate_reply(self, query, max_len=20):
-        """生成回复文本"""
+    def generate_reply(self, query, max_len=20, session=None, rng=None, on_token=None):
+        """生成回复文本
+
+        session 为 None 时使用默认会话；rng 为抽样用的随机数源（需提供 random() 方法），
+        缺省时使用 random 模块。整条回复都基于调用开始时的同一个模型版本。
+        on_token 不为 None 时，每生成一个词调用 on_token(词, 选中的概率)，用于显示生成进度。
+        回复记录在会话中，其ID为 session.last_reply_id，评分时传给 reward_reply。
+        """
+        session = session or self.session
         if not self.is_ready:
+            # 未生成的回复没有ID，不能评分
+            session.last_reply_id = None
             return "抱歉，我还没有准备好。请先加载技术文档。"
+        rng = rng or random
+        model = self._model
         
         # 从查询开始构建回复
-        words = query.split()
+        words = self.tokenizer.tokenize(query)
         reply = words.copy()
         
         # 记录对话状态
         dialog_states = []
         
         # 生成回复直到达到最大长度
+        context_len = model.store.order - 1
         while len(reply) < max_len:
-            # 获取当前上下文
-            if len(reply) >= 2:
-                context = " ".join(reply[-2:])
-            else:
-                context = " ".join(reply)
+            # 获取当前上下文（最近的 order-1 个词）
+            context = " ".join(reply[-context_len:])
             
             # 预测下一个词
-            candidates = self.predict_next(context)
+            candidates = self._predict(model, context)
             if not candidates:
                 break
             
             # 选择下一个词
-            next_word, prob = self.select_action(context, candidates)
+            next_word, prob = self._select(model, session, context, candidates, rng)
             
             # 记录状态
             dialog_states.append((context, next_word, prob))
-            self.action_counts[context][next_word] += 1
+            session.count_action(context, next_word)
             
             # 避免重复词
             if next_word not in reply[-3:] and next_word not in [",", "。", "！", "？"] * 2:
                 reply.append(next_word)
+                if on_token is not None:
+                    on_token(next_word, prob)
             else:
                 # 尝试其他候选词
                 if len(candidates) > 1:
                     other_candidates = [w for w in candidates if w != next_word]
                     if other_candidates:
-                        next_word, prob = self.select_action(context, other_candidates)
+                        next_word, prob = self._select(model, session, context, other_candidates, rng)
                         dialog_states.append((context, next_word, prob))
-                        self.action_counts[context][next_word] += 1
+                        session.count_action(context, next_word)
                         reply.append(next_word)
+                        if on_token is not None:
+                            on_token(next_word, prob)
                     else:
                         break
                 else:
@@ -142,123 +515,383 @@ class TextAnalyzer:
         if reply and reply[-1] not in ["。", "！", "？"]:
             reply.append("。")
         
-        # 保存对话历史
+        # 保存对话记录，回复ID可通过 session.last_reply_id 取得
         final_reply = " ".join(reply)
-        self.reply_history.append((query, final_reply, dialog_states))
-        
-        # 限制历史记录长度
-        if len(self.reply_history) > 1000:
-            self.reply_history = self.reply_history[-1000:]
+        self._record_reply(session, query, final_reply, dialog_states)
         
         return final_reply
     
-    def select_action(self, state, actions):
-        """选择动作 - 强化学习策略"""
-        # 探索：随机选一个
-        if random.random() < self.epsilon:
-            action = random.choice(actions)
-            prob = 1.0 / len(actions)
-            return action, prob
+    def generate_replies(self, queries, max_len=20, session=None, seeds=None):
+        """批量生成回复：所有序列同步推进，每一步对整批一起查找候选、打分和加权抽样
+
+        第i条回复使用以 seeds[i] 初始化的独立随机数流，结果与在批开始时的会话状态下调用
+        generate_reply(queries[i], rng=random.Random(seeds[i])) 相同；seeds 缺省时从 random 模块取得。
+        动作计数、回复历史和探索率在整批结束后按查询顺序写回会话。
+        查询数少于 batch_reply_min_size 时依次调用 generate_reply，每条回复都能看到前面回复对会话的更新。
+        """
+        queries = list(queries)
+        if not self.is_ready:
+            return ["抱歉，我还没有准备好。请先加载技术文档。"] * len(queries)
+        if seeds is None:
+            seeds = [random.getrandbits(64) for _ in queries]
+        rngs = [random.Random(seed) for seed in seeds]
+        if len(queries) < self.batch_reply_min_size:
+            return [self.generate_reply(query, max_len=max_len, session=session, rng=rng)
+                    for query, rng in zip(queries, rngs)]
+        return self._generate_batch(self._model, session or self.session, queries, max_len, rngs)
+    
+    def _generate_batch(self, model, session, queries, max_len, rngs):
+        store = model.store
+        vocab = store.vocab
+        scorer = model.scorer(self.smoothing, self.smoothing_alpha)
+        rewards = self._rewards
+        space = self._keys
+        context_len = store.order - 1
         
-        # 利用：基于Q值选择
-        q_values = []
+        replies = [self.tokenizer.tokenize(query) for query in queries]
+        reply_ids = [[vocab.lookup(w) for w in reply] for reply in replies]
+        dialog_states = [[] for _ in queries]
+        # 每条回复只看到批开始时的会话计数加上自己新增的计数 {上下文ID: {整数键: 次数}}
+        new_counts = [{} for _ in queries]
+        epsilons = np.full(len(queries), session.epsilon)
+        exploits = 0
         
-        # 计算每个动作的Q值
-        for act in actions:
-            # 历史奖励
-            reward = self.rewards.get((state, act), 0)
+        active = [i for i, reply in enumerate(replies) if len(reply) < max_len]
+        while active:
+            # 当前上下文（最近的 order-1 个词），不足时左侧以-1填充
+            context_ids = np.full((len(active), context_len), -1, dtype=np.int64)
+            lengths = np.zeros(len(active), dtype=np.int64)
+            for row, i in enumerate(active):
+                tail = reply_ids[i][-context_len:]
+                context_ids[row, context_len - len(tail):] = tail
+                lengths[row] = len(tail)
+            rows = store.context_rows(context_ids)
+            candidates = self._candidate_matrix(store, rows, len(active))
+            valid = candidates >= 0
             
-            # 基础值：基于统计频率
-            base_val = 0
-            words = state.split()
+            # 没有候选词的序列直接结束
+            keep = valid.any(axis=1)
+            if not keep.all():
+                active = [i for i, k in zip(active, keep) if k]
+                rows = {n: r[keep] for n, r in rows.items()}
+                lengths, candidates, valid = lengths[keep], candidates[keep], valid[keep]
+                if not active:
+                    break
+            contexts = [" ".join(replies[i][-context_len:]) for i in active]
+            context_ids = [space.context_id(context, add=True) for context in contexts]
+            
+            # 动作值 = 平滑概率 × (1 + 历史奖励)，再加上多样性奖励所需的计数
+            keys = self._key_matrix(vocab, context_ids, candidates)
+            values = scorer.score_rows(rows, lengths, candidates)
+            if rewards:
+                values = values * (1 + _lookup_matrix(rewards.get, keys))
+            counts = self._count_matrix(session, new_counts, active, context_ids, keys)
             
-            # 优先用三元组
-            if len(words) >= 2:
-                key = tuple(words[-2:])
-                if key in self.trigram_counts:
-                    total = sum(self.trigram_counts[key].values())
-                    if total > 0:
-                        base_val = self.trigram_counts[key].get(act, 0) / total
-            # 其次用二元组
-            elif words:
-                last_word = words[-1]
-                if last_word in self.bigram_counts:
-                    total = sum(self.bigram_counts[last_word].values())
-                    if total > 0:
-                        base_val = self.bigram_counts[last_word].get(act, 0) / total
+            batch = np.array(active)
+            draws = np.array([[rngs[i].random(), rngs[i].random()] for i in active])
+            cols, probs, exploited = _choose(values, counts, valid, epsilons[batch], draws)
+            epsilons[batch] = np.where(exploited, np.maximum(self.min_epsilon, epsilons[batch] * self.epsilon_decay),
+                                       epsilons[batch])
+            exploits += int(exploited.sum())
+            
+            retry = []
+            finished = set()
+            for row, i in enumerate(active):
+                word_id = int(candidates[row, cols[row]])
+                word = vocab.words[word_id]
+                dialog_states[i].append((contexts[row], word, float(probs[row])))
+                mine = new_counts[i].setdefault(context_ids[row], {})
+                key = int(keys[row, cols[row]])
+                mine[key] = mine.get(key, 0) + 1
+                # 避免重复词，否则从其他候选词中再选一次
+                if word not in replies[i][-3:] and word not in [",", "。", "！", "？"]:
+                    replies[i].append(word)
+                    reply_ids[i].append(word_id)
+                    if word in ["。", "！", "？"] or len(replies[i]) >= max_len:
+                        finished.add(i)
+                elif valid[row].sum() > 1:
+                    retry.append(row)
+                else:
+                    finished.add(i)
             
-            # 多样性奖励：避免总选同一个
-            count = self.action_counts[state].get(act, 0) + 1
-            diversity = 0.1 / count
+            if retry:
+                retry = np.array(retry)
+                others = valid[retry]
+                others[np.arange(len(retry)), cols[retry]] = False
+                retry_batch = batch[retry]
+                draws = np.array([[rngs[i].random(), rngs[i].random()] for i in retry_batch])
+                cols, probs, exploited = _choose(values[retry], counts[retry], others, epsilons[retry_batch], draws)
+                epsilons[retry_batch] = np.where(
+                    exploited, np.maximum(self.min_epsilon, epsilons[retry_batch] * self.epsilon_decay),
+                    epsilons[retry_batch])
+                exploits += int(exploited.sum())
+                for row, i, col, prob in zip(retry, retry_batch, cols, probs):
+                    word_id = int(candidates[row, col])
+                    word = vocab.words[word_id]
+                    dialog_states[i].append((contexts[row], word, float(prob)))
+                    mine = new_counts[i].setdefault(context_ids[row], {})
+                    key = int(keys[row, col])
+                    mine[key] = mine.get(key, 0) + 1
+                    replies[i].append(word)
+                    reply_ids[i].append(word_id)
+                    if word in ["。", "！", "？"] or len(replies[i]) >= max_len:
+                        finished.add(i)
             
-            # 综合Q值
-            q_val = base_val * (1 + reward) + diversity
-            q_values.append((q_val, act))
+            active = [i for i in active if i not in finished]
+        
+        # 按查询顺序写回会话
+        for _ in range(exploits):
+            session.epsilon = max(self.min_epsilon, session.epsilon * self.epsilon_decay)
+        results = []
+        action_counts = session.action_counts
+        for query, reply, states, counts in zip(queries, replies, dialog_states, new_counts):
+            if reply and reply[-1] not in ["。", "！", "？"]:
+                reply.append("。")
+            final_reply = " ".join(reply)
+            for mine in counts.values():
+                for key, count in mine.items():
+                    action_counts[key] = action_counts.get(key, 0) + count
+            self._record_reply(session, query, final_reply, states)
+            results.append(final_reply)
+        return results
+    
+    def _candidate_matrix(self, store, rows, size):
+        """批量版 _predict_ids：每行取存在的最长上下文的前 top_k 个后继词ID，不足时以-1填充"""
+        k = self.top_k
+        candidates = np.full((size, k), -1, dtype=np.int64)
+        unigrams = store.top_unigrams(k)
+        candidates[:, :len(unigrams)] = unigrams
+        # 由短到长覆盖，每行最终使用存在的最长上下文
+        for n in sorted(rows):
+            table = store.tables[n]
+            idx = np.flatnonzero(rows[n] >= 0)
+            if k <= table.topk.shape[1]:
+                candidates[idx] = table.topk[rows[n][idx], :k]
+                continue
+            for row in idx:
+                successors = table.top_successors(rows[n][row], k)
+                candidates[row] = -1
+                candidates[row, :len(successors)] = successors
+        return candidates
+    
+    def _key_matrix(self, vocab, context_ids, candidates):
+        """各 (上下文, 候选词) 的整数键，形状同 candidates，无效候选为负数"""
+        space = self._keys
+        # 每个不同的候选词只换算一次ID
+        unique, inverse = np.unique(candidates, return_inverse=True)
+        word_ids = np.array([space.word_id(vocab.words[w], add=True) if w >= 0 else -1 for w in unique.tolist()],
+                            dtype=np.int64)
+        return (np.array(context_ids, dtype=np.int64)[:, None] << 32) | word_ids[inverse.reshape(candidates.shape)]
+    
+    def _count_matrix(self, session, new_counts, active, context_ids, keys):
+        """各候选词在对应上下文下已被选择的次数加1，形状同 keys"""
+        get = session.action_counts.get
+        counts = []
+        for row, i, context_id in zip(keys.tolist(), active, context_ids):
+            mine = new_counts[i].get(context_id)
+            if mine:
+                counts.extend([get(key, 0) + mine.get(key, 0) for key in row])
+            else:
+                counts.extend(map(get, row, repeat(0)))
+        return np.array(counts, dtype=np.float64).reshape(keys.shape) + 1
+    
+    def select_action(self, state, actions, session=None):
+        """选择动作 - 强化学习策略"""
+        return self._select(self._model, session or self.session, state, actions)
+    
+    def _select(self, model, session, state, actions, rng=random):
+        # 统计概率与历史奖励部分只随模型、平滑方法和奖励表变化，可以缓存（连同各动作的整数键）
+        key = ('action', state, tuple(actions))
+        rewards = self._rewards
+        version = (model.version, rewards.version, self.smoothing, self.smoothing_alpha)
+        entry = self.cache.get(key, version)
+        if entry is None:
+            keys = self._keys.keys(state, actions)
+            values = self._action_values(model, rewards, state, actions, keys)
+            # 候选较少时逐个计算比构造数组更快
+            entry = (values if len(actions) > _VECTOR_MIN_ACTIONS else values.tolist(), keys)
+            self.cache.put(key, version, entry)
+        values, keys = entry
         
-        # 按Q值排序
-        q_values.sort(reverse=True, key=lambda x: x[0])
+        # 多样性奖励：避免总选同一个
+        get = session.action_counts.get
         
-        # 计算权重
-        total = sum(q[0] for q in q_values)
-        if total == 0:
-            # 如果都是0，就平均分配
-            weights = [1.0 / len(q_values)] * len(q_values)
+        # 与批量生成的 _choose 逻辑相同，每次选择固定消耗两个随机数
+        explore_draw, pick_draw = rng.random(), rng.random()
+        if len(actions) > _VECTOR_MIN_ACTIONS:
+            counts = np.fromiter(map(get, keys, repeat(0)), dtype=np.float64, count=len(keys)) + 1
+            col, prob, exploited = _choose_array(values, counts, session.epsilon, explore_draw, pick_draw)
         else:
-            weights = [q[0] / total for q in q_values]
+            counts = [get(k, 0) + 1 for k in keys]
+            col, prob, exploited = _choose_one(values, counts, session.epsilon, explore_draw, pick_draw)
+        if exploited:
+            # 衰减探索率
+            session.epsilon = max(self.min_epsilon, session.epsilon * self.epsilon_decay)
+        
+        return actions[col], prob
+    
+    def _action_values(self, model, rewards, state, actions, keys):
+        """计算各动作的 平滑概率 × (1 + 历史奖励)"""
+        # 基础值：所有候选词一次打分
+        base_vals = self._score(model, state, actions)
+        if not rewards:
+            return base_vals
+        # 历史奖励
+        rewards = np.fromiter(map(rewards.get, keys, repeat(0)), dtype=np.float64, count=len(keys))
+        return base_vals * (1 + rewards)
+    
+    def update_reward(self, query, reply, reward, session=None):
+        """按 (查询, 回复) 更新奖励，等同于对该回复最近一次记录调用 reward_reply"""
+        session = session or self.session
+        reply_id = session.find_reply(query, reply)
+        if reply_id is None:
+            return False
+        return self.reward_reply(reply_id, reward, session)
+    
+    @_synchronized
+    def reward_reply(self, reply_id, reward, session=None):
+        """按回复ID更新奖励 - 强化学习反馈
+
+        耗时只与该回复的长度有关；回复ID不存在（已超出历史容量）时返回 False。
+        """
+        session = session or self.session
+        record = session.replies.get(reply_id)
+        if record is None:
+            return False
+        _, _, dialog = record
+        rewards = self._rewards
         
-        # 选择动作
-        action_list = [q[1] for q in q_values]
-        chosen = random.choices(action_list, weights=weights, k=1)[0]
+        # 从后往前更新奖励
+        current_reward = reward
         
-        # 找到对应的概率
-        idx = action_list.index(chosen)
-        prob = weights[idx]
+        # 动态调整学习率
+        lr = self.learning_rate
+        if abs(reward) > 0.8:  # 强反馈，加大学习率
+            lr *= 1.5
+        elif abs(reward) < 0.3:  # 弱反馈，减小学习率
+            lr *= 0.7
         
-        # 衰减探索率
-        self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
+        # 反向遍历对话状态
+        deltas = []
+        for state, action, prob in reversed(dialog):
+            # 概率越低，更新幅度越大
+            prob_factor = 1.0 / max(prob, 0.1)
+            
+            # 更新奖励值（写入时裁剪，超出容量时淘汰最久未更新的条目）
+            deltas.append((state, action, lr * current_reward * prob_factor))
+            
+            # 应用折扣
+            current_reward *= self.discount_factor
+        key = self._keys.key
+        rewards.add_many((key(state, action, add=True), delta) for state, action, delta in deltas)
         
-        return chosen, prob
-    
-    def update_reward(self, query, reply, reward):
-        """更新奖励值 - 强化学习反馈"""
-        # 查找对应的对话记录
-        for i, (q, r, dialog) in enumerate(self.reply_history):
-            if q == query and r == reply:
-                # 从后往前更新奖励
-                current_reward = reward
-                
-                # 动态调整学习率
-                lr = self.learning_rate
-                if abs(reward) > 0.8:  # 强反馈，加大学习率
-                    lr *= 1.5
-                elif abs(reward) < 0.3:  # 弱反馈，减小学习率
-                    lr *= 0.7
-                
-                # 反向遍历对话状态
-                for state, action, prob in reversed(dialog):
-                    key = (state, action)
-                    old_val = self.rewards.get(key, 0)
-                    
-                    # 概率越低，更新幅度越大
-                    prob_factor = 1.0 / max(prob, 0.1)
-                    update = lr * current_reward * prob_factor
-                    
-                    # 更新奖励值
-                    self.rewards[key] = old_val + update
-                    
-                    # 应用折扣
-                    current_reward *= self.discount_factor
-                
-                # 限制奖励值范围
-                for k in list(self.rewards.keys()):
-                    self.rewards[k] = max(-1.5, min(1.5, self.rewards[k]))
-                
-                # 清理旧记录
-                if len(self.rewards) > 5000:
-                    # 保留最近3000条记录
-                    keep_keys = list(self.rewards.keys())[-3000:]
-                    for k in list(self.rewards.keys()):
-                        if k not in keep_keys:
-                            del self.rewards[k]
-                
-                break
+        # 全部写完后再更新版本号，旧版本的缓存条目随之失效
+        rewards.version += 1
+        if self.feedback_log is not None:
+            self.feedback_log.log_reward(deltas)
+        return True
+
+
+def _lookup_matrix(get, keys):
+    """按整数键逐个查表（缺失为0），返回与 keys 形状相同的浮点数组"""
+    flat = keys.ravel().tolist()
+    return np.fromiter(map(get, flat, repeat(0)), dtype=np.float64, count=len(flat)).reshape(keys.shape)
+
+
+def _choose(values, counts, valid, epsilons, draws):
+    """向量化的 epsilon-贪心 选择，每行在 valid 标记的候选列中选出一列
+
+    draws[:, 0] 小于探索率时探索，按 draws[:, 1] 在有效候选中均匀选择；否则 Q值 = 动作值 + 0.1 / 次数，
+    按Q值降序排列后以 draws[:, 1] 按权重抽样（负Q值按0计，全为0时均分）。
+    返回 (列号, 选中的概率, 是否为利用)。
+    """
+    rows = np.arange(len(valid))
+    size = np.maximum(valid.sum(axis=1), 1)
+    explore = draws[:, 0] < epsilons
+    
+    # 探索：第 floor(u * n) 个有效候选
+    positions = np.argsort(~valid, axis=1, kind='stable')
+    explore_cols = positions[rows, np.minimum((draws[:, 1] * size).astype(np.int64), size - 1)]
+    
+    # 利用：按Q值降序（相同时保持原顺序）排列后按权重抽样
+    q_values = np.where(valid, values + 0.1 / counts, -np.inf)
+    order = np.argsort(-q_values, axis=1, kind='stable')
+    weights = np.maximum(np.take_along_axis(q_values, order, axis=1), 0)
+    total = np.cumsum(weights, axis=1)[:, -1]
+    uniform = np.take_along_axis(valid, order, axis=1) / size[:, None]
+    weights = np.where((total > 0)[:, None], weights / np.where(total > 0, total, 1)[:, None], uniform)
+    cumulative = np.cumsum(weights, axis=1)
+    rank = (cumulative <= (draws[:, 1] * cumulative[:, -1])[:, None]).sum(axis=1)
+    rank = np.minimum(rank, size - 1)
+    
+    cols = np.where(explore, explore_cols, order[rows, rank])
+    probs = np.where(explore, 1.0 / size, weights[rows, rank])
+    return cols, probs, ~explore
+
+
+def _choose_one(values, counts, epsilon, explore_draw, pick_draw):
+    """_choose 的单行版本，运算顺序相同，结果逐位一致"""
+    size = len(values)
+    if explore_draw < epsilon:
+        return min(int(pick_draw * size), size - 1), 1.0 / size, False
+    
+    q_values = [value + 0.1 / count for value, count in zip(values, counts)]
+    order = sorted(range(size), key=lambda i: q_values[i], reverse=True)
+    weights = [max(q_values[i], 0) for i in order]
+    # 与 np.cumsum 一样逐项累加（sum 在新版本Python中会做补偿求和）
+    *_, total = accumulate(weights)
+    if total > 0:
+        weights = [w / total for w in weights]
+    else:
+        weights = [1.0 / size] * size
+    cumulative = list(accumulate(weights))
+    rank = min(bisect.bisect_right(cumulative, pick_draw * cumulative[-1]), size - 1)
+    return order[rank], weights[rank], True
+
+
+def _choose_array(values, counts, epsilon, explore_draw, pick_draw):
+    """_choose 的单行数组版本，候选较多时比逐个计算快，结果同样逐位一致"""
+    size = len(values)
+    if explore_draw < epsilon:
+        return min(int(pick_draw * size), size - 1), 1.0 / size, False
+    
+    q_values = values + 0.1 / counts
+    order = np.argsort(-q_values, kind='stable')
+    weights = np.maximum(q_values[order], 0)
+    total = np.cumsum(weights)[-1]
+    weights = weights / total if total > 0 else np.full(size, 1.0 / size)
+    cumulative = np.cumsum(weights)
+    # 累积分布单调不减，searchsorted 与 _choose 中的逐项比较计数相同
+    rank = min(int(np.searchsorted(cumulative, pick_draw * cumulative[-1], side='right')), size - 1)
+    return int(order[rank]), float(weights[rank]), True
+
+
+def _push_merge(pending, store):
+    """压入一批统计结果，栈顶两批规模相近时合并（类似LSM树的分层归并）"""
+    pending.append(store)
+    while len(pending) >= 2 and len(pending[-1].tables[2]) * 2 >= len(pending[-2].tables[2]):
+        newer = pending.pop()
+        pending[-1] = pending[-1].merge(newer)
+
+
+def _split_shards(docs, num_shards):
+    """按长度（词列表的词数或文本的字符数）把文档切分为连续的若干分片"""
+    lengths = np.cumsum([len(doc) for doc in docs])
+    bounds = np.searchsorted(lengths, np.linspace(0, lengths[-1], num_shards + 1)[1:-1])
+    bounds = [0] + sorted(set(min(int(b) + 1, len(docs)) for b in bounds)) + [len(docs)]
+    return [docs[a:b] for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+# 子进程中按 (名称, 缓存目录) 复用的分词器
+_shard_tokenizers = {}
+
+
+def _count_shard(texts, order, tokenizer_name, cache_dir):
+    """子进程中分词并统计单个分片，使用分片内的局部词表"""
+    key = (tokenizer_name, cache_dir)
+    if key not in _shard_tokenizers:
+        _shard_tokenizers[key] = create_tokenizer(tokenizer_name, cache_dir)
+    tokenizer = _shard_tokenizers[key]
+    vocab = Vocabulary()
+    docs = [vocab.encode(tokenizer.tokenize_document(text), add=True) for text in texts]
+    return NgramStore.from_token_ids(vocab, docs, order=order, top_k=0)
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """带版本戳的LRU缓存，版本不符的条目视为未命中
+
+    可被多个线程同时读写而不加锁：每一步字典操作本身是原子的，
+    并发淘汰导致的 KeyError 按未命中处理，命中统计可能略有出入。
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """命中且版本一致时返回缓存值，否则返回 None"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                pass
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, version, value):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (version, value)
+        try:
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        except KeyError:
+            pass
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """返回缓存大小与命中统计"""
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,140 @@
+import random
+import time
+
+import numpy as np
+
+from .analyzer import TextAnalyzer
+
+
+def split_corpus(texts, holdout_ratio=0.1, seed=0):
+    """按文档随机划分为 (训练集, 留出集)，文档数不少于2时两边各至少一篇"""
+    indices = list(range(len(texts)))
+    random.Random(seed).shuffle(indices)
+    num_holdout = 0
+    if len(texts) > 1:
+        num_holdout = min(max(1, round(len(texts) * holdout_ratio)), len(texts) - 1)
+    holdout = sorted(indices[:num_holdout])
+    train = sorted(indices[num_holdout:])
+    return [texts[i] for i in train], [texts[i] for i in holdout]
+
+
+def _batches(docs, batch_tokens):
+    """按词数把已分词的文档分批，控制一次打分的数组规模"""
+    batch, size = [], 0
+    for words in docs:
+        batch.append(words)
+        size += len(words)
+        if size >= batch_tokens:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def _top_rows(table, rows, k):
+    """各行按计数降序的前k个后继词ID，不足k个时以-1填充
+
+    k 不超过预计算宽度时直接取切片，否则对涉及的每一行用 top_successors 排序一次。
+    """
+    if k <= table.topk.shape[1]:
+        return table.topk[rows, :k]
+    unique, inverse = np.unique(rows, return_inverse=True)
+    top = np.full((len(unique), k), -1, dtype=np.int64)
+    for i, row in enumerate(unique):
+        successors = table.top_successors(row, k)
+        top[i, :len(successors)] = successors
+    return top[inverse]
+
+
+def _topk_hits(store, tokens, contexts, k):
+    """按 predict_next 的回退规则批量判断每个位置的真实词是否在前k个预测中"""
+    top = np.full((len(tokens), k), -1, dtype=np.int64)
+    unigrams = store.top_unigrams(k)
+    top[:, :len(unigrams)] = unigrams
+    # 由短到长覆盖，每个位置最终使用存在的最长上下文
+    for n in range(2, store.order + 1):
+        table = store.tables[n]
+        rows = table.find_rows(contexts[n])
+        use = rows >= 0
+        top[use] = _top_rows(table, rows[use], k)
+    return (top == tokens[:, None]).any(axis=1) & (tokens >= 0)
+
+
+def evaluate(analyzer, texts, k=None, batch_tokens=1000000):
+    """在留出文档上计算困惑度、top-k预测准确率和吞吐量
+
+    每篇文档的第i个词以文档内之前的 order-1 个词为上下文，概率来自分析器当前的平滑方法；
+    未登录词计入总词数。出现零概率时困惑度为 None。k 可以超过预计算的top-k宽度，超出时逐行排序。
+    """
+    k = k or analyzer.top_k
+    store = analyzer.store
+    scorer = analyzer.scorer
+
+    start = time.perf_counter()
+    num_tokens = oov = zero = hits = 0
+    log_prob = 0.0
+    tokenized = (analyzer.tokenizer.tokenize_document(text) for text in texts)
+    for batch in _batches(tokenized, batch_tokens):
+        docs = [store.vocab.encode(words) for words in batch]
+        probs = scorer.score_sequences(docs)
+        tokens, contexts, _ = store.sequence_entries(docs)
+
+        num_tokens += len(tokens)
+        oov += int(np.count_nonzero(tokens < 0))
+        positive = probs > 0
+        zero += int(np.count_nonzero(~positive))
+        log_prob += float(np.log2(probs[positive]).sum())
+        hits += int(np.count_nonzero(_topk_hits(store, tokens, contexts, k)))
+    elapsed = time.perf_counter() - start
+
+    cross_entropy = -log_prob / num_tokens if num_tokens and not zero else None
+    return {
+        'smoothing': analyzer.smoothing,
+        'order': store.order,
+        'documents': len(texts),
+        'tokens': num_tokens,
+        'oov_rate': oov / num_tokens if num_tokens else 0.0,
+        'zero_prob_tokens': zero,
+        'cross_entropy': cross_entropy,
+        'perplexity': 2 ** cross_entropy if cross_entropy is not None else None,
+        'top_k': k,
+        'top_k_accuracy': hits / num_tokens if num_tokens else 0.0,
+        'seconds': elapsed,
+        'tokens_per_sec': num_tokens / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def run_evaluation(train, heldout, order=None, smoothing=("kneser_ney",), k=None, tokenizer=None):
+    """在训练集上构建模型，并按每种平滑方法在留出集上评估，返回可直接序列化为JSON的结果"""
+    analyzer = TextAnalyzer()
+    if order is not None:
+        analyzer.ngram_order = order
+    if tokenizer is not None:
+        analyzer.tokenizer = tokenizer
+
+    start = time.perf_counter()
+    stats = analyzer.load_corpus(train)
+    build_seconds = time.perf_counter() - start
+
+    results = []
+    for method in smoothing:
+        analyzer.smoothing = method
+        start = time.perf_counter()
+        analyzer.scorer
+        result = evaluate(analyzer, heldout, k=k)
+        result['scorer_build_seconds'] = time.perf_counter() - start - result['seconds']
+        results.append(result)
+
+    return {
+        'train': {
+            'documents': len(train),
+            'tokenizer': analyzer.tokenizer.name,
+            'tokens': stats['total_words'],
+            'vocab_size': stats['vocab_size'],
+            'order': stats['ngram_order'],
+            'build_seconds': build_seconds,
+            'build_tokens_per_sec': stats['total_words'] / build_seconds if build_seconds > 0 else 0.0,
+            'model_bytes': analyzer.store.nbytes,
+        },
+        'results': results,
+    }
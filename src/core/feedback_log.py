@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import threading
+from .state import RewardTable, Session
+
+logger = logging.getLogger(__name__)
+
+
+LOG_NAME = "feedback.jsonl"
+SNAPSHOT_NAME = "rewards.json"
+
+
+class FeedbackLog:
+    """强化学习状态的追加日志与定期压缩快照
+
+    目录中包含 feedback.jsonl（追加日志，每行一个事件）和 rewards.json（压缩快照）。
+    记录事件只是追加到内存缓冲区，由后台线程按批写入并 fsync，回复路径不会因磁盘IO阻塞。
+    日志累计到 compact_events 个事件后，后台线程把快照和日志合并为新的快照并清空日志。
+    每个事件带递增序号，快照记录已包含的最大序号，重放时跳过序号不大于它的事件，
+    因此在写完快照、清空日志之前崩溃也不会重复计入。
+    """
+
+    def __init__(self, directory, keys, flush_interval=0.2, compact_events=20000, history_size=1000):
+        self.directory = directory
+        self.keys = keys
+        self.log_path = os.path.join(directory, LOG_NAME)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self.flush_interval = flush_interval
+        self.compact_events = compact_events
+        self.history_size = history_size
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._seq = 0
+        self._synced = 0
+        self._file = None
+        self._thread = None
+        self._closing = False
+        self._compact_requested = False
+        self._logged_since_compact = 0
+        self.events = 0
+        self.batches = 0
+        self.compactions = 0
+
+    def load(self, epsilon=0.1):
+        """重放快照及其后的日志，返回 (奖励表, 会话)；目录中没有任何记录时返回 None"""
+        if not os.path.exists(self.snapshot_path) and not os.path.exists(self.log_path):
+            return None
+        rewards, session, self._seq = self._fold(epsilon)
+        self._synced = self._seq
+        return rewards, session
+
+    def start(self, rewards, session):
+        """打开日志开始记录；还没有快照时先以当前状态写一份作为起点"""
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(self.snapshot_path):
+            self._write_snapshot(rewards, session, self._seq)
+        if os.path.exists(self.log_path):
+            # 去掉进程中断时写了一半的最后一行，否则新事件会接在它后面
+            with open(self.log_path, "rb+") as f:
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    f.truncate(end)
+        self._file = open(self.log_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="reko-feedback-log", daemon=True)
+        self._thread.start()
+
+    def log_reply(self, reply_id, query, reply, states, epsilon):
+        """记录一条生成的回复及生成后的探索率（动作计数由对话状态推出）"""
+        self._append({'type': 'reply', 'reply': [reply_id, query, reply, states], 'epsilon': epsilon})
+
+    def log_reward(self, deltas):
+        """记录一次评分对奖励表的各项增量 [(状态, 动作, 增量), ...]"""
+        self._append({'type': 'reward', 'deltas': deltas})
+
+    def _append(self, event):
+        with self._cond:
+            self._seq += 1
+            event['seq'] = self._seq
+            self._buffer.append(event)
+            self.events += 1
+
+    def flush(self, timeout=None):
+        """等待此前记录的事件全部写入磁盘"""
+        with self._cond:
+            target = self._seq
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._synced >= target or self._thread is None, timeout)
+
+    def close(self):
+        """写完缓冲区中的事件后停止后台线程并关闭文件"""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        self._file = None
+
+    def compact(self):
+        """立即合并快照和日志（在后台线程中执行，返回时已完成）"""
+        with self._cond:
+            self._compact_requested = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._compact_requested or self._thread is None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not (self._buffer or self._closing or self._compact_requested):
+                    self._cond.wait(self.flush_interval)
+                events, self._buffer = self._buffer, []
+                closing, compact = self._closing, self._compact_requested
+            if events:
+                self._write(events)
+            if compact or self._logged_since_compact >= self.compact_events:
+                try:
+                    self._compact()
+                except OSError as e:
+                    logger.error(f"压缩反馈日志失败: {e}")
+                with self._cond:
+                    self._compact_requested = False
+                    self._cond.notify_all()
+            if closing:
+                with self._cond:
+                    if not self._buffer:
+                        return
+
+    def _write(self, events):
+        """按批写入并 fsync，一批只同步一次"""
+        try:
+            self._file.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            logger.error(f"写入反馈日志失败: {e}")
+        self.batches += 1
+        self._logged_since_compact += len(events)
+        with self._cond:
+            self._synced = events[-1]['seq']
+            self._cond.notify_all()
+
+    def _compact(self):
+        """把快照和日志合并为新的快照，再清空日志"""
+        rewards, session, seq = self._fold()
+        self._write_snapshot(rewards, session, seq)
+        self._file.close()
+        self._file = open(self.log_path, "w", encoding="utf-8")
+        self._logged_since_compact = 0
+        self.compactions += 1
+        logger.info(f"反馈日志已压缩到序号 {seq}，奖励表 {len(rewards)} 条")
+
+    def _fold(self, epsilon=0.1):
+        """读取快照并依次应用其后的日志事件"""
+        snapshot = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        seq = snapshot.get('seq', 0)
+        keys = self.keys
+        rewards = RewardTable(keys, (((state, action), value) for state, action, value in snapshot.get('rewards', [])))
+        # 奖励增量与回复记录互不影响，先收集全部增量再一次性写入奖励表
+        deltas = []
+        session = Session(keys, snapshot.get('epsilon', epsilon), self.history_size)
+        for state, counts in snapshot.get('action_counts', {}).items():
+            for action, count in counts.items():
+                session.count_action(state, action, count)
+        for reply_id, query, reply, states in snapshot.get('replies', []):
+            session.record(query, reply, [tuple(s) for s in states], reply_id)
+
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            for number, line in enumerate(lines):
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # 只有最后一行可能因进程中断而写了一半
+                    if number < len(lines) - 1:
+                        logger.warning(f"反馈日志第 {number + 1} 行损坏，已跳过")
+                    continue
+                if event['seq'] <= seq:
+                    continue
+                seq = event['seq']
+                if event['type'] == 'reward':
+                    deltas.extend((keys.key(state, action, add=True), delta) for state, action, delta in event['deltas'])
+                elif event['type'] == 'reply':
+                    reply_id, query, reply, states = event['reply']
+                    states = [tuple(s) for s in states]
+                    session.record(query, reply, states, reply_id)
+                    for state, action, _ in states:
+                        session.count_action(state, action)
+                    session.epsilon = event['epsilon']
+        rewards.add_many(deltas)
+        return rewards, session, seq
+
+    def _write_snapshot(self, rewards, session, seq):
+        """先写临时文件再原子替换"""
+        snapshot = {
+            'seq': seq,
+            'epsilon': session.epsilon,
+            'rewards': [[state, action, value] for (state, action), value in rewards.items()],
+            'action_counts': session.counts_by_context(),
+            'replies': [[reply_id, *session.replies[reply_id]] for reply_id in session.reply_ids()],
+        }
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'batches': self.batches,
+            'compactions': self.compactions,
+            'pending': len(self._buffer),
+        }
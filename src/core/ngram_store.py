@@ -0,0 +1,534 @@
+import numpy as np
+
+
+# 键的编码方式：高32位为上一阶的条目索引，低32位为下一个词的ID
+_SHIFT = np.int64(32)
+_MASK = np.int64(0xFFFFFFFF)
+
+
+class Vocabulary:
+    """词表 - 在词语和整数ID之间双向映射"""
+
+    def __init__(self, words=None):
+        self.words = []
+        self.ids = {}
+        for word in words or []:
+            self.add(word)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.ids
+
+    def add(self, word):
+        """添加词语并返回其ID（已存在时直接返回）"""
+        word_id = self.ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.ids[word] = word_id
+            self.words.append(word)
+        return word_id
+
+    def lookup(self, word):
+        """查询词语ID，不存在时返回-1"""
+        return self.ids.get(word, -1)
+
+    def encode(self, words, add=False):
+        """将词语序列转换为ID数组"""
+        if add:
+            ids = [self.add(w) for w in words]
+        else:
+            ids = [self.ids.get(w, -1) for w in words]
+        return np.array(ids, dtype=np.int64)
+
+    def decode(self, ids):
+        """将ID序列转换为词语列表"""
+        return [self.words[i] for i in ids]
+
+    def copy(self):
+        vocab = Vocabulary()
+        vocab.words = list(self.words)
+        vocab.ids = dict(self.ids)
+        return vocab
+
+
+class NgramTable:
+    """单一阶数的n-gram计数表（CSR布局）
+
+    contexts 为升序排列的上下文条目索引，offsets[i]:offsets[i+1] 给出第i个上下文
+    在 next_ids/counts 中的范围，行内按词ID升序排列。某一条目在 next_ids 中的位置
+    即为其条目索引，作为更高一阶的上下文使用（即一棵按层存储的前缀树）。
+    """
+
+    def __init__(self, contexts, offsets, next_ids, counts, totals=None, probs=None, topk=None):
+        self.contexts = contexts
+        self.offsets = offsets
+        self.next_ids = next_ids
+        self.counts = counts
+        self.topk = topk if topk is not None else np.zeros((len(contexts), 0), dtype=np.int32)
+
+        # 每行计数总和及归一化后的条件概率，查询时无需再求和
+        if totals is None:
+            if len(counts):
+                totals = np.add.reduceat(counts, offsets[:-1])
+            else:
+                totals = np.zeros(len(contexts), dtype=np.int64)
+        self.totals = totals
+        if probs is None:
+            row_totals = np.repeat(totals, np.diff(offsets))
+            probs = np.divide(counts, row_totals, out=np.zeros(len(counts)), where=row_totals > 0)
+        self.probs = probs
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64),
+                   np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64))
+
+    @classmethod
+    def from_keys(cls, keys, counts):
+        """从升序排列的编码键和计数构建表"""
+        parents = keys >> _SHIFT
+        starts = np.flatnonzero(np.diff(parents, prepend=-1)) if len(keys) else np.zeros(0, dtype=np.int64)
+        contexts = parents[starts]
+        offsets = np.append(starts, len(keys)).astype(np.int64)
+        next_ids = (keys & _MASK).astype(np.int32)
+        return cls(contexts.astype(np.int64), offsets, next_ids, counts.astype(np.int64))
+
+    def __len__(self):
+        return len(self.next_ids)
+
+    @property
+    def num_contexts(self):
+        return len(self.contexts)
+
+    @property
+    def nbytes(self):
+        return (self.contexts.nbytes + self.offsets.nbytes + self.next_ids.nbytes
+                + self.counts.nbytes + self.totals.nbytes + self.probs.nbytes
+                + self.topk.nbytes)
+
+    def build_topk(self, k, rows=None):
+        """预计算每个上下文计数最高的k个后继词，不足k个的行以-1填充
+
+        rows 为升序排列的行号时只重算这些行，其余行保持不变。
+        """
+        if rows is None or self.topk.shape != (len(self.contexts), k):
+            self.topk = np.full((len(self.contexts), k), -1, dtype=np.int32)
+            if rows is None:
+                rows = np.arange(len(self.contexts), dtype=np.int64)
+        self.topk[rows] = -1
+
+        # 展开所选行的全部条目
+        lengths = np.diff(self.offsets)[rows]
+        group_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        entries = np.arange(len(group_starts), dtype=np.int64) - group_starts + np.repeat(self.offsets[rows], lengths)
+        entry_rows = np.repeat(rows, lengths)
+
+        # 行内按计数降序、词ID升序排列
+        order = np.lexsort((self.next_ids[entries], -self.counts[entries], entry_rows))
+        rank = np.arange(len(order), dtype=np.int64) - group_starts
+        keep = rank < k
+        self.topk[entry_rows[keep], rank[keep]] = self.next_ids[entries[order][keep]]
+
+    def keys(self):
+        """还原升序排列的编码键"""
+        parents = np.repeat(self.contexts, np.diff(self.offsets))
+        return (parents << _SHIFT) | self.next_ids.astype(np.int64)
+
+    def find_row(self, context):
+        """查找上下文所在的行，不存在时返回-1"""
+        row = int(np.searchsorted(self.contexts, context))
+        if row < len(self.contexts) and self.contexts[row] == context:
+            return row
+        return -1
+
+    def find_rows(self, contexts):
+        """向量化的 find_row：一次查找一组上下文所在的行，不存在时为-1"""
+        if not len(self.contexts):
+            return np.full(len(contexts), -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.contexts, contexts), len(self.contexts) - 1)
+        return np.where((contexts >= 0) & (self.contexts[rows] == contexts), rows, -1)
+
+    def find_entries(self, contexts, word_ids):
+        """向量化的 find_entry：一次查找一组 (上下文, 词) 条目，不存在时为-1"""
+        return self.find_in_rows(self.find_rows(contexts), word_ids)
+
+    def find_in_rows(self, rows, word_ids):
+        """在每个给定行内同时二分查找对应的词，返回条目索引，行为-1或词不存在时为-1"""
+        if not len(self.next_ids):
+            return np.full(len(rows), -1, dtype=np.int64)
+        valid = rows >= 0
+        safe_rows = np.where(valid, rows, 0)
+        lo = np.where(valid, self.offsets[safe_rows], 0)
+        hi = np.where(valid, self.offsets[safe_rows + 1], 0)
+        end = hi
+        last = len(self.next_ids) - 1
+        # 所有行一起做二分，迭代次数为最长行长度的对数
+        searching = lo < hi
+        while searching.any():
+            mid = (lo + hi) // 2
+            right = searching & (self.next_ids[np.minimum(mid, last)] < word_ids)
+            lo = np.where(right, mid + 1, lo)
+            hi = np.where(searching & ~right, mid, hi)
+            searching = lo < hi
+        found = valid & (lo < end) & (self.next_ids[np.minimum(lo, last)] == word_ids)
+        return np.where(found, lo, -1)
+
+    def find_entry(self, context, word_id):
+        """查找 (上下文, 词) 条目的索引，不存在时返回-1"""
+        row = self.find_row(context)
+        if row < 0:
+            return -1
+        return self._position(row, word_id)
+
+    def _position(self, row, word_id):
+        """某一行中指定词在扁平数组中的位置，不存在时返回-1"""
+        start, end = self.offsets[row], self.offsets[row + 1]
+        pos = int(np.searchsorted(self.next_ids[start:end], word_id)) + start
+        if pos < end and self.next_ids[pos] == word_id:
+            return pos
+        return -1
+
+    def gather(self, row, values, word_ids):
+        """一次取出某一行中一组词对应的 values 条目值，行内不存在的词为0"""
+        start, end = self.offsets[row], self.offsets[row + 1]
+        pos = np.minimum(np.searchsorted(self.next_ids[start:end], word_ids) + start, end - 1)
+        return np.where(self.next_ids[pos] == word_ids, values[pos], 0)
+
+    def count(self, row, word_id):
+        """某一行中指定词的计数"""
+        pos = self._position(row, word_id)
+        return int(self.counts[pos]) if pos >= 0 else 0
+
+    def probability(self, row, word_id):
+        """某一行中指定词的条件概率 count / total"""
+        pos = self._position(row, word_id)
+        return float(self.probs[pos]) if pos >= 0 else 0.0
+
+    def row_total(self, row):
+        """某一行的计数总和"""
+        return int(self.totals[row])
+
+    def top_successors(self, row, k):
+        """按计数降序返回某一行的前k个词ID（计数相同时词ID小者优先）"""
+        start, end = self.offsets[row], self.offsets[row + 1]
+        if k <= self.topk.shape[1]:
+            return self.topk[row, :min(k, end - start)]
+        order = np.argsort(-self.counts[start:end], kind='stable')[:k]
+        return self.next_ids[start:end][order]
+
+
+class NgramStore:
+    """基于整数ID的紧凑n-gram存储
+
+    一元组计数以按词ID索引的稠密数组保存；二阶及以上每一阶各保存一个 NgramTable。
+    存储在构建完成后视为只读，增量更新通过 merge 生成新的实例。
+    """
+
+    def __init__(self, vocab, unigram_counts, tables, order, top_k=5, top_unigram_ids=None):
+        self.vocab = vocab
+        self.unigram_counts = unigram_counts
+        self.tables = tables
+        self.order = order
+        self.top_k = top_k
+
+        # 预计算后继词表，预测时只需取切片
+        for table in tables.values():
+            if table.topk.shape[1] != top_k:
+                table.build_topk(top_k)
+        if top_unigram_ids is None:
+            top_unigram_ids = np.argsort(-unigram_counts, kind='stable')[:top_k]
+            top_unigram_ids = top_unigram_ids[unigram_counts[top_unigram_ids] > 0]
+        self.top_unigram_ids = top_unigram_ids
+
+    @classmethod
+    def empty(cls, order=3, vocab=None, top_k=5):
+        vocab = vocab if vocab is not None else Vocabulary()
+        tables = {n: NgramTable.empty() for n in range(2, order + 1)}
+        return cls(vocab, np.zeros(len(vocab), dtype=np.int64), tables, order, top_k)
+
+    @classmethod
+    def from_token_ids(cls, vocab, docs, order=3, top_k=5, skips=None):
+        """从已转换为ID数组的文档列表统计n-gram
+
+        skips[i] 为第i篇文档开头仅作为上下文的词数（流式读取时来自上一个文本块），
+        这些词本身及完全落在其中的n-gram不计数，但跨越边界的n-gram照常统计。
+        """
+        if skips is None:
+            skips = [0] * len(docs)
+        pairs = [(d, skip) for d, skip in zip(docs, skips) if len(d)]
+        if not pairs:
+            return cls.empty(order, vocab, top_k)
+
+        stream = np.concatenate([d for d, _ in pairs]).astype(np.int64)
+        # remaining[i] 表示位置i所在文档从i开始剩余的词数
+        lengths = np.array([len(d) for d, _ in pairs], dtype=np.int64)
+        doc_ends = np.repeat(np.cumsum(lengths), lengths)
+        remaining = doc_ends - np.arange(len(stream), dtype=np.int64)
+        # counted[i] 表示以位置i结尾的n-gram需要计数
+        counted = remaining <= np.repeat(lengths - [skip for _, skip in pairs], lengths)
+
+        unigram_counts = np.bincount(stream[counted], minlength=len(vocab)).astype(np.int64)
+
+        tables = {}
+        entries = stream
+        for n in range(2, order + 1):
+            positions = np.flatnonzero(remaining >= n)
+            keys = (entries[positions] << _SHIFT) | stream[positions + n - 1]
+            uniq, inverse = np.unique(keys, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            counts = np.bincount(inverse[counted[positions + n - 1]], minlength=len(uniq))
+            tables[n] = NgramTable.from_keys(uniq, counts)
+
+            entries = np.full(len(stream), -1, dtype=np.int64)
+            entries[positions] = inverse
+
+        return cls(vocab, unigram_counts, tables, order, top_k)
+
+    def merge(self, other, sign=1):
+        """合并另一个使用同一词表ID的存储，sign=-1 时为扣除，返回新的存储
+
+        扣除时计数归零的条目会被删除，其余条目的索引按新表重新映射；
+        top-k表只对受影响的上下文重算，其余行直接沿用。
+        """
+        vocab_size = max(len(self.vocab), len(other.vocab))
+        vocab = self.vocab if len(self.vocab) >= len(other.vocab) else other.vocab
+        unigram_counts = _pad(self.unigram_counts, vocab_size) + sign * _pad(other.unigram_counts, vocab_size)
+
+        tables = {}
+        # 第二阶的上下文即词ID，不需要映射
+        remap_self = remap_other = None
+        for n in range(2, self.order + 1):
+            old_table = self.tables[n]
+            keys_a = _remap_keys(old_table.keys(), remap_self)
+            keys_b = _remap_keys(other.tables[n].keys(), remap_other)
+            valid_a, valid_b = keys_a >= 0, keys_b >= 0
+
+            keys, counts, index_a, index_b = _merge_sorted(
+                keys_a[valid_a], old_table.counts[valid_a],
+                keys_b[valid_b], sign * other.tables[n].counts[valid_b],
+                drop_zero=sign < 0,
+            )
+            table = NgramTable.from_keys(keys, counts)
+            if self.top_k and old_table.topk.shape[1] == self.top_k:
+                _patch_topk(table, old_table, remap_self, keys_b[valid_b] >> _SHIFT, self.top_k)
+            tables[n] = table
+
+            remap_self = _scatter(index_a, valid_a)
+            remap_other = _scatter(index_b, valid_b)
+
+        return NgramStore(vocab, unigram_counts, tables, self.order, self.top_k)
+
+    def remap_words(self, mapping, vocab):
+        """将词ID按 mapping 映射到另一个词表，返回重新排序后的新存储
+
+        用于把各分片使用的局部词表统一到全局词表。
+        """
+        unigram_counts = np.zeros(len(vocab), dtype=np.int64)
+        unigram_counts[mapping[:len(self.unigram_counts)]] = self.unigram_counts
+
+        tables = {}
+        remap = mapping
+        for n in range(2, self.order + 1):
+            table = self.tables[n]
+            parents = remap[np.repeat(table.contexts, np.diff(table.offsets))]
+            keys = (parents << _SHIFT) | mapping[table.next_ids]
+            order = np.argsort(keys, kind='stable')
+            tables[n] = NgramTable.from_keys(keys[order], table.counts[order])
+
+            # 记录旧条目在新表中的位置，供下一阶映射上下文
+            remap = np.empty(len(order), dtype=np.int64)
+            remap[order] = np.arange(len(order), dtype=np.int64)
+
+        return NgramStore(vocab, unigram_counts, tables, self.order, self.top_k)
+
+    @classmethod
+    def merge_all(cls, stores):
+        """两两归并多个使用同一词表ID的存储（树形归并）"""
+        stores = list(stores)
+        while len(stores) > 1:
+            merged = [a.merge(b) for a, b in zip(stores[0::2], stores[1::2])]
+            if len(stores) % 2:
+                merged.append(stores[-1])
+            stores = merged
+        return stores[0]
+
+    def to_memory(self):
+        """返回内容相同、全部数组都复制到内存中的存储，不再引用快照的内存映射"""
+        tables = {n: NgramTable(*(np.array(getattr(table, field))
+                                  for field in ("contexts", "offsets", "next_ids", "counts", "totals", "probs", "topk")))
+                  for n, table in self.tables.items()}
+        return NgramStore(self.vocab, np.array(self.unigram_counts), tables, self.order, self.top_k,
+                          np.array(self.top_unigram_ids))
+
+    @property
+    def nbytes(self):
+        return self.unigram_counts.nbytes + sum(t.nbytes for t in self.tables.values())
+
+    @property
+    def vocab_size(self):
+        return int(np.count_nonzero(self.unigram_counts))
+
+    @property
+    def total_words(self):
+        return int(self.unigram_counts.sum())
+
+    def context_entry(self, context_ids):
+        """返回上下文词ID序列对应的条目索引，不存在时返回-1"""
+        if not context_ids or context_ids[0] < 0:
+            return -1
+        entry = int(context_ids[0])
+        if entry >= len(self.unigram_counts) or self.unigram_counts[entry] == 0:
+            return -1
+        for n, word_id in enumerate(context_ids[1:], start=2):
+            if word_id < 0:
+                return -1
+            entry = self.tables[n].find_entry(entry, word_id)
+            if entry < 0:
+                return -1
+        return entry
+
+    def find_row(self, context_ids):
+        """返回 (表, 行)，表的阶数为上下文长度+1；上下文不存在时行为-1"""
+        table = self.tables[len(context_ids) + 1]
+        entry = self.context_entry(context_ids)
+        if entry < 0:
+            return table, -1
+        return table, table.find_row(entry)
+
+    def sequence_entries(self, docs):
+        """批量定位多篇文档中每个位置的n-gram条目
+
+        返回 (tokens, contexts, entries)：tokens 为拼接后的词ID数组；entries[n][i] 为以位置i
+        结尾的n-gram在第n阶表中的条目索引（n=1 时为词ID）；contexts[n][i] 为位置i之前
+        n-1个词作为第n阶上下文的条目索引。不存在或越过文档开头时均为-1。
+        """
+        docs = [np.asarray(d, dtype=np.int64) for d in docs]
+        if not docs:
+            docs = [np.zeros(0, dtype=np.int64)]
+        tokens = np.concatenate(docs)
+        doc_starts = np.zeros(len(tokens), dtype=bool)
+        doc_starts[np.cumsum([0] + [len(d) for d in docs[:-1]])[[len(d) > 0 for d in docs]]] = True
+
+        entries = {1: self._word_entries(tokens)}
+        contexts = {}
+        for n in range(2, self.order + 1):
+            previous = np.full(len(tokens), -1, dtype=np.int64)
+            previous[1:] = entries[n - 1][:-1]
+            previous[doc_starts] = -1
+            contexts[n] = previous
+            entries[n] = self.tables[n].find_entries(previous, tokens)
+        return tokens, contexts, entries
+
+    def _word_entries(self, word_ids):
+        """一阶条目即词ID，未出现过的词为-1"""
+        known = (word_ids >= 0) & (word_ids < len(self.unigram_counts))
+        known[known] = self.unigram_counts[word_ids[known]] > 0
+        return np.where(known, word_ids, -1)
+
+    def context_rows(self, context_ids):
+        """批量查找一组上下文各长度后缀所在的行
+
+        context_ids 为 (B, L) 的词ID矩阵，不足L个词时左侧以-1填充。返回 {n: 行号数组}，
+        第n阶表中的上下文为每行最后 n-1 个词，不存在时为-1。
+        """
+        context_ids = np.asarray(context_ids, dtype=np.int64)
+        length = min(context_ids.shape[1], self.order - 1)
+        rows = {}
+        for size in range(1, length + 1):
+            entry = self._word_entries(context_ids[:, -size])
+            for j in range(size - 1, 0, -1):
+                entry = self.tables[size - j + 1].find_entries(entry, context_ids[:, -j])
+            rows[size + 1] = self.tables[size + 1].find_rows(entry)
+        return rows
+
+    def backoff_row(self, context_ids):
+        """从最长的上下文后缀开始回退，返回第一个存在后继词的 (表, 行)，都不存在时返回 (None, -1)"""
+        context_ids = list(context_ids)[-(self.order - 1):]
+        for start in range(len(context_ids)):
+            table, row = self.find_row(context_ids[start:])
+            if row >= 0:
+                return table, row
+        return None, -1
+
+    def top_unigrams(self, k):
+        """按全局词频降序返回前k个词ID"""
+        if k <= self.top_k:
+            return self.top_unigram_ids[:k]
+        order = np.argsort(-self.unigram_counts, kind='stable')[:k]
+        return order[self.unigram_counts[order] > 0]
+
+
+
+def _pad(counts, size):
+    if len(counts) >= size:
+        return counts
+    return np.concatenate([counts, np.zeros(size - len(counts), dtype=counts.dtype)])
+
+
+def _remap_keys(keys, remap):
+    """按上一阶的索引映射替换键的高位，映射不到的条目标记为-1"""
+    if remap is None or not len(keys):
+        return keys
+    parents = remap[keys >> _SHIFT]
+    return np.where(parents >= 0, (parents << _SHIFT) | (keys & _MASK), -1)
+
+
+def _merge_sorted(keys_a, counts_a, keys_b, counts_b, drop_zero=True):
+    """合并两组升序且无重复的键，相同键的计数相加并删除计数为负（或为零）的条目
+
+    流式统计的中间结果里，仅作为上下文的条目计数为零但仍被更高阶引用，
+    因此累加时保留零计数条目，只有扣除时才删除。
+
+    返回 (键, 计数, a中各条目的新位置, b中各条目的新位置)，被删除的条目位置为-1。
+    """
+    pos = np.searchsorted(keys_a, keys_b)
+    hit = pos < len(keys_a)
+    hit[hit] = keys_a[pos[hit]] == keys_b[hit]
+
+    counts = counts_a.astype(np.int64)
+    counts[pos[hit]] += counts_b[hit]
+
+    # b中新出现的键按顺序插入，a中第i个条目后移其前方插入的个数
+    inserted = pos[~hit]
+    keys = np.insert(keys_a, inserted, keys_b[~hit])
+    counts = np.insert(counts, inserted, counts_b[~hit])
+    index_a = np.arange(len(keys_a), dtype=np.int64) + np.searchsorted(inserted, np.arange(len(keys_a)), side='right')
+    index_b = np.empty(len(keys_b), dtype=np.int64)
+    index_b[hit] = index_a[pos[hit]]
+    index_b[~hit] = inserted + np.arange(len(inserted), dtype=np.int64)
+
+    keep = counts > 0 if drop_zero else counts >= 0
+    new_index = np.cumsum(keep) - 1
+    new_index[~keep] = -1
+    return keys[keep], counts[keep], new_index[index_a], new_index[index_b]
+
+
+def _scatter(values, mask):
+    """将 values 放回 mask 为真的位置，其余位置为-1"""
+    result = np.full(len(mask), -1, dtype=np.int64)
+    result[mask] = values
+    return result
+
+
+def _patch_topk(table, old_table, remap, touched_contexts, k):
+    """沿用旧表中未受影响上下文的top-k行，只重算被修改的上下文"""
+    old_contexts = old_table.contexts if remap is None else remap[old_table.contexts]
+    old_rows = np.flatnonzero(old_contexts >= 0)
+    new_rows = np.searchsorted(table.contexts, old_contexts[old_rows])
+    found = new_rows < len(table.contexts)
+    found[found] = table.contexts[new_rows[found]] == old_contexts[old_rows[found]]
+
+    dirty = np.zeros(len(table.contexts), dtype=bool)
+    touched = np.searchsorted(table.contexts, touched_contexts)
+    dirty[touched[touched < len(table.contexts)]] = True
+    clean = found.copy()
+    clean[found] = ~dirty[new_rows[found]]
+
+    table.topk = np.full((len(table.contexts), k), -1, dtype=np.int32)
+    table.topk[new_rows[clean]] = old_table.topk[old_rows[clean]]
+    # 旧表中不存在的上下文也需要计算
+    fresh = np.ones(len(table.contexts), dtype=bool)
+    fresh[new_rows[found]] = False
+    table.build_topk(k, rows=np.flatnonzero(dirty | fresh))
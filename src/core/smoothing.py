@@ -0,0 +1,238 @@
+import numpy as np
+
+from .ngram_store import _SHIFT
+
+
+SMOOTHING_METHODS = ("none", "add_alpha", "kneser_ney")
+
+
+def build_scorer(store, method="kneser_ney", alpha=0.1):
+    """按平滑方法为存储构建打分器"""
+    if method == "none":
+        return FrequencyScorer(store)
+    if method == "add_alpha":
+        return AddAlphaScorer(store, alpha)
+    if method == "kneser_ney":
+        return KneserNeyScorer(store)
+    raise ValueError(f"未知的平滑方法: {method}（可选 {', '.join(SMOOTHING_METHODS)}）")
+
+
+def _lookup(values, ids, default=0):
+    """按词ID取数组中的值，未登录词（-1或超出范围）取 default"""
+    known = (ids >= 0) & (ids < len(values))
+    return np.where(known, values[np.where(known, ids, 0)], default)
+
+
+class FrequencyScorer:
+    """不做平滑：完整上下文下的 count / total，上下文不存在时为0"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def score(self, context_ids, candidate_ids):
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        context_ids = list(context_ids)[-(self.store.order - 1):]
+        if not context_ids:
+            return np.zeros(len(candidate_ids))
+        table, row = self.store.find_row(context_ids)
+        if row < 0:
+            return np.zeros(len(candidate_ids))
+        return table.gather(row, table.probs, candidate_ids)
+
+    def score_rows(self, rows, lengths, candidate_ids):
+        """批量打分：rows 为 NgramStore.context_rows 的结果，lengths 为各行上下文的实际词数"""
+        store = self.store
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        lengths = np.minimum(lengths, store.order - 1)
+        probs = np.zeros(candidate_ids.shape)
+        for n, table_rows in rows.items():
+            idx = np.flatnonzero((lengths == n - 1) & (table_rows >= 0))
+            table = store.tables[n]
+            probs[idx] = _gather(table.probs, _row_entries(table, table_rows[idx], candidate_ids[idx]))
+        return probs
+
+    def score_sequences(self, docs):
+        """对多篇文档的每个位置打分，上下文为文档内该位置之前的 order-1 个词"""
+        store = self.store
+        tokens, contexts, entries = store.sequence_entries(docs)
+        lengths = [len(d) for d in docs]
+        offsets = np.arange(len(tokens)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        context_lengths = np.minimum(offsets, store.order - 1)
+
+        probs = np.zeros(len(tokens))
+        for n in range(2, store.order + 1):
+            table = store.tables[n]
+            rows = table.find_rows(contexts[n])
+            use = (context_lengths == n - 1) & (rows >= 0)
+            probs[use] = _gather(table.probs, entries[n][use])
+        return probs
+
+
+class AddAlphaScorer:
+    """加alpha平滑：P(w|h) = (c(h,w) + alpha) / (c(h) + alpha * V)，h 取存在的最长上下文"""
+
+    def __init__(self, store, alpha=0.1):
+        self.store = store
+        self.alpha = alpha
+        self.vocab_size = max(len(store.unigram_counts), 1)
+
+    def score(self, context_ids, candidate_ids):
+        store = self.store
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        table, row = store.backoff_row(context_ids)
+        if row >= 0:
+            counts, total = table.gather(row, table.counts, candidate_ids), table.totals[row]
+        else:
+            counts, total = _lookup(store.unigram_counts, candidate_ids), store.total_words
+        return (counts + self.alpha) / (total + self.alpha * self.vocab_size)
+
+    def score_rows(self, rows, lengths, candidate_ids):
+        """批量打分：rows 为 NgramStore.context_rows 的结果，lengths 为各行上下文的实际词数"""
+        store = self.store
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        counts = _lookup(store.unigram_counts, candidate_ids)
+        totals = np.full(len(candidate_ids), store.total_words, dtype=np.int64)
+        for n in sorted(rows):
+            table = store.tables[n]
+            idx = np.flatnonzero(rows[n] >= 0)
+            counts[idx] = _gather(table.counts, _row_entries(table, rows[n][idx], candidate_ids[idx]))
+            totals[idx] = table.totals[rows[n][idx]]
+        return (counts + self.alpha) / (totals[:, None] + self.alpha * self.vocab_size)
+
+    def score_sequences(self, docs):
+        """对多篇文档的每个位置打分，上下文为文档内该位置之前的 order-1 个词"""
+        store = self.store
+        tokens, contexts, entries = store.sequence_entries(docs)
+        counts = _lookup(store.unigram_counts, tokens)
+        totals = np.full(len(tokens), store.total_words, dtype=np.int64)
+        # 由短到长覆盖，每个位置最终使用存在的最长上下文
+        for n in range(2, store.order + 1):
+            table = store.tables[n]
+            rows = table.find_rows(contexts[n])
+            use = rows >= 0
+            counts[use] = _gather(table.counts, entries[n][use])
+            totals[use] = table.totals[rows[use]]
+        return (counts + self.alpha) / (totals + self.alpha * self.vocab_size)
+
+
+class KneserNeyScorer:
+    """插值Kneser-Ney平滑
+
+    最高阶使用原始计数，低阶使用延续计数 N1+(·hw)（以 hw 结尾的不同高一阶n-gram数）。
+    每一阶的折扣后概率按条目、回退权重按行预先算好，打分时每阶只需对候选词做一次查找。
+    """
+
+    def __init__(self, store, discount=None):
+        self.store = store
+        tables = store.tables
+        order = store.order
+
+        # 每个条目去掉首词后的后缀在低一阶中的位置（二阶条目的后缀即词ID）
+        suffix = {}
+        for n in range(2, order + 1):
+            table = tables[n]
+            if n == 2:
+                suffix[n] = table.next_ids.astype(np.int64)
+            else:
+                parents = np.repeat(table.contexts, np.diff(table.offsets))
+                keys = (suffix[n - 1][parents] << _SHIFT) | table.next_ids.astype(np.int64)
+                suffix[n] = np.searchsorted(tables[n - 1].keys(), keys)
+
+        # 最高阶用原始计数，其余各阶用延续计数
+        adjusted = {order: tables[order].counts}
+        for n in range(order, 1, -1):
+            size = len(tables[n - 1]) if n > 2 else len(store.unigram_counts)
+            adjusted[n - 1] = np.bincount(suffix[n][tables[n].counts > 0], minlength=size)
+
+        self.discounts = {}
+        self.weights = {}
+        self.gammas = {}
+        for n in range(2, order + 1):
+            table = tables[n]
+            counts = adjusted[n]
+            d = discount if discount is not None else _estimate_discount(counts)
+            lengths = np.diff(table.offsets)
+            rows = np.repeat(np.arange(len(lengths)), lengths)
+            denom = np.bincount(rows, weights=counts, minlength=len(lengths))
+            types = np.bincount(rows, weights=counts > 0, minlength=len(lengths))
+            safe = np.where(denom > 0, denom, 1.0)
+            self.discounts[n] = d
+            self.weights[n] = np.maximum(counts - d, 0) / safe[rows]
+            # 整行延续计数为0时完全回退到低一阶
+            self.gammas[n] = np.where(denom > 0, d * types / safe, 1.0)
+
+        # 一阶按延续计数折扣，折扣出的概率质量均分给整个词表（含未出现过的词）
+        counts = adjusted[1]
+        total = counts.sum()
+        vocab_size = max(len(counts), 1)
+        d = discount if discount is not None else _estimate_discount(counts)
+        self.discounts[1] = d
+        if total > 0:
+            self.unknown_prob = d * np.count_nonzero(counts) / total / vocab_size
+            self.unigram_probs = np.maximum(counts - d, 0) / total + self.unknown_prob
+        else:
+            self.unknown_prob = 1.0 / vocab_size
+            self.unigram_probs = np.full(len(counts), self.unknown_prob)
+
+    def score(self, context_ids, candidate_ids):
+        store = self.store
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        probs = _lookup(self.unigram_probs, candidate_ids, self.unknown_prob)
+
+        # 由短到长逐阶插值；较短的上下文不存在时更长的也不可能存在
+        context_ids = list(context_ids)[-(store.order - 1):]
+        for length in range(1, len(context_ids) + 1):
+            table, row = store.find_row(context_ids[-length:])
+            if row < 0:
+                break
+            n = length + 1
+            probs = table.gather(row, self.weights[n], candidate_ids) + self.gammas[n][row] * probs
+        return probs
+
+    def score_rows(self, rows, lengths, candidate_ids):
+        """批量打分：rows 为 NgramStore.context_rows 的结果，lengths 为各行上下文的实际词数"""
+        store = self.store
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        probs = _lookup(self.unigram_probs, candidate_ids, self.unknown_prob)
+        active = np.ones(len(candidate_ids), dtype=bool)
+        for n in sorted(rows):
+            active &= rows[n] >= 0
+            idx = np.flatnonzero(active)
+            table_rows = rows[n][idx]
+            weights = _gather(self.weights[n], _row_entries(store.tables[n], table_rows, candidate_ids[idx]))
+            probs[idx] = weights + self.gammas[n][table_rows][:, None] * probs[idx]
+        return probs
+
+    def score_sequences(self, docs):
+        """对多篇文档的每个位置打分，上下文为文档内该位置之前的 order-1 个词"""
+        store = self.store
+        tokens, contexts, entries = store.sequence_entries(docs)
+        probs = _lookup(self.unigram_probs, tokens, self.unknown_prob)
+        active = np.ones(len(tokens), dtype=bool)
+        for n in range(2, store.order + 1):
+            rows = store.tables[n].find_rows(contexts[n])
+            active &= rows >= 0
+            idx = np.flatnonzero(active)
+            probs[idx] = _gather(self.weights[n], entries[n][idx]) + self.gammas[n][rows[idx]] * probs[idx]
+        return probs
+
+
+def _row_entries(table, rows, candidate_ids):
+    """每行上下文与该行各候选词组成的条目索引，形状同 candidate_ids"""
+    width = candidate_ids.shape[1]
+    entries = table.find_in_rows(np.repeat(rows, width), candidate_ids.ravel())
+    return entries.reshape(candidate_ids.shape)
+
+
+def _gather(values, entries):
+    """按条目索引取值，条目为-1时取0"""
+    return np.where(entries >= 0, values[np.maximum(entries, 0)], 0)
+
+
+def _estimate_discount(counts):
+    """按 Ney 等人的估计 D = n1 / (n1 + 2 * n2)，n1、n2 为计数为1和2的条目数"""
+    n1 = np.count_nonzero(counts == 1)
+    n2 = np.count_nonzero(counts == 2)
+    if n1 == 0 or n2 == 0:
+        return 0.75
+    return n1 / (n1 + 2 * n2)
@@ -0,0 +1,128 @@
+import json
+import logging
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .ngram_store import NgramStore, NgramTable, Vocabulary
+
+logger = logging.getLogger(__name__)
+
+
+# 文件格式：魔数(8字节) | 版本(uint32) | 头部长度(uint32) | JSON头部 | 按64字节对齐的数组数据
+MAGIC = b"REKOSNAP"
+VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 64
+_TABLE_FIELDS = ("contexts", "offsets", "next_ids", "counts", "totals", "probs", "topk")
+
+
+class SnapshotError(Exception):
+    """快照文件格式错误或版本不兼容"""
+
+
+def _encode_strings(strings):
+    """将字符串列表编码为 (UTF-8字节数组, 字符偏移数组)"""
+    joined = "".join(strings)
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+    return np.frombuffer(joined.encode("utf-8"), dtype=np.uint8), offsets
+
+
+def _decode_strings(blob, offsets):
+    joined = blob.tobytes().decode("utf-8")
+    return [joined[a:b] for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def save_snapshot(path, store, corpus=None, meta=None):
+    """将模型写入快照文件（先写临时文件再原子替换）"""
+    arrays = {
+        "unigram_counts": store.unigram_counts,
+        "top_unigram_ids": store.top_unigram_ids,
+    }
+    arrays["vocab_blob"], arrays["vocab_offsets"] = _encode_strings(store.vocab.words)
+    for n, table in store.tables.items():
+        for field in _TABLE_FIELDS:
+            arrays[f"t{n}.{field}"] = getattr(table, field)
+
+    doc_ids, detached = [], []
+    if corpus is not None:
+        doc_ids = list(corpus.keys())
+        # 流式加入的文档不保留原文，只记录其ID
+        detached = [i for i, doc_id in enumerate(doc_ids) if corpus[doc_id] is None]
+        texts = [corpus[doc_id] or "" for doc_id in doc_ids]
+        arrays["corpus_blob"], arrays["corpus_offsets"] = _encode_strings(texts)
+
+    # 先确定各数组在文件中的位置，头部长度变化时重新计算
+    header = {"order": store.order, "top_k": store.top_k, "doc_ids": doc_ids, "detached": detached,
+              "meta": meta or {}, "arrays": {}}
+    data_start = 0
+    while True:
+        offset = data_start
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            header["arrays"][name] = [offset, array.dtype.str, list(array.shape)]
+            offset += -(-array.nbytes // _ALIGN) * _ALIGN
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        needed = -(-(_PREFIX.size + len(header_bytes)) // _ALIGN) * _ALIGN
+        if needed == data_start:
+            break
+        data_start = needed
+
+    dir_path = os.path.dirname(path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(header["arrays"][name][0])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(offset)
+    os.replace(tmp_path, path)
+    logger.info(f"模型快照已保存: {path}")
+
+
+def load_snapshot(path, with_corpus=True):
+    """以只读内存映射方式打开快照，返回 (存储, 语料字典, 附加信息)
+
+    n-gram数组直接引用映射的页面，不复制数据，多个进程可共享同一份物理内存。
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_len = _PREFIX.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise SnapshotError(f"不是有效的模型快照: {path}")
+    if version != VERSION:
+        raise SnapshotError(f"不支持的快照版本 {version}（当前版本 {VERSION}）")
+    header = json.loads(mapped[_PREFIX.size:_PREFIX.size + header_len].decode("utf-8"))
+
+    def array(name):
+        offset, dtype, shape = header["arrays"][name]
+        count = int(np.prod(shape)) if shape else 1
+        return np.frombuffer(mapped, dtype=np.dtype(dtype), count=count, offset=offset).reshape(shape)
+
+    vocab = Vocabulary()
+    vocab.words = _decode_strings(array("vocab_blob"), array("vocab_offsets"))
+    vocab.ids = dict(zip(vocab.words, range(len(vocab.words))))
+
+    order = header["order"]
+    tables = {}
+    for n in range(2, order + 1):
+        tables[n] = NgramTable(*(array(f"t{n}.{field}") for field in _TABLE_FIELDS))
+    store = NgramStore(vocab, array("unigram_counts"), tables, order,
+                       top_k=header["top_k"], top_unigram_ids=array("top_unigram_ids"))
+
+    corpus = {}
+    if with_corpus and header["doc_ids"]:
+        texts = _decode_strings(array("corpus_blob"), array("corpus_offsets"))
+        for i in header.get("detached", []):
+            texts[i] = None
+        corpus = dict(zip(header["doc_ids"], texts))
+
+    logger.info(f"模型快照已加载: {path}")
+    return store, corpus, header["meta"]
@@ -0,0 +1,188 @@
+import threading
+from collections import OrderedDict, defaultdict, deque
+
+from .smoothing import build_scorer
+
+
+class ModelState:
+    """只读的模型状态：n-gram存储、版本号及按需构建的平滑打分器
+
+    重建或增量更新后整体替换为新的实例，读取方先取得当前实例再使用，
+    一次调用内看到的始终是同一个版本，因此读路径不需要加锁。
+    """
+
+    def __init__(self, store, version):
+        self.store = store
+        self.version = version
+        self._scorers = {}
+
+    def scorer(self, method, alpha):
+        """返回指定平滑方法的打分器，首次使用时构建"""
+        key = (method, alpha)
+        scorer = self._scorers.get(key)
+        if scorer is None:
+            # 并发时可能重复构建，结果相同，后写入的覆盖即可
+            scorer = build_scorer(self.store, method, alpha)
+            self._scorers[key] = scorer
+        return scorer
+
+
+class KeySpace:
+    """把 (上下文, 词) 字符串对编码为整数键 context_id << 32 | word_id
+
+    上下文和词各自编号，与模型词表无关，重建模型后依然有效。查询不加锁，
+    分配新ID时加锁，可被多个会话线程同时使用。未编号的上下文或词得到负数键，不会与已有键冲突。
+    """
+
+    def __init__(self):
+        self._context_ids = {}
+        self._contexts = []
+        self._word_ids = {}
+        self._words = []
+        self._lock = threading.Lock()
+
+    def _intern(self, ids, strings, text):
+        with self._lock:
+            index = ids.get(text)
+            if index is None:
+                index = len(strings)
+                strings.append(text)
+                ids[text] = index
+        return index
+
+    def context_id(self, context, add=False):
+        """上下文的ID，不存在时 add=False 返回-1，否则分配新ID"""
+        index = self._context_ids.get(context)
+        if index is None:
+            return self._intern(self._context_ids, self._contexts, context) if add else -1
+        return index
+
+    def word_id(self, word, add=False):
+        """词的ID，不存在时 add=False 返回-1，否则分配新ID"""
+        index = self._word_ids.get(word)
+        if index is None:
+            return self._intern(self._word_ids, self._words, word) if add else -1
+        return index
+
+    def key(self, context, word, add=False):
+        return (self.context_id(context, add) << 32) | self.word_id(word, add)
+
+    def keys(self, context, words):
+        """同一上下文下各词的键，未编号的上下文和词随即分配ID，之后的键不再变化"""
+        base = self.context_id(context, add=True) << 32
+        ids = list(map(self._word_ids.get, words))
+        if None in ids:
+            ids = [self.word_id(word, add=True) for word in words]
+        return [base | index for index in ids]
+
+    def pair(self, key):
+        """由键还原 (上下文, 词)"""
+        return self._contexts[key >> 32], self._words[key & 0xFFFFFFFF]
+
+    def __deepcopy__(self, memo):
+        # 编码表由奖励表和各会话共用，复制会话时沿用同一个
+        return self
+
+
+class RewardTable:
+    """(状态, 动作) 的历史奖励，以 KeySpace 的整数键索引，按最近更新的顺序保存
+
+    写入时即裁剪到 [-limit, limit]，超出容量时淘汰最久未更新的条目，每次写入都是O(1)。
+    在写锁内原地更新，读取方不加锁；version 在每次反馈写完后递增，作为缓存的版本戳。
+    """
+
+    def __init__(self, keys, items=(), maxsize=5000, limit=1.5, version=0):
+        self.keys = keys
+        self._values = OrderedDict()
+        self.maxsize = maxsize
+        self.limit = limit
+        self.version = version
+        # 读路径直接使用字典的 get，省去一层方法调用
+        self.get = self._values.get
+        self.add_many((keys.key(state, action, add=True), value) for (state, action), value in items)
+
+    def add_many(self, deltas):
+        """依次累加多项 (整数键, 增量)，每项写入时裁剪并移到最近位置"""
+        values = self._values
+        get = values.get
+        move_to_end = values.move_to_end
+        low, high = -self.limit, self.limit
+        for key, delta in deltas:
+            old = get(key)
+            value = delta if old is None else old + delta
+            values[key] = high if value > high else low if value < low else value
+            if old is None:
+                if len(values) > self.maxsize:
+                    values.popitem(last=False)
+            else:
+                move_to_end(key)
+
+    def items(self):
+        """按从旧到新的顺序返回 ((状态, 动作), 奖励)"""
+        pair = self.keys.pair
+        return [(pair(key), value) for key, value in self._values.items()]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class Session:
+    """单个对话会话的强化学习状态：回复记录、动作计数和探索率
+
+    每条回复记录在一个以回复ID为键的环形缓冲区中，超出容量时丢弃最早的记录。
+    动作计数以 KeySpace 的整数键索引。
+    每个会话只应由一个线程使用；不同会话之间互不影响，可以并发生成回复。
+    """
+
+    def __init__(self, keys, epsilon=0.1, history_size=1000):
+        self.keys = keys
+        self.replies = {}
+        self._order = deque()
+        self._index = {}
+        self._next_id = 0
+        self.last_reply_id = None
+        self.history_size = history_size
+        self.action_counts = {}
+        self.epsilon = epsilon
+
+    def count_action(self, context, word, count=1):
+        """累加 (上下文, 词) 被选择的次数"""
+        key = self.keys.key(context, word, add=True)
+        self.action_counts[key] = self.action_counts.get(key, 0) + count
+
+    def counts_by_context(self):
+        """按上下文分组的动作计数 {上下文: {词: 次数}}，用于保存"""
+        grouped = defaultdict(dict)
+        for key, count in self.action_counts.items():
+            context, word = self.keys.pair(key)
+            grouped[context][word] = count
+        return dict(grouped)
+
+    def record(self, query, reply, states, reply_id=None):
+        """记录一条回复并返回其ID（重放日志时沿用原来的ID）"""
+        if reply_id is None:
+            reply_id = self._next_id
+        self._next_id = max(self._next_id, reply_id + 1)
+        self.replies[reply_id] = (query, reply, states)
+        self._order.append(reply_id)
+        self._index[(query, reply)] = reply_id
+        self.last_reply_id = reply_id
+        if len(self._order) > self.history_size:
+            oldest = self._order.popleft()
+            query, reply, _ = self.replies.pop(oldest)
+            if self._index.get((query, reply)) == oldest:
+                del self._index[(query, reply)]
+        return reply_id
+
+    def reply_ids(self):
+        """按时间顺序的回复ID"""
+        return list(self._order)
+
+    def find_reply(self, query, reply):
+        """返回 (查询, 回复) 对应的最近一条回复ID，不存在时为 None"""
+        return self._index.get((query, reply))
+
+    @property
+    def reply_history(self):
+        """按时间顺序的 (查询, 回复, 对话状态) 列表"""
+        return [self.replies[reply_id] for reply_id in self._order]
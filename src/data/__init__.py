@@ -3,5 +3,7 @@
 """
 
 from .preprocessor import TextPreprocessor
+from .manifest import DocumentManifest
+from .tokenizer import JiebaTokenizer, WhitespaceTokenizer, get_tokenizer
 
-__all__ = ['TextPreprocessor']
+__all__ = ['TextPreprocessor', 'DocumentManifest', 'JiebaTokenizer', 'WhitespaceTokenizer', 'get_tokenizer']
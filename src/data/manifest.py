@@ -0,0 +1,185 @@
+"""
+文档清单 - 记录已计入模型的每个文档，重新加载文件夹时只处理新增、修改和删除的文档
+
+清单保存每个文档的 (修改时间, 大小, 内容哈希)，以及按内容哈希保存的完整分词结果（即该文档对n-gram统计的贡献），
+文档被修改或删除时据此从模型中扣除旧的统计，不需要保留原文，也不需要重新读取其他文档。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from .tokenizer import TokenCache
+from ..utils.file_utils import FileUtils
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class DocumentManifest:
+    """文档清单：{路径: [修改时间(纳秒), 大小, 内容哈希]} 与按内容哈希保存的分词结果
+
+    清单文件和分析器的快照各自保存，每次保存清单都生成新的标识，由调用方写入分析器（manifest_id）
+    后再保存快照；加载时两者的标识不一致（例如两次保存之间进程中断）就不能增量更新，需要全量重建。
+    """
+
+    def __init__(self, directory: str, tokenizer_name: str):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.tokenizer_name = tokenizer_name
+        self.tokens = TokenCache(os.path.join(directory, "tokens"), tokenizer_name)
+        self.id: Optional[str] = None
+        self.documents: Dict[str, list] = {}
+
+    def load(self) -> bool:
+        """读取清单，文件不存在、损坏或分词器不同时返回 False"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('tokenizer') != self.tokenizer_name:
+            return False
+        self.id = data.get('id')
+        self.documents = data.get('documents', {})
+        return True
+
+    def save(self, new_id: bool = True) -> str:
+        """保存清单（先写临时文件再原子替换），返回其标识
+
+        new_id 为 False 时沿用原标识，只用于模型没有变化、仅更新了文档修改时间的情况。
+        """
+        if new_id or self.id is None:
+            self.id = uuid.uuid4().hex
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({'id': self.id, 'tokenizer': self.tokenizer_name, 'documents': self.documents},
+                      f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return self.id
+
+    def sync(self, analyzer, paths: Iterable[str], chunk_size: int = 1 << 20) -> dict:
+        """让分析器的模型与给定的文档一致，返回模型统计、各类文档的数量及模型是否变化（model_changed）
+
+        清单标识与分析器的 manifest_id 一致时只处理修改时间或大小变化的文档：内容哈希相同的只更新记录，
+        其余扣除旧的统计后重新统计；清单中有而 paths 中没有的文档被扣除。
+        否则（或缺少需要扣除的文档的分词记录时）清空模型，按 paths 全量构建。
+        模型变化时以新标识保存清单并设置 analyzer.manifest_id，调用方随后需要保存快照；
+        没有变化时不修改模型，清单沿用原标识，不必重新保存快照。
+        """
+        paths = list(dict.fromkeys(paths))
+        plan = None
+        if analyzer.is_ready and self.id is not None and self.id == analyzer.manifest_id:
+            plan = self._plan(paths, chunk_size)
+            if plan is None:
+                logger.warning("文档清单中缺少分词记录，改为全量构建")
+
+        if plan is not None:
+            changed, added, removed, touched, documents, stale = plan
+            model_changed = bool(changed or added or removed)
+            if model_changed:
+                analyzer.subtract_token_streams(stale)
+                stats = analyzer.add_token_stream(self._index(analyzer.tokenizer, changed + added, documents, chunk_size))
+            else:
+                stats = analyzer.get_stats()
+        else:
+            changed, added, removed, touched, documents = [], paths, [], 0, {}
+            model_changed = True
+            stats = analyzer.load_token_stream(self._index(analyzer.tokenizer, added, documents, chunk_size))
+
+        # 不再被任何文档引用的分词记录随之删除
+        live = {entry[2] for entry in documents.values()}
+        for key in {entry[2] for entry in self.documents.values()} - live:
+            self.tokens.discard(key)
+
+        if model_changed:
+            self.documents = documents
+            analyzer.manifest_id = self.save()
+        elif touched:
+            # 只记下新的修改时间，下次不必再计算这些文档的哈希；模型未变，快照中的标识仍然有效
+            self.documents = documents
+            self.save(new_id=False)
+        stats.update({'incremental': plan is not None, 'model_changed': model_changed, 'documents': len(documents),
+                      'unchanged': len(documents) - len(changed) - len(added) - touched,
+                      'touched': touched, 'changed': len(changed), 'added': len(added), 'removed': len(removed)})
+        logger.info(f"文档同步完成: 新增 {len(added)}，修改 {len(changed)}，删除 {len(removed)}")
+        return stats
+
+    def _plan(self, paths: List[str], chunk_size: int):
+        """对比清单与当前文件，返回 (修改的, 新增的, 删除的, 仅修改时间变化的数量, 保留的清单记录, 需要扣除的文档)
+
+        需要扣除的文档为 [(路径, 旧的词列表), ...]；缺少其分词记录时返回 None。
+        """
+        previous = self.documents
+        documents = {}
+        changed, added, touched = [], [], 0
+        current = set()
+
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # 列出文件之后被删除，按删除处理
+                continue
+            current.add(path)
+            entry = previous.get(path)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                documents[path] = entry
+            elif entry is not None and self._digest(path, chunk_size) == entry[2]:
+                # 只是修改时间变化，内容未变
+                documents[path] = [stat.st_mtime_ns, stat.st_size, entry[2]]
+                touched += 1
+            elif entry is not None:
+                changed.append(path)
+            else:
+                added.append(path)
+        removed = [path for path in previous if path not in current]
+
+        stale = []
+        for path in removed + changed:
+            tokens = self.tokens.load(previous[path][2])
+            if tokens is None:
+                return None
+            stale.append((path, tokens))
+        return changed, added, removed, touched, documents, stale
+
+    def _digest(self, path: str, chunk_size: int) -> str:
+        """按块读取文档计算内容哈希，与 TokenCache.key(全文) 相同；读取失败时为 None"""
+        digest = hashlib.sha1(f"{self.tokenizer_name}\0".encode("utf-8"))
+        try:
+            for chunk in FileUtils.iter_text_chunks(path, chunk_size):
+                digest.update(chunk.encode("utf-8"))
+        except (OSError, UnicodeDecodeError):
+            return None
+        return digest.hexdigest()
+
+    def _index(self, tokenizer, paths: List[str], documents: Dict[str, list], chunk_size: int):
+        """依次读取文档产出 (路径, 词列表)，同时计算内容哈希并保存完整的分词结果"""
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                logger.error(f"读取文件失败 {path}: {e}")
+                continue
+            digest = hashlib.sha1(f"{self.tokenizer_name}\0".encode("utf-8"))
+            words = []
+            try:
+                for chunk in FileUtils.iter_text_chunks(path, chunk_size):
+                    digest.update(chunk.encode("utf-8"))
+                    tokens = tokenizer.tokenize_document(chunk)
+                    words.extend(tokens)
+                    yield path, tokens
+            except (OSError, UnicodeDecodeError) as e:
+                # 已计入模型的部分照常记录，修改时间记为-1，下次同步时扣除后重新读取
+                logger.error(f"读取文件失败 {path}: {e}")
+                stat = None
+            key = digest.hexdigest()
+            self.tokens.store(key, words)
+            documents[path] = [stat.st_mtime_ns if stat else -1, stat.st_size if stat else -1, key]
@@ -0,0 +1,44 @@
+"""
+合成语料生成 - 用于基准测试和模型评估，可按需生成任意规模的语料
+"""
+
+import random
+from itertools import accumulate
+from typing import List
+
+
+def synthetic_corpus(num_docs: int, doc_len: int, vocab_size: int, seed: int = 0) -> List[str]:
+    """生成服从近似Zipf分布的合成语料（词语独立采样，以空格分隔）"""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocab_size)]
+    weights = [1.0 / (i + 1) for i in range(vocab_size)]
+    return [" ".join(rng.choices(words, weights=weights, k=doc_len)) for _ in range(num_docs)]
+
+
+def markov_corpus(num_docs: int, doc_len: int, vocab_size: int, branching: int = 8,
+                  follow_prob: float = 0.8, seed: int = 0) -> List[str]:
+    """生成带有上下文依赖的合成语料
+
+    每个词有 branching 个按Zipf分布选出的常见后继词，生成时以 follow_prob 的概率
+    从中选择下一个词，否则按全局Zipf分布采样，使n-gram模型能学到可评估的规律。
+    """
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocab_size)]
+    ids = range(vocab_size)
+    # 累积权重只算一次，每次采样为二分查找
+    cum_weights = list(accumulate(1.0 / (i + 1) for i in ids))
+    successor_cum_weights = list(accumulate(1.0 / (i + 1) for i in range(branching)))
+    successors = [rng.choices(ids, cum_weights=cum_weights, k=branching) for _ in ids]
+
+    texts = []
+    for _ in range(num_docs):
+        current = rng.choices(ids, cum_weights=cum_weights)[0]
+        doc = [current]
+        for _ in range(doc_len - 1):
+            if rng.random() < follow_prob:
+                current = rng.choices(successors[current], cum_weights=successor_cum_weights)[0]
+            else:
+                current = rng.choices(ids, cum_weights=cum_weights)[0]
+            doc.append(current)
+        texts.append(" ".join(words[i] for i in doc))
+    return texts
@@ -0,0 +1,140 @@
+"""
+分词器 - 把文本切分为n-gram模型使用的词序列
+
+分析器通过 tokenize（查询、上下文等短文本）和 tokenize_document（语料文档）两个方法分词，
+jieba 分词的文档结果按内容哈希缓存在磁盘上，重建模型时未变化的文档不必重新分词。
+"""
+
+import hashlib
+import logging
+import os
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WhitespaceTokenizer:
+    """按空白切分，适用于已经分好词的语料"""
+
+    name = "whitespace"
+    cache_dir = None
+
+    def tokenize(self, text: str) -> List[str]:
+        return text.split()
+
+    def tokenize_document(self, text: str) -> List[str]:
+        return text.split()
+
+
+class TokenCache:
+    """以 (分词器, 文档内容) 的哈希为键，把分词结果保存为目录中的文本文件（每行一个词）"""
+
+    def __init__(self, directory: str, namespace: str):
+        self.directory = directory
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        """文本的缓存键：分词器名称与文本内容的SHA-1"""
+        return hashlib.sha1(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".tok")
+
+    def get(self, text: str) -> Optional[List[str]]:
+        """返回缓存的分词结果，没有时为 None"""
+        tokens = self.load(self.key(text))
+        if tokens is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return tokens
+
+    def put(self, text: str, tokens: List[str]) -> None:
+        self.store(self.key(text), tokens)
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def load(self, key: str) -> Optional[List[str]]:
+        """按缓存键读取分词结果，没有时为 None"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data.split("\n") if data else []
+
+    def store(self, key: str, tokens: List[str]) -> None:
+        """按缓存键写入分词结果（先写临时文件再原子替换，多个进程同时写入同一文档也不会损坏）
+
+        目录在第一次写入时才创建，只读取的进程不会在磁盘上留下空目录。
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(tokens))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"写入分词缓存失败: {e}")
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class JiebaTokenizer:
+    """基于 TextPreprocessor.segment_text 的jieba分词，去掉空白词
+
+    已经用空格分好词的文本，空格处仍是词的边界，结果与按空白切分基本一致。
+    cache_dir 不为 None 时文档的分词结果缓存在该目录下。
+    """
+
+    name = "jieba"
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        from .preprocessor import TextPreprocessor
+        self.preprocessor = TextPreprocessor()
+        self.cache_dir = cache_dir
+        self.cache = TokenCache(cache_dir, self.name) if cache_dir else None
+
+    def tokenize(self, text: str) -> List[str]:
+        return [word for word in self.preprocessor.segment_text(text) if not word.isspace()]
+
+    def tokenize_document(self, text: str) -> List[str]:
+        if self.cache is None:
+            return self.tokenize(text)
+        tokens = self.cache.get(text)
+        if tokens is None:
+            tokens = self.tokenize(text)
+            self.cache.put(text, tokens)
+        return tokens
+
+
+def create_tokenizer(name: str, cache_dir: Optional[str] = None):
+    """按名称和缓存目录创建分词器，不读取配置（多进程构建时在子进程中重建同样的分词器）"""
+    if name == WhitespaceTokenizer.name:
+        return WhitespaceTokenizer()
+    if name == JiebaTokenizer.name:
+        return JiebaTokenizer(cache_dir)
+    raise ValueError(f"未知的分词器: {name}")
+
+
+def get_tokenizer(name: Optional[str] = None):
+    """按名称（缺省为配置 analysis.tokenizer）创建分词器：jieba 或 whitespace"""
+    from ..utils.config import get_config, get_path
+    name = name or get_config("analysis.tokenizer", "jieba")
+    cache_dir = None
+    if name == JiebaTokenizer.name and get_config("analysis.token_cache", True):
+        cache_dir = os.path.join(get_path("paths.cache", "models/cache"), "tokens")
+    return create_tokenizer(name, cache_dir)
@@ -2,6 +2,12 @@
 GUI模块 - 包含图形用户界面相关的类和组件
 """
 
-from .app import AIDialogApp
-
 __all__ = ['AIDialogApp']
+
+
+def __getattr__(name):
+    # 按需导入，使 gui.chart 等不依赖 Tkinter 的模块可以单独使用
+    if name == 'AIDialogApp':
+        from .app import AIDialogApp
+        return AIDialogApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
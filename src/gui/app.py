@@ -2,8 +2,9 @@
 import sys
 import threading
 import os
+import queue
 import time
-import random
+import logging
 
 try:
     import tkinter as tk
@@ -13,22 +14,27 @@ except ImportError as e:
     print("请确保已安装Python的tkinter库")
     sys.exit(1)
 
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from .chart import ProgressChart
+from ..core.analyzer import TextAnalyzer
+from ..data.manifest import DocumentManifest
+from ..utils.config import get_config, get_path
+from ..utils.file_utils import FileUtils
+from ..utils.startup import mark_startup
+
+logger = logging.getLogger(__name__)
+
+
+def _load_matplotlib():
+    """导入matplotlib的Tk后端（约0.5秒），在后台线程中调用，返回 (Figure, FigureCanvasTkAgg)"""
     import matplotlib
     matplotlib.use('TkAgg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
     
     # 设置matplotlib支持中文
-    plt.rcParams['font.sans-serif'] = ['SimHei'] 
-    plt.rcParams['axes.unicode_minus'] = False  
-except ImportError as e:
-    print(f"导入依赖库时出错: {e}")
-    print("请确保已安装所有必需的依赖库")
-    sys.exit(1)
-
-from ..core.analyzer import TextAnalyzer
-from ..utils.config import get_config
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    return Figure, FigureCanvasTkAgg
 
 
 class AIDialogApp:
@@ -51,15 +57,26 @@ class AIDialogApp:
         self.text_analyzer = TextAnalyzer()
         self.documents = []
         self.is_processing = False
+        self.snapshot_path = os.path.join(get_path("paths.models", "models"), "model.reko")
+        # 文档清单在首次处理文档时读取，之后只处理新增、修改和删除的文档
+        self.manifest = None
+        
+        # 推理工作线程：生成回复、预测和评分都在后台串行执行，主循环定时取回结果和生成进度
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.poll_interval = get_config("gui.poll_interval_ms", 16)
+        threading.Thread(target=self._inference_worker, name="reko-gui-inference", daemon=True).start()
         
         # 创建GUI
         self.create_widgets()
         
-        # 初始化可视化图形
-        self.init_visualization()
+        # 图表在后台导入matplotlib后再创建，窗口不必等待
+        self.chart = None
+        self.submit(_load_matplotlib, self._on_matplotlib_loaded)
         
         # 设置窗口关闭协议
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.after(self.poll_interval, self._poll_results)
         
         self.load_default_documents()
         
@@ -163,6 +180,8 @@ class AIDialogApp:
         # 可视化图形区域
         self.fig_frame = ttk.Frame(right_frame)
         self.fig_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.fig_placeholder = ttk.Label(self.fig_frame, text="图表加载中...", anchor=tk.CENTER)
+        self.fig_placeholder.pack(fill=tk.BOTH, expand=True)
         
     def update_stats_display(self, stats):
         """更新统计信息显示"""
@@ -171,50 +190,78 @@ class AIDialogApp:
         self.bigram_label.config(text=f"二元组数量: {stats.get('bigram_pairs', 0)}")
         self.trigram_label.config(text=f"三元组数量: {stats.get('trigram_pairs', 0)}")
     
-    def init_visualization(self):
+    def _on_matplotlib_loaded(self, result):
+        """matplotlib导入完成后在主线程中创建图表"""
+        if isinstance(result, Exception):
+            self.fig_placeholder.config(text=f"无法加载matplotlib: {result}")
+            return
+        self.fig_placeholder.destroy()
+        self.init_visualization(*result)
+        mark_startup("chart_ready")
+    
+    def init_visualization(self, Figure, FigureCanvasTkAgg):
         """初始化可视化图形 - 创建matplotlib图表并嵌入到Tkinter界面"""
-        # 创建matplotlib图形
-        self.fig, self.ax = plt.subplots(figsize=(4, 4))
+        # 创建matplotlib图形（不经过pyplot，图形随窗口一起销毁）
+        self.fig = Figure(figsize=(4, 4))
+        self.ax = self.fig.add_subplot()
         self.ax.set_title("推理进度", fontsize=14)
-        self.ax.set_xlabel("时间", fontsize=12)
-        self.ax.set_ylabel("匹配度", fontsize=12)
+        self.ax.set_xlabel("生成的词", fontsize=12)
+        self.ax.set_ylabel("选中概率", fontsize=12)
         self.ax.tick_params(axis='both', which='major', labelsize=10)
         
         # 嵌入到Tkinter中
         self.canvas = FigureCanvasTkAgg(self.fig, self.fig_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
-        # 初始化数据
-        self.time_points = []
-        self.match_scores = []
-        self.current_time = 0
+        # 折线常驻，新数据写入环形缓冲区，由主循环按帧局部重绘
+        self.chart = ProgressChart(self.ax, self.canvas,
+                                   capacity=get_config("gui.chart_points", 50),
+                                   max_fps=get_config("gui.max_fps", 30))
+    
+    def update_visualization(self, scores):
+        """更新可视化图形 - 添加一批新数据点（每个生成的词一个），在下一帧重绘"""
+        if self.chart is not None:
+            self.chart.add(scores)
+    
+    def post(self, func, *args):
+        """从后台线程请求在主线程中调用 func(*args)（Tkinter 组件只能在主线程中操作）"""
+        self.results.put(('call', func, *args))
+    
+    def submit(self, task, on_done=None):
+        """把任务交给推理线程执行，完成后在主线程中调用 on_done(结果)，出错时结果为异常对象"""
+        self.requests.put((task, on_done))
     
-    def update_visualization(self, score):
-        """更新可视化图形 - 添加新数据点并刷新图表显示"""
-        self.current_time += 1
-        self.time_points.append(self.current_time)
-        self.match_scores.append(score)
-        
-        # 保持数据点数量在合理范围内
-        if len(self.time_points) > 50:
-            self.time_points = self.time_points[-50:]
-            self.match_scores = self.match_scores[-50:]
-        
-        # 更新图表
-        self.ax.clear()
-        self.ax.plot(self.time_points, self.match_scores, 'b-')
-        self.ax.set_title("推理进度")
-        self.ax.set_xlabel("时间")
-        self.ax.set_ylabel("匹配度")
-        
-        # 设置y轴范围以保持图表美观
-        if self.match_scores:
-            min_score = min(self.match_scores)
-            max_score = max(self.match_scores)
-            padding = (max_score - min_score) * 0.1 if max_score > min_score else 0.1
-            self.ax.set_ylim(max(0, min_score - padding), max_score + padding)
-        
-        self.canvas.draw()
+    def _inference_worker(self):
+        """推理线程：按提交顺序逐个执行任务，结果放入结果队列"""
+        while True:
+            task, on_done = self.requests.get()
+            try:
+                result = task()
+            except Exception as e:
+                result = e
+            if on_done is not None:
+                self.results.put(('call', on_done, result))
+    
+    def _poll_results(self):
+        """主循环定时调用：取回推理结果和逐词进度并更新界面，每次处理不超过半个周期"""
+        deadline = time.perf_counter() + self.poll_interval / 2000
+        scores = []
+        while time.perf_counter() < deadline:
+            try:
+                kind, *payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'token':
+                scores.append(payload[0])
+            else:
+                func, *args = payload
+                func(*args)
+        if scores:
+            self.update_visualization(scores)
+        # 多个周期内生成的词合并为一次重绘，重绘频率不超过 gui.max_fps
+        if self.chart is not None:
+            self.chart.render()
+        self.root.after(self.poll_interval, self._poll_results)
         
     def load_documents(self):
         """加载技术文档 - 选择文件夹并异步加载所有TXT文件"""
@@ -227,30 +274,19 @@ class AIDialogApp:
             threading.Thread(target=self._load_documents_thread, args=(folder_path,), daemon=True).start()
     
     def _load_documents_thread(self, folder_path):
-        """在后台线程中加载文档 - 遍历文件夹读取所有TXT文件内容"""
+        """在后台线程中加载文档 - 遍历文件夹收集所有TXT文件，内容在处理时流式读取"""
         try:
-            documents = []
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    if file.endswith(".txt"):
-                        file_path = os.path.join(root, file)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                if content.strip():
-                                    documents.append(content)
-                        except Exception as e:
-                            print(f"读取文件 {file_path} 出错: {e}")
+            documents = [path for path in FileUtils.find_text_files(folder_path) if os.path.getsize(path) > 0]
             
             self.documents = documents
             
             # 更新UI
-            self.root.after(0, lambda: self.add_message("系统", f"成功加载 {len(documents)} 个文档"))
-            self.root.after(0, lambda: self.status_display.config(text=f"已加载 {len(documents)} 个文档"))
+            self.post(lambda: self.add_message("系统", f"成功加载 {len(documents)} 个文档"))
+            self.post(lambda: self.status_display.config(text=f"已加载 {len(documents)} 个文档"))
             
         except Exception as e:
-            self.root.after(0, lambda: self.add_message("系统", f"加载文档出错: {str(e)}"))
-            self.root.after(0, lambda: self.status_display.config(text="加载失败"))
+            self.post(lambda e=e: self.add_message("系统", f"加载文档出错: {str(e)}"))
+            self.post(lambda: self.status_display.config(text="加载失败"))
     
     def process_documents(self):
         """处理文档并构建统计信息 - 异步调用文本分析器处理文档"""
@@ -273,20 +309,34 @@ class AIDialogApp:
     def _process_documents_thread(self):
         """在后台线程中处理文档 - 调用文本分析器构建统计信息"""
         try:
-            # 处理文档
-            stats = self.text_analyzer.load_corpus(self.documents)
+            # 处理文档：边读取边统计，清单与已加载的模型一致时只处理新增、修改和删除的文档
+            analyzer = self.text_analyzer
+            chunk_size = get_config("analysis.stream_chunk_size", 1 << 20)
+            if self.manifest is None:
+                manifest = DocumentManifest(get_path("paths.manifest", "models/manifest"), analyzer.tokenizer.name)
+                manifest.load()
+                self.manifest = manifest
+            stats = self.manifest.sync(analyzer, self.documents, chunk_size)
+            if stats['model_changed']:
+                # 没有文档变化时不重写快照（快照可能正以内存映射方式使用）
+                analyzer.save(self.snapshot_path)
+            mark_startup("model_ready")
             
             # 更新UI
-            self.root.after(0, lambda s=stats: self.update_stats_display(s))
-            self.root.after(0, lambda: self.add_message("系统", f"文档处理完成! 词汇量: {stats['vocab_size']}"))
-            self.root.after(0, lambda: self.status_display.config(text="文档处理完成"))
+            self.post(lambda s=stats: self.update_stats_display(s))
+            if stats['incremental']:
+                self.post(lambda: self.add_message("系统", f"文档处理完成! 新增 {stats['added']} 篇，修改 {stats['changed']} 篇，"
+                                                        f"删除 {stats['removed']} 篇，词汇量: {stats['vocab_size']}"))
+            else:
+                self.post(lambda: self.add_message("系统", f"文档处理完成! 词汇量: {stats['vocab_size']}"))
+            self.post(lambda: self.status_display.config(text="文档处理完成"))
             
         except Exception as e:
-            self.root.after(0, lambda: self.add_message("系统", f"处理文档出错: {str(e)}"))
-            self.root.after(0, lambda: self.status_display.config(text="处理失败"))
+            self.post(lambda e=e: self.add_message("系统", f"处理文档出错: {str(e)}"))
+            self.post(lambda: self.status_display.config(text="处理失败"))
         finally:
             self.is_processing = False
-            self.root.after(0, lambda: self.process_button.config(state=tk.NORMAL, text="处理文档"))
+            self.post(lambda: self.process_button.config(state=tk.NORMAL, text="处理文档"))
     
     def predict_next_word(self):
         """预测下一个词 - 基于文本分析器预测用户输入的下一个可能词语"""
@@ -299,24 +349,24 @@ class AIDialogApp:
         if not user_text.strip():
             self.add_message("系统", "请输入一些文本以进行预测!")
             return
+        
+        # 在推理线程中预测下一个词
+        self.submit(lambda: self.text_analyzer.predict_next(user_text), self._show_predictions)
+    
+    def _show_predictions(self, next_words):
+        """显示预测结果（主线程）"""
+        if isinstance(next_words, Exception):
+            self.add_message("系统", f"预测出错: {str(next_words)}")
+        elif not next_words:
+            self.add_message("ReKo AI", "没有找到匹配的预测词。")
+        else:
+            # 显示结果
+            result_text = "可能的下一个词:\n"
+            for i, word in enumerate(next_words[:5]):
+                # 由于使用统计方法，我们无法计算精确概率，可以使用相对频率
+                result_text += f"{i+1}. {word}\n"
             
-        try:
-            # 预测下一个词
-            next_words = self.text_analyzer.predict_next(user_text)
-            
-            if not next_words:
-                self.add_message("ReKo AI", "没有找到匹配的预测词。")
-            else:
-                # 显示结果
-                result_text = "可能的下一个词:\n"
-                for i, word in enumerate(next_words[:5]):
-                    # 由于使用统计方法，我们无法计算精确概率，可以使用相对频率
-                    result_text += f"{i+1}. {word}\n"
-                
-                self.add_message("ReKo AI", result_text)
-                
-        except Exception as e:
-            self.add_message("系统", f"预测出错: {str(e)}")
+            self.add_message("ReKo AI", result_text)
     
     def send_message(self, event=None):
         """发送消息 - 处理用户输入并触发AI回复生成"""
@@ -327,45 +377,38 @@ class AIDialogApp:
             
             # 如果文档已处理，自动生成回复
             if self.text_analyzer.is_ready:
-                # 在生成回复时更新可视化
-                try:
-                    # 模拟匹配度分数更新 - 模拟神经网络推理过程
-                    for i in range(10):  # 模拟10个处理步骤
-                        # 计算一个模拟的匹配度分数，先上升后趋于稳定
-                        if i < 3:
-                            score = 0.2 + (i * 0.15) + random.uniform(-0.03, 0.03)
-                        elif i < 7:
-                            score = 0.65 + (i-3) * 0.05 + random.uniform(-0.02, 0.02)
-                        else:
-                            score = 0.85 + random.uniform(-0.01, 0.01)
-                        self.update_visualization(score)
-                        self.root.update()
-                        time.sleep(0.1)  # 短暂延迟展示动画效果
-                except:
-                    pass  # 即使可视化更新失败也继续生成回复
-                
                 self.generate_response(user_text)
     
     def generate_response(self, user_text):
-        """生成回复 - 调用文本分析器生成AI回复"""
-        try:
-            # 使用TextAnalyzer生成回复
-            response = self.text_analyzer.generate_reply(user_text)
-            
-            self.add_message("ReKo AI", response)
-                
-        except Exception as e:
-            self.add_message("ReKo AI", f"生成回复时出错: {str(e)}")
+        """生成回复 - 在推理线程中调用文本分析器，生成的每个词的概率实时显示在进度图中"""
+        analyzer = self.text_analyzer
+        
+        def task():
+            response = analyzer.generate_reply(user_text, on_token=lambda word, prob: self.results.put(('token', prob)))
+            # 默认会话只在推理线程中使用，此时的 last_reply_id 就是这条回复的ID
+            return response, analyzer.session.last_reply_id
+        
+        self.status_display.config(text="正在生成回复...")
+        self.submit(task, self._show_response)
     
-    def add_message(self, sender, message):
-        """添加消息到对话窗口 - 显示消息并为AI回复添加评分按钮"""
+    def _show_response(self, result):
+        """显示生成的回复（主线程）"""
+        self.status_display.config(text="就绪")
+        if isinstance(result, Exception):
+            self.add_message("ReKo AI", f"生成回复时出错: {str(result)}")
+        else:
+            response, reply_id = result
+            self.add_message("ReKo AI", response, reply_id)
+    
+    def add_message(self, sender, message, reply_id=None):
+        """添加消息到对话窗口 - 显示消息，带回复ID的AI回复添加评分按钮"""
         self.dialog_display.config(state=tk.NORMAL)
         
         # 插入发送者和消息
         self.dialog_display.insert(tk.END, f"[{sender}]: {message}\n")
         
-        # 如果是AI的回复，添加评分按钮
-        if sender == "ReKo AI":
+        # 如果是生成的AI回复，添加评分按钮
+        if sender == "ReKo AI" and reply_id is not None:
             # 保存当前的消息位置
             message_start = self.dialog_display.index(tk.END)
             
@@ -379,63 +422,50 @@ class AIDialogApp:
             
             # 添加点赞按钮
             like_button = tk.Button(button_frame, text="👍 有用", 
-                                  command=lambda msg=message: self.rate_reply(msg, 1.0),
+                                  command=lambda: self.rate_reply(reply_id, 1.0),
                                   bg="#4CAF50", fg="white", width=10, height=1, font=(font_family, font_size + 1))
             like_button.pack(side=tk.LEFT, padx=10, pady=5)
             
             # 添加点踩按钮
             dislike_button = tk.Button(button_frame, text="👎 没用", 
-                                     command=lambda msg=message: self.rate_reply(msg, -0.5),
+                                     command=lambda: self.rate_reply(reply_id, -0.5),
                                      bg="#F44336", fg="white", width=10, height=1, font=(font_family, font_size + 1))
             dislike_button.pack(side=tk.LEFT, padx=10, pady=5)
             
             # 将按钮框架嵌入到文本框中
             self.dialog_display.window_create(tk.END, window=button_frame)
             
-            # 保存消息和对应的评分按钮信息
-            if not hasattr(self, 'messages_with_ratings'):
-                self.messages_with_ratings = []
-            self.messages_with_ratings.append((message, button_frame, like_button, dislike_button))
+            # 按回复ID保存对应的评分按钮
+            if not hasattr(self, 'rating_buttons'):
+                self.rating_buttons = {}
+            self.rating_buttons[reply_id] = (like_button, dislike_button)
         
         self.dialog_display.insert(tk.END, "\n")
         self.dialog_display.config(state=tk.DISABLED)
         self.dialog_display.see(tk.END)
     
-    def rate_reply(self, message, rating):
-        """处理用户对回复的评分 - 更新强化学习奖励并禁用评分按钮"""
-        # 查找对应的查询（用户的最后一条消息）
-        if len(self.messages_with_ratings) > 0:
-            # 调用text_analyzer的update_reward方法更新奖励
-            # 获取最后一次对话的用户输入（这里简化处理，实际应该更精确地匹配对话对）
-            user_query = ""  # 这里需要完善，实际应该跟踪完整的对话历史
-            
-            # 如果有最近的对话历史
-            if hasattr(self.text_analyzer, 'reply_history') and self.text_analyzer.reply_history:
-                # 查找最匹配的对话
-                for hist_query, hist_reply, _ in reversed(self.text_analyzer.reply_history):
-                    if message in hist_reply or hist_reply in message:  # 简化的匹配逻辑
-                        user_query = hist_query
-                        break
-            
-            # 更新奖励
-            if user_query:
-                self.text_analyzer.update_reward(user_query, message, rating)
-                
-                # 反馈给用户
-                feedback = "感谢反馈！我会努力改进的。" if rating > 0 else "抱歉，我会继续学习改进。"
-                self.add_message("系统", feedback)
-            
-            # 禁用已评分的按钮，防止重复评分
-            for msg, frame, like_btn, dislike_btn in self.messages_with_ratings:
-                if msg == message:
-                    like_btn.config(state=tk.DISABLED, bg="#CCCCCC")
-                    dislike_btn.config(state=tk.DISABLED, bg="#CCCCCC")
-                    break
+    def rate_reply(self, reply_id, rating):
+        """处理用户对回复的评分 - 按回复ID更新强化学习奖励并禁用评分按钮"""
+        # 禁用已评分的按钮，防止重复评分
+        for button in self.rating_buttons.pop(reply_id, ()):
+            button.config(state=tk.DISABLED, bg="#CCCCCC")
+        
+        # 更新奖励需要写锁，重建模型期间会等待，因此也放到推理线程中执行
+        self.submit(lambda: self.text_analyzer.reward_reply(reply_id, rating),
+                    lambda updated: self._show_rating_feedback(updated, rating))
+    
+    def _show_rating_feedback(self, updated, rating):
+        """评分完成后反馈给用户（主线程），回复已超出历史容量时不再更新"""
+        if isinstance(updated, Exception):
+            self.add_message("系统", f"更新奖励出错: {str(updated)}")
+        elif updated:
+            feedback = "感谢反馈！我会努力改进的。" if rating > 0 else "抱歉，我会继续学习改进。"
+            self.add_message("系统", feedback)
     
     def load_default_documents(self):
         # 加载默认技术文档
         try:
-            sample_docs_path = get_config("paths.sample_docs", "resources/sample_docs")
+            sample_docs_path = get_path("paths.sample_docs", "resources/sample_docs")
             
             if not os.path.exists(sample_docs_path):
                 self.add_message("系统", f"默认文档路径不存在: {sample_docs_path}")
@@ -458,41 +488,50 @@ class AIDialogApp:
     
     def _load_default_documents_thread(self, folder_path):
         try:
-            documents = []
-            loaded_files = []
+            # 优先打开上次保存的模型快照，之后只需合并有变化的文档
+            if os.path.exists(self.snapshot_path):
+                try:
+                    stats = self.text_analyzer.load(self.snapshot_path)
+                    self.post(lambda s=stats: self.update_stats_display(s))
+                    self.post(lambda: self.add_message("系统", f"已加载模型快照: {self.snapshot_path}"))
+                    mark_startup("model_ready")
+                except Exception as e:
+                    logger.error(f"加载模型快照 {self.snapshot_path} 出错: {e}")
+            
+            # 恢复并持续记录强化学习反馈，进程意外退出也不会丢失
+            try:
+                self.text_analyzer.attach_feedback_log(get_path("paths.feedback", "models/feedback"))
+            except Exception as e:
+                logger.error(f"打开反馈日志出错: {e}")
             
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    if file.endswith(".txt"):
-                        file_path = os.path.join(root, file)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                if content.strip():
-                                    documents.append(content)
-                                    loaded_files.append(file)
-                        except Exception as e:
-                            print(f"读取文件 {file_path} 出错: {e}")
+            documents = [path for path in FileUtils.find_text_files(folder_path) if os.path.getsize(path) > 0]
+            loaded_files = [os.path.basename(path) for path in documents]
             
             if documents:
                 self.documents = documents
                 
-                self.root.after(0, lambda: self.add_message("系统", f"成功加载 {len(documents)} 个默认文档: {', '.join(loaded_files)}"))
-                self.root.after(0, lambda: self.status_display.config(text=f"已加载 {len(documents)} 个默认文档"))
+                self.post(lambda: self.add_message("系统", f"成功加载 {len(documents)} 个默认文档: {', '.join(loaded_files)}"))
+                self.post(lambda: self.status_display.config(text=f"已加载 {len(documents)} 个默认文档"))
                 
-                self.root.after(1000, self.process_documents)
+                self.post(lambda: self.root.after(1000, self.process_documents))
             else:
-                self.root.after(0, lambda: self.add_message("系统", f"在 {folder_path} 中未找到有效的TXT文档"))
-                self.root.after(0, lambda: self.status_display.config(text="未找到默认文档"))
+                self.post(lambda: self.add_message("系统", f"在 {folder_path} 中未找到有效的TXT文档"))
+                self.post(lambda: self.status_display.config(text="未找到默认文档"))
             
         except Exception as e:
-            self.root.after(0, lambda: self.add_message("系统", f"加载默认文档出错: {str(e)}"))
-            self.root.after(0, lambda: self.status_display.config(text="加载默认文档失败"))
+            self.post(lambda e=e: self.add_message("系统", f"加载默认文档出错: {str(e)}"))
+            self.post(lambda: self.status_display.config(text="加载默认文档失败"))
     
     def on_closing(self):
         """窗口关闭时的处理函数 - 清理资源并退出程序"""
-        # 清理资源
-        plt.close('all')  # 关闭所有matplotlib图形
+        # 模型有未保存的变化时才保存快照（奖励已由反馈日志持久化）
+        if self.text_analyzer.has_unsaved_changes and not self.is_processing:
+            try:
+                self.text_analyzer.save(self.snapshot_path)
+            except Exception as e:
+                logger.error(f"保存模型快照出错: {e}")
+        # 写完缓冲中的反馈事件，sys.exit 不会等待后台线程
+        self.text_analyzer.close_feedback_log()
         # 销毁窗口并退出程序
         self.root.destroy()
         import sys
@@ -0,0 +1,93 @@
+import time
+
+import numpy as np
+
+
+class ProgressChart:
+    """推理进度折线图：固定容量的环形缓冲区 + 背景缓存的局部重绘（blitting）
+
+    折线是常驻的 Line2D，每次只用 set_data 更新数据。坐标轴、标题等静态部分画一次后缓存为背景，
+    之后每帧只恢复背景、画折线并 blit 到画布上。新数据超出当前坐标范围时才整幅重绘，
+    x 轴宽度为缓冲区的两倍，写满后向后翻动一个缓冲区的长度，y 轴按缓冲区中的数据重新确定范围。
+    add 只写入缓冲区，render 由主循环按帧调用，两次重绘之间至少间隔 1 / max_fps 秒。
+    """
+
+    def __init__(self, ax, canvas, capacity=50, max_fps=30):
+        self.ax = ax
+        self.canvas = canvas
+        self.capacity = capacity
+        self.window = 2 * capacity
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        # 环形缓冲区：_end 为下一个写入位置，_size 为有效数据点数
+        self._x = np.zeros(capacity)
+        self._y = np.zeros(capacity)
+        self._end = 0
+        self._size = 0
+        self._count = 0
+        self._dirty = False
+        self._last_draw = 0.0
+        self._background = None
+        self.draws = 0
+        self.full_draws = 0
+
+        self.line, = ax.plot([], [], 'b-', animated=True)
+        ax.set_xlim(0, self.window)
+        ax.set_ylim(0, 1)
+        # 整幅重绘（包括窗口缩放）后重新缓存背景
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def add(self, scores):
+        """追加一批数据点（每个生成的词一个），不立即重绘"""
+        for score in scores:
+            self._count += 1
+            self._x[self._end] = self._count
+            self._y[self._end] = score
+            self._end = (self._end + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+        if scores:
+            self._dirty = True
+
+    def data(self):
+        """按时间顺序返回缓冲区中的 (x, y)"""
+        start = (self._end - self._size) % self.capacity
+        order = (np.arange(self._size) + start) % self.capacity
+        return self._x[order], self._y[order]
+
+    def render(self, now=None):
+        """有新数据且距上次重绘已满一帧时重绘，返回是否重绘"""
+        now = time.perf_counter() if now is None else now
+        if not self._dirty or now - self._last_draw < self.min_interval:
+            return False
+        x, y = self.data()
+        self.line.set_data(x, y)
+        if self._update_limits(x, y) or self._background is None:
+            # 坐标轴变化，整幅重绘；draw_event 中会缓存新的背景
+            self.canvas.draw()
+            self.full_draws += 1
+        else:
+            self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.ax.bbox)
+        self._dirty = False
+        self._last_draw = now
+        self.draws += 1
+        return True
+
+    def _update_limits(self, x, y):
+        """数据超出当前坐标范围时调整范围，返回是否调整"""
+        changed = False
+        left, right = self.ax.get_xlim()
+        if x[-1] > right:
+            left = max(0, x[-1] - self.capacity)
+            self.ax.set_xlim(left, left + self.window)
+            changed = True
+        bottom, top = self.ax.get_ylim()
+        low, high = y.min(), y.max()
+        if changed or low < bottom or high > top:
+            padding = (high - low) * 0.1 if high > low else 0.1
+            self.ax.set_ylim(max(0, low - padding), high + padding)
+            changed = True
+        return changed
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
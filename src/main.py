@@ -1,6 +1,21 @@
 #!/usr/bin/env python3
-"""ReKo AI - 基于神经网络的对话程序主入口"""
+"""ReKo AI - 基于神经网络的对话程序主入口
 
+窗口先显示出来，matplotlib 和 jieba 词典在后台线程中加载。
+
+用法:
+    python src/main.py [--profile-startup]
+
+--profile-startup 记录各启动阶段的耗时（首次绘制、图表就绪、模型就绪等），
+全部就绪后把报告写入日志目录下的 startup_profile.json 并退出。
+"""
+
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import json
 import sys
 import os
 import tkinter as tk
@@ -10,12 +25,24 @@ import logging
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.gui.app import AIDialogApp
-from src.utils.config import get_config_manager
+from src.utils.startup import mark_startup, start_profiling
+from src.utils.config import get_config_manager, get_path
+
+# 启动报告等待的阶段，超时后按已记录的阶段输出
+PROFILE_STAGES = ("first_paint", "chart_ready", "model_ready", "jieba_ready")
+PROFILE_TIMEOUT = 300
 
 
-def main():
+def main(argv=None):
     """启动ReKo AI应用程序"""
+    parser = argparse.ArgumentParser(description="ReKo AI 图形界面")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="记录启动各阶段耗时，就绪后输出报告并退出")
+    args = parser.parse_args(argv)
+    profiler = start_profiling(_START) if args.profile_startup else None
+    mark_startup("imports")
+
+    logger = logging.getLogger(__name__)
     try:
         # 初始化配置管理器
         config_manager = get_config_manager()
@@ -24,7 +51,7 @@ def main():
         log_level = config_manager.get("logging.level", "INFO")
         log_format = config_manager.get("logging.format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
         log_file_name = config_manager.get("logging.file", "reko_ai.log")
-        logs_dir = config_manager.get("paths.logs", "logs")
+        logs_dir = get_path("paths.logs", "logs")
         
         # 确保logs目录存在
         os.makedirs(logs_dir, exist_ok=True)
@@ -42,8 +69,8 @@ def main():
             ]
         )
 
-        logger = logging.getLogger(__name__)
         logger.info("启动 ReKo AI 应用程序")
+        mark_startup("config")
         
         # 从配置获取应用信息
         app_name = config_manager.get("app.name", "ReKo AI")
@@ -58,7 +85,21 @@ def main():
         window_height = config_manager.get("gui.window_height", 800)
         root.geometry(f"{window_width}x{window_height}")
         
+        # 界面模块在窗口创建后再导入（其中的 matplotlib 也只在后台线程中导入）
+        from src.gui.app import AIDialogApp
         app = AIDialogApp(root)
+        mark_startup("window")
+        
+        def first_paint():
+            root.update_idletasks()
+            mark_startup("first_paint")
+            # 窗口画出后再在后台加载jieba词典，避免与首次绘制争抢
+            from src.data.preprocessor import preload_jieba
+            preload_jieba()
+        
+        root.after(0, first_paint)
+        if profiler is not None:
+            root.after(100, _finish_profile, root, app, profiler, logs_dir)
         logger.info("GUI主循环启动")
         root.mainloop()
         
@@ -68,5 +109,18 @@ def main():
         sys.exit(1)
 
 
+def _finish_profile(root, app, profiler, logs_dir):
+    """各阶段全部就绪（或超时）后保存启动报告并关闭窗口"""
+    waiting = [stage for stage in PROFILE_STAGES if not profiler.has(stage)]
+    if waiting and time.perf_counter() - _START < PROFILE_TIMEOUT:
+        root.after(100, _finish_profile, root, app, profiler, logs_dir)
+        return
+    path = os.path.join(logs_dir, "startup_profile.json")
+    profiler.save(path)
+    print(json.dumps(profiler.report(), ensure_ascii=False), flush=True)
+    app.text_analyzer.close_feedback_log()
+    root.destroy()
+
+
 if __name__ == "__main__":
     main()
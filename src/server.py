@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""ReKo AI - 本地推理服务
+
+基于 asyncio 的HTTP服务，只监听 127.0.0.1。并发到达的请求按端点攒成小批，
+在单独的工作线程中统一计算，模型以只读内存映射方式加载。
+
+接口（请求和响应均为JSON）:
+    POST /predict   {"context": "..."}                          -> {"predictions": [...], "scores": [...]}
+    POST /reply     {"query": "...", "max_len": 20}             -> {"reply": "...", "reply_id": 0}
+    POST /feedback  {"reply_id": 0, "reward": 1}                -> {"ok": true}
+                    （也可用 {"query": "...", "reply": "...", "reward": 1}；回复已超出历史容量时 ok 为 false）
+    GET  /stats     各端点的请求数、p50/p99延迟和平均批大小
+
+用法:
+    python -m src.server [--snapshot 路径] [--port N] [--max-batch N] [--max-delay-ms N] [--feedback-dir 目录]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.analyzer import TextAnalyzer
+from src.utils.config import get_config, get_path
+
+logger = logging.getLogger(__name__)
+
+# 只允许本机访问
+HOST = "127.0.0.1"
+
+# 各接口请求体中字段的类型，类型不符时直接返回400，不进入批处理
+_FIELD_TYPES = {
+    'predict': {'context': str},
+    'reply': {'query': str, 'max_len': int},
+    'feedback': {'reply_id': int, 'reward': (int, float), 'query': str, 'reply': str},
+}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    """把并发到达的请求攒成一批，交给执行器一次处理"""
+
+    def __init__(self, handler, executor, max_batch_size=32, max_delay=0.002):
+        self.handler = handler
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        """提交一个请求并等待其结果"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """等到第一个请求后，在 max_delay 内继续收集，直到批满"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.handler, items)
+            except Exception as e:
+                logger.error(f"批处理失败: {e}")
+                results = [e] * len(batch)
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class LatencyRecorder:
+    """保留最近的若干次请求延迟，用于计算分位数"""
+
+    def __init__(self, maxlen=10000):
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return {'count': 0, 'p50_ms': None, 'p99_ms': None}
+        p50, p99 = np.percentile(np.fromiter(self.samples, dtype=np.float64), [50, 99]) * 1000
+        return {'count': self.count, 'p50_ms': float(p50), 'p99_ms': float(p99)}
+
+
+class InferenceServer:
+    """在一个只读加载的模型上提供预测、回复和反馈接口"""
+
+    def __init__(self, analyzer, max_batch_size=32, max_delay=0.002):
+        self.analyzer = analyzer
+        # 模型计算和强化学习状态更新都在同一个工作线程中串行执行
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reko-inference")
+        self.batchers = {
+            'predict': MicroBatcher(self._predict_batch, self.executor, max_batch_size, max_delay),
+            'reply': MicroBatcher(self._reply_batch, self.executor, max_batch_size, max_delay),
+            'feedback': MicroBatcher(self._feedback_batch, self.executor, max_batch_size, max_delay),
+        }
+        self.latency = {name: LatencyRecorder() for name in self.batchers}
+        self._tasks = []
+        self._server = None
+
+    # 批处理函数逐项捕获异常，某一项出错时只有该项返回异常，同批的其他请求照常完成
+
+    def _predict_batch(self, items):
+        # 同一批中相同的上下文只计算一次
+        results = {}
+        for item in items:
+            context = item.get('context', "")
+            if context not in results:
+                try:
+                    words = self.analyzer.predict_next(context)
+                    scores = self.analyzer.score_candidates(context, words).tolist() if words else []
+                    results[context] = {'predictions': words, 'scores': scores}
+                except Exception as e:
+                    results[context] = e
+        return [results[item.get('context', "")] for item in items]
+
+    def _reply_batch(self, items):
+        results = []
+        for item in items:
+            try:
+                reply = self.analyzer.generate_reply(item.get('query', ""), max_len=int(item.get('max_len', 20)))
+                results.append({'reply': reply, 'reply_id': self.analyzer.session.last_reply_id})
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _feedback_batch(self, items):
+        results = []
+        for item in items:
+            try:
+                reward = float(item.get('reward', 0))
+                if item.get('reply_id') is not None:
+                    ok = self.analyzer.reward_reply(int(item['reply_id']), reward)
+                else:
+                    ok = self.analyzer.update_reward(item.get('query', ""), item.get('reply', ""), reward)
+                results.append({'ok': ok})
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stats(self):
+        """各端点的延迟分位数和平均批大小"""
+        stats = {}
+        for name, batcher in self.batchers.items():
+            stats[name] = self.latency[name].summary()
+            stats[name]['mean_batch_size'] = batcher.items / batcher.batches if batcher.batches else 0.0
+        stats['cache_hit_rate'] = self.analyzer.cache.hit_rate
+        if self.analyzer.feedback_log is not None:
+            stats['feedback_log'] = self.analyzer.feedback_log.stats()
+        return stats
+
+    async def start(self, port=0):
+        """开始监听，port=0 时由系统分配端口，返回实际端口"""
+        self._tasks = [asyncio.create_task(batcher.run()) for batcher in self.batchers.values()]
+        self._server = await asyncio.start_server(self._handle_connection, HOST, port)
+        port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"推理服务已启动: http://{HOST}:{port}")
+        return port
+
+    async def close(self):
+        """停止监听并等待批处理任务退出；工作线程可能仍在处理一批请求，在另一个线程中等它结束，不阻塞事件循环"""
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def _handle_connection(self, reader, writer):
+        """处理一个连接上的若干个HTTP/1.1请求（支持keep-alive）"""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        name = path.strip("/")
+        if name == "stats":
+            if method != "GET":
+                return 405, {'error': "只支持GET"}
+            return 200, self.stats()
+        if name not in self.batchers:
+            return 404, {'error': f"未知的接口: {path}"}
+        if method != "POST":
+            return 405, {'error': "只支持POST"}
+        try:
+            item = json.loads(body or b"{}")
+            if not isinstance(item, dict):
+                raise ValueError("请求体应为JSON对象")
+        except ValueError as e:
+            return 400, {'error': f"请求体不是有效的JSON: {e}"}
+        error = _check_fields(name, item)
+        if error:
+            return 400, {'error': error}
+
+        start = time.perf_counter()
+        try:
+            result = await self.batchers[name].submit(item)
+        except Exception as e:
+            return 500, {'error': str(e)}
+        self.latency[name].add(time.perf_counter() - start)
+        return 200, result
+
+
+def _check_fields(name, item):
+    """检查请求体中字段的类型，不符合时返回错误信息"""
+    for field, types in _FIELD_TYPES[name].items():
+        value = item.get(field)
+        # JSON的 true/false 在Python中是 int 的子类，不能当作数字
+        if value is not None and (isinstance(value, bool) or not isinstance(value, types)):
+            return f"字段 {field} 的类型不正确"
+    return None
+
+
+async def _read_request(reader):
+    """读取一个HTTP请求，连接关闭时返回 None"""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def serve(analyzer, port, max_batch_size=32, max_delay=0.002):
+    """运行服务直到被中断"""
+    server = InferenceServer(analyzer, max_batch_size, max_delay)
+    await server.start(port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ReKo AI 本地推理服务")
+    parser.add_argument("--snapshot", default=os.path.join(get_path("paths.models", "models"), "model.reko"))
+    parser.add_argument("--port", type=int, default=get_config("server.port", 8765))
+    parser.add_argument("--max-batch", type=int, default=get_config("server.max_batch_size", 32))
+    parser.add_argument("--max-delay-ms", type=float, default=get_config("server.max_batch_delay_ms", 2))
+    parser.add_argument("--feedback-dir", default=get_path("paths.feedback", "models/feedback"),
+                        help="强化学习反馈日志目录，为空时不持久化")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()), stream=sys.stderr,
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if not os.path.exists(args.snapshot):
+        raise SystemExit(f"模型快照不存在: {args.snapshot}，请先运行 python -m src.cli build")
+    analyzer = TextAnalyzer()
+    try:
+        analyzer.load(args.snapshot, with_corpus=False)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if args.feedback_dir:
+        analyzer.attach_feedback_log(args.feedback_dir)
+    try:
+        asyncio.run(serve(analyzer, args.port, args.max_batch, args.max_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        analyzer.close_feedback_log()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,8 +13,8 @@ class ConfigManager:
     def __init__(self, config_dir: str = "config", config_file: str = "config.yaml"):
         """初始化配置管理器"""
         # 使用绝对路径，确保从项目根目录查找配置文件
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.config_dir = os.path.join(project_root, config_dir)
+        self.project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.config_dir = os.path.join(self.project_root, config_dir)
         self.config_file = config_file
         self.config_path = os.path.join(self.config_dir, config_file)
         self._config: Dict[str, Any] = {}
@@ -37,23 +37,47 @@ class ConfigManager:
                 "window_height": 800,
                 "theme": "default",
                 "font_family": "Microsoft YaHei",
-                "font_size": 10
+                "font_size": 10,
+                "poll_interval_ms": 16,
+                "max_fps": 30,
+                "chart_points": 50
             },
             "analysis": {
                 "max_vocabulary_size": 10000,
                 "min_word_frequency": 2,
                 "ngram_order": 3,
-                "smoothing_alpha": 0.1
+                "smoothing_alpha": 0.1,
+                "smoothing_method": "kneser_ney",
+                "prediction_top_k": 5,
+                "batch_reply_min_size": 64,
+                "build_workers": 1,
+                "preprocess_workers": 1,
+                "fused_cleaning": True,
+                "stream_chunk_size": 1048576,
+                "stream_batch_tokens": 1000000,
+                "prediction_cache_size": 4096,
+                "tokenizer": "jieba",
+                "token_cache": True
             },
             "reinforcement_learning": {
                 "learning_rate": 0.1,
                 "discount_factor": 0.9,
                 "exploration_rate": 0.1,
-                "max_episodes": 1000
+                "max_episodes": 1000,
+                "feedback_flush_ms": 200,
+                "feedback_compact_events": 20000
+            },
+            "server": {
+                "port": 8765,
+                "max_batch_size": 32,
+                "max_batch_delay_ms": 2
             },
             "paths": {
                 "sample_docs": "resources/sample_docs",
                 "models": "models",
+                "feedback": "models/feedback",
+                "cache": "models/cache",
+                "manifest": "models/manifest",
                 "logs": "logs"
             },
             "logging": {
@@ -193,6 +217,7 @@ class ConfigManager:
             
             for key, path in paths_config.items():
                 if isinstance(path, str):
+                    path = os.path.join(self.project_root, path)
                     try:
                         os.makedirs(path, exist_ok=True)
                         logger.debug(f"目录已创建: {path}")
@@ -223,6 +248,12 @@ def get_config(key: str, default: Any = None) -> Any:
     return get_config_manager().get(key, default)
 
 
+def get_path(key: str, default: str) -> str:
+    """获取路径配置，相对路径按项目根目录解析（与当前工作目录无关）"""
+    manager = get_config_manager()
+    return os.path.join(manager.project_root, manager.get(key, default))
+
+
 def set_config(key: str, value: Any) -> bool:
     """设置配置值（快捷方式）"""
     return get_config_manager().set(key, value)
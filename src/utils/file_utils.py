@@ -1,11 +1,14 @@
 import os
+import re
 import logging
 import json
-import yaml
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
 
 logger = logging.getLogger(__name__)
 
+# 文本块的切分点：全角句末标点之后（中文句末没有空格）、后跟空白的半角句末标点之后，或换行之后
+_SENTENCE_BOUNDARY = re.compile(r'[。！？]|[!?.](?=\s)|\n')
+
 
 class FileUtils:
     """文件工具类"""
@@ -68,10 +71,13 @@ class FileUtils:
     
     @staticmethod
     def load_yaml_file(file_path: str) -> Optional[Dict[str, Any]]:
-        """加载YAML文件"""
+        """加载YAML文件（有C扩展时使用更快的 CSafeLoader）"""
+        # 按需导入，不使用配置文件的命令不必加载 yaml
+        import yaml
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
+                data = yaml.load(f, Loader=loader)
             logger.info(f"加载YAML文件成功: {file_path}")
             return data
         except Exception as e:
@@ -81,6 +87,7 @@ class FileUtils:
     @staticmethod
     def save_yaml_file(file_path: str, data: Dict[str, Any]) -> bool:
         """保存YAML文件"""
+        import yaml
         try:
             dir_path = os.path.dirname(file_path)
             if dir_path:
@@ -120,3 +127,64 @@ class FileUtils:
         except Exception as e:
             logger.error(f"获取文件列表失败 {directory}: {e}")
             return []
+    
+    @staticmethod
+    def find_text_files(directory: str, extension: str = ".txt") -> List[str]:
+        """递归查找目录下指定扩展名的文件"""
+        file_list = []
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                if file.endswith(extension):
+                    file_list.append(os.path.join(root, file))
+        return file_list
+    
+    @staticmethod
+    def iter_text_chunks(file_path: str, chunk_size: int = 1 << 20, encoding: str = 'utf-8') -> Iterator[str]:
+        """按块读取文本文件，每块约 chunk_size 个字符
+
+        块在句子边界（全角句末标点、后跟空白的半角句末标点或换行之后）切开，找不到时退而在空白处切开。
+        jieba 分词总在全角标点处断开，按空白分词的文本在半角标点和空白处断开，因此一个词不会被拆到两个块里。
+        """
+        buffer = ""
+        with open(file_path, 'r', encoding=encoding) as f:
+            while True:
+                piece = f.read(chunk_size)
+                if not piece:
+                    break
+                buffer += piece
+                if len(buffer) < chunk_size:
+                    continue
+                
+                cut = FileUtils._find_chunk_boundary(buffer)
+                if cut == 0 and len(buffer) >= 4 * chunk_size:
+                    # 长时间没有空白时强制切开，保证内存有界
+                    cut = len(buffer)
+                if cut > 0:
+                    yield buffer[:cut]
+                    buffer = buffer[cut:]
+        if buffer:
+            yield buffer
+    
+    @staticmethod
+    def _find_chunk_boundary(text: str) -> int:
+        """返回文本中最后一个可切分位置，找不到时返回0"""
+        # 只在后半段查找，避免对整块做完整扫描
+        start = len(text) // 2
+        last = None
+        for last in _SENTENCE_BOUNDARY.finditer(text, start):
+            pass
+        if last is not None:
+            return last.end()
+        space = max(text.rfind(c, start) for c in (' ', '\t', '\n', '\u3000'))
+        return space + 1 if space >= 0 else 0
+    
+    @staticmethod
+    def iter_documents(file_paths: Iterable[str], chunk_size: int = 1 << 20,
+                       encoding: str = 'utf-8') -> Iterator[Tuple[str, str]]:
+        """依次产出 (文件路径, 文本块)，同一文件的块连续出现"""
+        for file_path in file_paths:
+            try:
+                for chunk in FileUtils.iter_text_chunks(file_path, chunk_size, encoding):
+                    yield file_path, chunk
+            except Exception as e:
+                logger.error(f"读取文件失败 {file_path}: {e}")
@@ -0,0 +1,61 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """记录启动过程中各个阶段距进程启动的时间（秒）"""
+
+    def __init__(self, start: float):
+        """start 为入口模块最早取得的 time.perf_counter()"""
+        self.start = start
+        self.marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> None:
+        """记录一个阶段，同名阶段只保留第一次"""
+        elapsed = time.perf_counter() - self.start
+        with self._lock:
+            if name not in self.marks:
+                self.marks[name] = elapsed
+                logger.info(f"启动阶段 {name}: {elapsed * 1000:.1f} ms")
+
+    def has(self, name: str) -> bool:
+        return name in self.marks
+
+    def report(self) -> Dict[str, float]:
+        """按时间顺序返回 {阶段: 毫秒}"""
+        with self._lock:
+            items = sorted(self.marks.items(), key=lambda item: item[1])
+        return {name: round(seconds * 1000, 1) for name, seconds in items}
+
+    def save(self, path: str) -> None:
+        """把报告保存为JSON文件"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+_profiler: Optional[StartupProfiler] = None
+
+
+def start_profiling(start: float) -> StartupProfiler:
+    """开始记录启动阶段，之后 mark_startup 生效"""
+    global _profiler
+    _profiler = StartupProfiler(start)
+    return _profiler
+
+
+def get_profiler() -> Optional[StartupProfiler]:
+    return _profiler
+
+
+def mark_startup(name: str) -> None:
+    """记录启动阶段；没有开始记录时什么也不做"""
+    if _profiler is not None:
+        _profiler.mark(name)
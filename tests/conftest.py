@@ -0,0 +1,24 @@
+"""测试公共设置：使用按空白切分的分词器，缓存、清单和反馈目录都放在临时目录中"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import get_config, set_config
+
+_PATHS = ("paths.cache", "paths.manifest", "paths.feedback")
+_OVERRIDES = ("analysis.tokenizer", "analysis.token_cache") + _PATHS
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path):
+    saved = {key: get_config(key) for key in _OVERRIDES}
+    set_config("analysis.tokenizer", "whitespace")
+    for key in _PATHS:
+        set_config(key, str(tmp_path / key.split(".")[1]))
+    yield
+    for key, value in saved.items():
+        set_config(key, value)
@@ -0,0 +1,56 @@
+"""测试用的模型比较函数"""
+
+import os
+
+import numpy as np
+
+SAMPLE_DOCS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "sample_docs")
+
+
+def sample_documents():
+    """读取项目自带的示例文档"""
+    texts = []
+    for name in sorted(os.listdir(SAMPLE_DOCS)):
+        if name.endswith(".txt"):
+            with open(os.path.join(SAMPLE_DOCS, name), encoding="utf-8") as f:
+                texts.append(f.read())
+    return texts
+
+
+def decode_ngrams(store):
+    """将存储还原为 {阶数: {词元组: 计数}}，用于比较不同构建方式的结果"""
+    words = store.vocab.words
+    grams = np.arange(len(words), dtype=np.int64)[:, None]
+    result = {1: {(words[i],): int(c) for i, c in enumerate(store.unigram_counts) if c}}
+    for n in range(2, store.order + 1):
+        table = store.tables[n]
+        parents = np.repeat(table.contexts, np.diff(table.offsets))
+        grams = np.hstack([grams[parents], table.next_ids[:, None].astype(np.int64)])
+        result[n] = {tuple(words[i] for i in row): int(c) for row, c in zip(grams, table.counts)}
+    return result
+
+
+def assert_equivalent(analyzer, rebuilt):
+    """断言两个分析器的计数、统计和预测相同（词ID分配可以不同）"""
+    assert analyzer.get_stats() == rebuilt.get_stats()
+    counts = decode_ngrams(rebuilt.store)
+    assert decode_ngrams(analyzer.store) == counts
+    for context in counts[2]:
+        for ctx in (context[-1:], context)[:rebuilt.store.order - 1]:
+            got = analyzer.predict_next(" ".join(ctx))
+            want = rebuilt.predict_next(" ".join(ctx))
+            order = len(ctx) + 1
+            # 计数相同的候选词之间顺序依赖词ID分配，只比较计数序列
+            assert [counts[order].get(ctx + (w,), 0) for w in got] == \
+                [counts[order].get(ctx + (w,), 0) for w in want], ctx
+
+
+def assert_identical(a, b):
+    """断言两个存储的词表与全部数组逐位相同"""
+    assert a.vocab.words == b.vocab.words
+    assert np.array_equal(a.unigram_counts, b.unigram_counts)
+    assert a.tables.keys() == b.tables.keys()
+    for n in a.tables:
+        for name in ("contexts", "offsets", "next_ids", "counts", "totals", "probs", "topk"):
+            x, y = getattr(a.tables[n], name), getattr(b.tables[n], name)
+            assert x.dtype == y.dtype and np.array_equal(x, y), (n, name)
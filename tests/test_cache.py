@@ -0,0 +1,83 @@
+"""预测缓存：不改变预测与回复结果，模型或奖励表变化后不返回旧结果"""
+
+import random
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.core.cache import LRUCache
+from src.data.synthetic import synthetic_corpus
+
+
+def build(texts, size):
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    analyzer.cache = LRUCache(size)
+    return analyzer
+
+
+@pytest.fixture
+def texts():
+    return synthetic_corpus(40, 40, 150)
+
+
+@pytest.fixture
+def keystrokes(texts):
+    # 逐词输入时反复预测同一句子的各个前缀
+    rng = random.Random(3)
+    sentences = [rng.choice(texts).split()[:6] for _ in range(20)]
+    return [" ".join(words[:i]) for words in sentences for i in range(1, len(words) + 1)]
+
+
+def run(analyzer, keystrokes):
+    random.seed(0)
+    analyzer.epsilon = 0.1
+    predictions = [analyzer.predict_next(context) for context in keystrokes]
+    replies = [analyzer.generate_reply(context) for context in keystrokes[::3] * 2]
+    return predictions, replies
+
+
+def test_cache_does_not_change_results(texts, keystrokes):
+    plain, cached = build(texts, 0), build(texts, 256)
+    assert run(cached, keystrokes) == run(plain, keystrokes)
+    assert cached.cache.hits > 0
+    assert len(plain.cache) == 0
+
+
+def test_lru_evicts_oldest_and_checks_version():
+    cache = LRUCache(2)
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    assert cache.get("a", 1) == "A"
+    cache.put("c", 1, "C")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 2) is None
+    assert cache.get("c", 1) == "C"
+
+
+def test_predictions_follow_added_documents(texts, keystrokes):
+    plain, cached = build(texts, 0), build(texts, 256)
+    run(cached, keystrokes)
+    extra = synthetic_corpus(10, 40, 150, seed=1)
+    for analyzer in (plain, cached):
+        analyzer.add_documents(extra)
+    assert [cached.predict_next(c) for c in keystrokes] == [plain.predict_next(c) for c in keystrokes]
+
+
+def test_action_values_follow_rewards(texts, keystrokes):
+    plain, cached = build(texts, 0), build(texts, 256)
+    state = keystrokes[1]
+    actions = cached.predict_next(state)
+    cached.epsilon = plain.epsilon = 0.0
+    cached.select_action(state, actions)
+    for analyzer in (plain, cached):
+        reply_id = analyzer.session.record(state, state, [(state, actions[0], 0.5)])
+        analyzer.reward_reply(reply_id, 1.0)
+    cached.select_action(state, actions)
+
+    key = ('action', state, tuple(actions))
+    version = (cached.model.version, cached.rewards.version, cached.smoothing, cached.smoothing_alpha)
+    values, _ = cached.cache.get(key, version)
+    expected = plain._action_values(plain.model, plain.rewards, state, actions, plain._keys.keys(state, actions))
+    assert list(values) == expected.tolist()
+    assert values[0] != cached._score(cached.model, state, actions)[0]
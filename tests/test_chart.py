@@ -0,0 +1,57 @@
+"""进度图：环形缓冲区按时间顺序保留最近的数据点，只在坐标范围变化时整幅重绘，按帧率合并重绘"""
+
+import random
+
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from src.gui.chart import ProgressChart
+
+
+def make_chart(capacity, max_fps=0):
+    fig = Figure(figsize=(4, 4))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    canvas.draw()
+    return ProgressChart(ax, canvas, capacity=capacity, max_fps=max_fps)
+
+
+@pytest.mark.parametrize("points", [3, 10, 25])
+def test_buffer_keeps_latest_points_in_order(points):
+    rng = random.Random(23)
+    scores = [rng.uniform(0.05, 0.6) for _ in range(points)]
+    chart = make_chart(10)
+    chart.add(scores[:2])
+    chart.add(scores[2:])
+    x, y = chart.data()
+    assert y.tolist() == scores[-10:]
+    assert x.tolist() == list(range(max(points - 9, 1), points + 1))
+
+
+def test_full_redraw_only_when_limits_change():
+    chart = make_chart(10)
+    for _ in range(20):
+        chart.add([0.5])
+        assert chart.render()
+    # 第一帧缓存背景，之后x轴宽度（缓冲区的两倍）以内都只局部重绘
+    assert (chart.draws, chart.full_draws) == (20, 1)
+    chart.add([0.5])
+    chart.render()
+    assert chart.full_draws == 2
+    assert chart.ax.get_xlim() == (11, 31)
+    chart.add([2.0])
+    chart.render()
+    assert chart.full_draws == 3 and chart.ax.get_ylim()[1] > 2.0
+
+
+def test_render_is_limited_by_frame_rate():
+    chart = make_chart(10, max_fps=10)
+    assert not chart.render(now=1.0)
+    chart.add([0.1, 0.2])
+    assert chart.render(now=1.0)
+    chart.add([0.3])
+    assert not chart.render(now=1.05)
+    assert chart.render(now=1.1)
+    assert not chart.render(now=2.0)
+    assert chart.draws == 2
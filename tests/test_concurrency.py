@@ -0,0 +1,68 @@
+"""并发读取与后台重建：读线程看到的始终是某一个完整的模型版本"""
+
+import random
+import sys
+import threading
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.core.cache import LRUCache
+from src.data.synthetic import synthetic_corpus
+
+
+@pytest.fixture
+def fast_switching():
+    # 缩短线程切换间隔，增加交错执行的机会
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_readers_see_complete_models_during_rebuilds(fast_switching):
+    corpora = [synthetic_corpus(60, 100, 500, seed=seed) for seed in (0, 1)]
+    rng = random.Random(7)
+    contexts = [" ".join(rng.choice(corpora[i % 2]).split()[:rng.choice([1, 2])]) for i in range(100)]
+    expected = []
+    for texts in corpora:
+        reference = TextAnalyzer()
+        reference.cache = LRUCache(0)
+        reference.load_corpus(texts)
+        expected.append({c: reference.predict_next(c) for c in contexts})
+
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(corpora[0])
+    stop = threading.Event()
+    errors = []
+    rounds = [0] * 4
+
+    def reader(index):
+        session = analyzer.new_session()
+        local = random.Random(index)
+        try:
+            while not stop.is_set():
+                context = local.choice(contexts)
+                result = analyzer.predict_next(context)
+                if result not in (expected[0][context], expected[1][context]):
+                    errors.append(f"预测结果不属于任何一个模型版本: {context!r} -> {result}")
+                reply = analyzer.generate_reply(context, session=session)
+                if local.random() < 0.2:
+                    analyzer.update_reward(context, reply, local.choice([1, -1]), session=session)
+                rounds[index] += 1
+        except Exception as e:
+            errors.append(f"读线程异常: {e!r}")
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(len(rounds))]
+    for thread in threads:
+        thread.start()
+    try:
+        for i in range(10):
+            analyzer.load_corpus(corpora[(i + 1) % 2])
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert not errors, "\n".join(errors[:10])
+    assert all(rounds)
@@ -0,0 +1,20 @@
+"""路径配置按项目根目录解析，与当前工作目录无关"""
+
+import os
+
+from src.cli import default_snapshot_path
+from src.utils.config import get_config_manager, get_path, set_config
+
+
+def test_relative_paths_resolve_against_project_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    root = get_config_manager().project_root
+    set_config("paths.manifest", "models/manifest")
+    assert get_path("paths.manifest", "unused") == os.path.join(root, "models", "manifest")
+    assert get_path("paths.missing", "models/x") == os.path.join(root, "models", "x")
+    assert os.path.dirname(default_snapshot_path()) == get_path("paths.models", "models")
+
+
+def test_absolute_paths_are_kept(tmp_path):
+    set_config("paths.manifest", str(tmp_path / "manifest"))
+    assert get_path("paths.manifest", "models/manifest") == str(tmp_path / "manifest")
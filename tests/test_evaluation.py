@@ -0,0 +1,37 @@
+"""留出集评估：top-k准确率与逐个位置调用 predict_next 的结果一致，k 可以超过预计算宽度"""
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.core.evaluation import evaluate, split_corpus
+from src.data.synthetic import synthetic_corpus
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return split_corpus(synthetic_corpus(40, 40, 150), holdout_ratio=0.2)
+
+
+def reference_accuracy(analyzer, texts, k):
+    """逐个位置以之前的 order-1 个词预测，统计真实词在前k个预测中的比例"""
+    analyzer.top_k = k
+    hits = total = 0
+    for text in texts:
+        words = text.split()
+        for i, word in enumerate(words):
+            context = words[max(0, i - analyzer.store.order + 1):i]
+            hits += word in analyzer.predict_next(" ".join(context))
+            total += 1
+    return hits / total
+
+
+@pytest.mark.parametrize("order", [2, 3])
+@pytest.mark.parametrize("k", [1, 5, 12, 200])
+def test_top_k_accuracy_matches_predict_next(corpus, order, k):
+    train, heldout = corpus
+    analyzer = TextAnalyzer()
+    analyzer.ngram_order = order
+    analyzer.load_corpus(train)
+    result = evaluate(analyzer, heldout, k=k)
+    assert result['top_k'] == k
+    assert result['top_k_accuracy'] == pytest.approx(reference_accuracy(analyzer, heldout, k))
@@ -0,0 +1,65 @@
+"""按回复ID评分：奖励与逐条累加后裁剪的结果一致，奖励表超出容量时淘汰最久未更新的条目"""
+
+import random
+from collections import Counter, defaultdict
+
+from src.core.analyzer import TextAnalyzer
+from src.core.state import KeySpace, RewardTable
+from src.data.synthetic import synthetic_corpus
+
+
+def reference_update(analyzer, rewards, dialog, reward):
+    """按对话状态从后往前累加折扣后的奖励，最后裁剪到 [-1.5, 1.5]"""
+    lr = analyzer.learning_rate
+    if abs(reward) > 0.8:
+        lr *= 1.5
+    elif abs(reward) < 0.3:
+        lr *= 0.7
+    for state, action, prob in reversed(dialog):
+        rewards[(state, action)] += lr * reward * (1.0 / max(prob, 0.1))
+        reward *= analyzer.discount_factor
+    for key in rewards:
+        rewards[key] = max(-1.5, min(1.5, rewards[key]))
+
+
+def test_reward_reply_matches_reference():
+    texts = synthetic_corpus(30, 40, 100)
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    rng = random.Random(11)
+    random.seed(0)
+    reply_ids = []
+    for _ in range(40):
+        analyzer.generate_reply(" ".join(rng.choice(texts).split()[:2]))
+        reply_ids.append(analyzer.session.last_reply_id)
+    # 同一 (状态, 动作) 在一条回复中出现多次时两种做法的裁剪时机不同，只用不重复的回复校验
+    records = [analyzer.session.replies[reply_id] for reply_id in reply_ids]
+    unique = [reply_id for reply_id, (_, _, dialog) in zip(reply_ids, records)
+              if max(Counter((s, a) for s, a, _ in dialog).values(), default=1) == 1]
+
+    expected = defaultdict(float)
+    for reply_id in unique[:20]:
+        reward = rng.choice([1.0, -0.5, 0.2])
+        version = analyzer.rewards.version
+        assert analyzer.reward_reply(reply_id, reward)
+        assert analyzer.rewards.version == version + 1
+        reference_update(analyzer, expected, analyzer.session.replies[reply_id][2], reward)
+    current = dict(analyzer.rewards.items())
+    assert current.keys() == expected.keys()
+    assert all(abs(current[key] - value) < 1e-12 for key, value in expected.items())
+
+
+def test_unknown_reply_id_is_ignored():
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(synthetic_corpus(5, 20, 30))
+    assert not analyzer.reward_reply(12345, 1.0)
+    assert analyzer.update_reward("没有", "这条回复", 1.0) is False
+    assert len(analyzer.rewards) == 0
+
+
+def test_reward_table_clips_and_evicts_least_recent():
+    table = RewardTable(KeySpace(), maxsize=3)
+    keys = [table.keys.key("状态", word, add=True) for word in "abcd"]
+    table.add_many([(keys[0], 1.0), (keys[1], 1.0), (keys[2], 1.0)])
+    table.add_many([(keys[0], 1.0), (keys[3], -2.0)])
+    assert table.items() == [(("状态", "c"), 1.0), (("状态", "a"), 1.5), (("状态", "d"), -1.5)]
@@ -0,0 +1,81 @@
+"""反馈日志：重放日志与压缩后重放得到的强化学习状态与写入时一致"""
+
+import os
+import random
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.data.synthetic import synthetic_corpus
+
+
+def rl_state(analyzer):
+    """强化学习状态中需要持久化的部分"""
+    session = analyzer.session
+    return (analyzer.rewards.items(), session.reply_ids(), session.reply_history,
+            session.counts_by_context(), session.epsilon)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    texts = synthetic_corpus(30, 40, 100)
+    path = str(tmp_path / "model.reko")
+    builder = TextAnalyzer()
+    builder.load_corpus(texts)
+    builder.save(path)
+    return path, texts
+
+
+def restore(path, directory):
+    analyzer = TextAnalyzer()
+    analyzer.load(path)
+    analyzer.attach_feedback_log(directory)
+    return analyzer
+
+
+def test_replay_and_compaction_restore_state(tmp_path, snapshot):
+    path, texts = snapshot
+    directory = str(tmp_path / "feedback")
+    logged = restore(path, directory)
+    rng = random.Random(13)
+    random.seed(0)
+    queries = [" ".join(rng.choice(texts).split()[:2]) for _ in range(40)]
+    ids = []
+    for query in queries:
+        logged.generate_reply(query)
+        ids.append(logged.session.last_reply_id)
+    logged.generate_replies(queries[:10])
+    for _ in range(30):
+        logged.reward_reply(rng.choice(ids), rng.choice([1.0, -0.5, 0.2]))
+    logged.feedback_log.flush()
+    expected = rl_state(logged)
+    logged.close_feedback_log()
+    assert len(expected[0]) > 0
+
+    # 模拟进程中断：最后一行只写了一半
+    with open(os.path.join(directory, "feedback.jsonl"), "a", encoding="utf-8") as f:
+        f.write('{"type": "reward", "del')
+    restored = restore(path, directory)
+    assert rl_state(restored) == expected
+    restored.feedback_log.compact()
+    restored.close_feedback_log()
+    compacted = restore(path, directory)
+    assert rl_state(compacted) == expected
+    compacted.close_feedback_log()
+
+
+def test_empty_directory_keeps_current_state(tmp_path, snapshot):
+    path, texts = snapshot
+    analyzer = TextAnalyzer()
+    analyzer.load(path)
+    reply = analyzer.generate_reply(texts[0].split()[0])
+    analyzer.update_reward(texts[0].split()[0], reply, 1.0)
+    expected = rl_state(analyzer)
+    directory = str(tmp_path / "feedback")
+    analyzer.attach_feedback_log(directory)
+    assert rl_state(analyzer) == expected
+    analyzer.close_feedback_log()
+    # 挂载时的状态作为日志的起点
+    restored = restore(path, directory)
+    assert rl_state(restored) == expected
+    restored.close_feedback_log()
@@ -0,0 +1,38 @@
+"""按块读取文本文件：块在句子边界切开，拼接后与原文相同"""
+
+from src.utils.file_utils import FileUtils
+
+CHINESE = ("人工智能是计算机科学的一个分支。它试图理解智能的实质！机器学习是实现人工智能的一种方法？"
+           "深度学习使用多层神经网络。") * 20
+
+
+def read_chunks(tmp_path, text, chunk_size):
+    path = tmp_path / "doc.txt"
+    path.write_text(text, encoding="utf-8")
+    return list(FileUtils.iter_text_chunks(str(path), chunk_size))
+
+
+def test_chinese_paragraph_splits_after_full_stop(tmp_path):
+    chunks = read_chunks(tmp_path, CHINESE, 50)
+    assert "".join(chunks) == CHINESE
+    assert len(chunks) > 1
+    assert all(chunk[-1] in "。！？" for chunk in chunks[:-1])
+
+
+def test_half_width_terminator_needs_whitespace(tmp_path):
+    text = "version 1.2.3 is out. " * 40
+    chunks = read_chunks(tmp_path, text, 64)
+    assert "".join(chunks) == text
+    # 不在 1.2.3 的小数点处切开
+    assert all(chunk.endswith("out.") for chunk in chunks[:-1])
+
+
+def test_falls_back_to_whitespace(tmp_path):
+    text = " ".join(f"w{i}" for i in range(500))
+    chunks = read_chunks(tmp_path, text, 64)
+    assert "".join(chunks) == text
+    assert all(chunk.endswith(" ") for chunk in chunks[:-1])
+
+
+def test_small_file_is_one_chunk(tmp_path):
+    assert read_chunks(tmp_path, "你好。世界", 1 << 20) == ["你好。世界"]
@@ -0,0 +1,61 @@
+"""增量加入、替换和删除文档后的模型与全量重建一致"""
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.data.synthetic import synthetic_corpus
+
+from helpers import assert_equivalent
+
+
+def build(texts, order=3, doc_ids=None):
+    analyzer = TextAnalyzer()
+    analyzer.ngram_order = order
+    analyzer.load_corpus(texts, doc_ids)
+    return analyzer
+
+
+@pytest.fixture
+def texts():
+    return synthetic_corpus(60, 40, 200)
+
+
+@pytest.mark.parametrize("order", [2, 3, 4])
+def test_add_documents_matches_rebuild(texts, order):
+    analyzer = build(texts[:50], order)
+    analyzer.add_documents(texts[50:])
+    assert_equivalent(analyzer, build(texts, order))
+
+
+def test_add_documents_with_new_words(texts):
+    extra = ["新词 甲 乙 w0 w1", "甲 乙 丙 w2"]
+    analyzer = build(texts)
+    analyzer.add_documents(extra)
+    assert {"甲", "乙", "丙"} <= analyzer.vocabulary
+    assert_equivalent(analyzer, build(texts + extra))
+
+
+def test_remove_documents_matches_rebuild(texts):
+    analyzer = build(texts)
+    analyzer.remove_documents(range(0, len(texts), 3))
+    assert_equivalent(analyzer, build([t for i, t in enumerate(texts) if i % 3]))
+
+
+def test_add_existing_id_replaces_document(texts):
+    analyzer = build(texts)
+    analyzer.add_documents([texts[0] + " w5 w6"], doc_ids=[3])
+    expected = texts[:3] + [texts[0] + " w5 w6"] + texts[4:]
+    assert_equivalent(analyzer, build(expected))
+
+
+def test_remove_then_add_back(texts):
+    analyzer = build(texts)
+    analyzer.remove_documents(range(10))
+    analyzer.add_documents(texts[:10], doc_ids=range(10))
+    assert_equivalent(analyzer, build(texts))
+
+
+def test_unknown_ids_are_ignored(texts):
+    analyzer = build(texts)
+    analyzer.remove_documents([1000, "missing"])
+    assert_equivalent(analyzer, build(texts))
@@ -0,0 +1,122 @@
+"""文档清单：重新加载文件夹时只处理变化的文档，结果与全量重建一致"""
+
+import os
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.data.manifest import DocumentManifest
+from src.data.synthetic import synthetic_corpus
+from src.utils.file_utils import FileUtils
+
+from helpers import assert_equivalent
+
+
+class Workspace:
+    """语料文件夹、快照和清单目录，reload 模拟图形界面重新启动后处理文档"""
+
+    def __init__(self, root):
+        self.folder = root / "docs"
+        self.folder.mkdir()
+        self.snapshot = str(root / "model.reko")
+        self.manifest_dir = str(root / "manifest")
+
+    def write(self, name, text):
+        (self.folder / name).write_text(text, encoding="utf-8")
+
+    def paths(self):
+        return sorted(FileUtils.find_text_files(str(self.folder)))
+
+    def reload(self):
+        analyzer = TextAnalyzer()
+        if os.path.exists(self.snapshot):
+            analyzer.load(self.snapshot)
+        manifest = DocumentManifest(self.manifest_dir, analyzer.tokenizer.name)
+        manifest.load()
+        stats = manifest.sync(analyzer, self.paths(), chunk_size=64)
+        if stats['model_changed']:
+            analyzer.save(self.snapshot)
+        return analyzer, stats
+
+    def rebuild(self):
+        analyzer = TextAnalyzer()
+        analyzer.load_stream(FileUtils.iter_documents(self.paths()))
+        return analyzer
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    workspace = Workspace(tmp_path)
+    for i, text in enumerate(synthetic_corpus(30, 60, 300)):
+        workspace.write(f"{i:03d}.txt", text)
+    analyzer, stats = workspace.reload()
+    assert not stats['incremental'] and stats['model_changed']
+    return workspace
+
+
+def test_unchanged_reload_touches_nothing(workspace):
+    snapshot_mtime = os.stat(workspace.snapshot).st_mtime_ns
+    manifest_mtime = os.stat(os.path.join(workspace.manifest_dir, "manifest.json")).st_mtime_ns
+    analyzer, stats = workspace.reload()
+    assert stats['incremental'] and not stats['model_changed']
+    assert stats['unchanged'] == 30
+    assert os.stat(workspace.snapshot).st_mtime_ns == snapshot_mtime
+    assert os.stat(os.path.join(workspace.manifest_dir, "manifest.json")).st_mtime_ns == manifest_mtime
+    assert_equivalent(analyzer, workspace.rebuild())
+
+
+def test_touched_file_is_hashed_once(workspace):
+    path = workspace.paths()[1]
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    snapshot_mtime = os.stat(workspace.snapshot).st_mtime_ns
+    _, stats = workspace.reload()
+    assert stats['touched'] == 1 and not stats['model_changed']
+    assert os.stat(workspace.snapshot).st_mtime_ns == snapshot_mtime
+    # 新的修改时间已记入清单，且清单标识仍与快照一致
+    _, stats = workspace.reload()
+    assert stats['incremental'] and stats['touched'] == 0
+
+
+@pytest.mark.parametrize("change", ["modify", "delete", "add", "all"])
+def test_incremental_reload_matches_rebuild(workspace, change):
+    paths = workspace.paths()
+    if change in ("modify", "all"):
+        with open(paths[0], "a", encoding="utf-8") as f:
+            f.write(" w1 w2 w3 新词")
+    if change in ("delete", "all"):
+        os.remove(paths[2])
+    if change in ("add", "all"):
+        workspace.write("new.txt", "新词 w1 w2 w3 w4")
+    analyzer, stats = workspace.reload()
+    assert stats['incremental'] and stats['model_changed']
+    assert (stats['changed'], stats['removed'], stats['added']) == (
+        int(change in ("modify", "all")), int(change in ("delete", "all")), int(change in ("add", "all")))
+    assert_equivalent(analyzer, workspace.rebuild())
+    # 保存后的快照与清单一致，再次加载时没有需要处理的文档
+    _, stats = workspace.reload()
+    assert stats['incremental'] and not stats['model_changed']
+
+
+def test_manifest_id_mismatch_rebuilds(workspace):
+    # 模拟保存清单之后、保存快照之前进程中断
+    analyzer = TextAnalyzer()
+    analyzer.load(workspace.snapshot)
+    manifest = DocumentManifest(workspace.manifest_dir, analyzer.tokenizer.name)
+    manifest.load()
+    manifest.save()
+    workspace.write("new.txt", "w1 w2 w3")
+    analyzer, stats = workspace.reload()
+    assert not stats['incremental']
+    assert_equivalent(analyzer, workspace.rebuild())
+
+
+def test_missing_token_record_rebuilds(workspace):
+    manifest = DocumentManifest(workspace.manifest_dir, "whitespace")
+    manifest.load()
+    path = workspace.paths()[0]
+    manifest.tokens.discard(manifest.documents[path][2])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(" w9")
+    analyzer, stats = workspace.reload()
+    assert not stats['incremental']
+    assert_equivalent(analyzer, workspace.rebuild())
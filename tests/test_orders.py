@@ -0,0 +1,74 @@
+"""任意阶数的n-gram存储：各阶计数与按词元组计数的字典一致，预测从最长的上下文逐级回退"""
+
+from collections import Counter, defaultdict
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.data.synthetic import synthetic_corpus
+from src.utils.config import get_config, set_config
+
+from helpers import decode_ngrams
+
+
+def reference_counts(texts, order):
+    """每一阶各用一个以词元组为键的 dict-of-Counter"""
+    tables = {n: defaultdict(Counter) for n in range(2, order + 1)}
+    for text in texts:
+        words = text.split()
+        for n in range(2, order + 1):
+            for i in range(len(words) - n + 1):
+                tables[n][tuple(words[i:i + n - 1])][words[i + n - 1]] += 1
+    return tables
+
+
+@pytest.fixture
+def texts():
+    return synthetic_corpus(30, 40, 60)
+
+
+@pytest.fixture
+def ngram_order():
+    saved = get_config("analysis.ngram_order")
+    yield lambda order: set_config("analysis.ngram_order", order)
+    set_config("analysis.ngram_order", saved)
+
+
+@pytest.mark.parametrize("order", [2, 3, 4, 5, 6])
+def test_counts_match_reference(texts, ngram_order, order):
+    ngram_order(order)
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    assert analyzer.get_stats()['ngram_order'] == order
+    counts = decode_ngrams(analyzer.store)
+    assert counts[1] == Counter((w,) for text in texts for w in text.split())
+    for n, table in reference_counts(texts, order).items():
+        assert counts[n] == {ctx + (w,): c for ctx, nexts in table.items() for w, c in nexts.items()}
+
+
+@pytest.mark.parametrize("order", [2, 4, 6])
+def test_prediction_backs_off_from_longest_context(texts, ngram_order, order):
+    ngram_order(order)
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    tables = reference_counts(texts, order)
+    words = texts[0].split()
+    # 开头是未出现过的词或拼接出的新组合时，最长的上下文不存在，只能回退
+    contexts = [words[i:i + 7] for i in range(0, 30, 3)] + [["未登录"] + words[:3], words[-5:] + words[:1]]
+    for context in contexts:
+        got = analyzer.predict_next(" ".join(context))
+        for n in range(order, 1, -1):
+            successors = tables[n].get(tuple(context[len(context) - n + 1:]))
+            if successors:
+                break
+        assert successors, context
+        # 计数相同的候选词之间顺序依赖词ID分配，只比较计数序列
+        assert [successors[w] for w in got] == sorted(successors.values(), reverse=True)[:analyzer.top_k], context
+
+
+def test_unknown_last_word_falls_back_to_frequent_words(texts):
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(texts)
+    frequency = Counter(w for text in texts for w in text.split())
+    got = analyzer.predict_next(texts[0].split()[0] + " 未登录")
+    assert [frequency[w] for w in got] == sorted(frequency.values(), reverse=True)[:analyzer.top_k]
@@ -0,0 +1,27 @@
+"""多进程分片构建：结果与单进程构建逐位一致"""
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.data.synthetic import synthetic_corpus
+
+from helpers import assert_identical
+
+
+def build(texts, order, workers):
+    analyzer = TextAnalyzer()
+    analyzer.ngram_order = order
+    analyzer.build_workers = workers
+    analyzer.load_corpus(texts)
+    return analyzer
+
+
+@pytest.mark.parametrize("order", [2, 3, 4])
+def test_parallel_build_matches_serial(order):
+    texts = synthetic_corpus(60, 40, 200)
+    assert_identical(build(texts, order, 3).store, build(texts, order, 1).store)
+
+
+def test_more_workers_than_documents():
+    texts = synthetic_corpus(3, 40, 50) + [""]
+    assert_identical(build(texts, 3, 8).store, build(texts, 3, 1).store)
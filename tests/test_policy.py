@@ -0,0 +1,76 @@
+"""动作选择：选择频率服从 ε-贪心与按Q值加权的理论分布，数组版本与逐个计算逐位一致"""
+
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.core import analyzer as analyzer_module
+from src.core.analyzer import TextAnalyzer, _choose_one
+from src.data.synthetic import synthetic_corpus
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(synthetic_corpus(40, 40, 300))
+    # 固定探索率，使每次选择服从同一个分布
+    analyzer.epsilon_decay = 1.0
+    return analyzer
+
+
+def scenario(analyzer, size, seed=17):
+    """size 个候选词，其中一半带有历史奖励、一半带有动作计数"""
+    rng = random.Random(seed)
+    state = " ".join(analyzer.store.vocab.words[:2])
+    actions = analyzer.predict_next(state)
+    actions += rng.sample([w for w in analyzer.store.vocab.words if w not in actions], size - len(actions))
+    session = analyzer.new_session()
+    session.epsilon = 0.2
+    rewards = {act: rng.choice([0.0, 0.5, 1.5]) for act in rng.sample(actions, size // 2)}
+    analyzer.rewards.add_many((analyzer._keys.key(state, act, add=True), value) for act, value in rewards.items())
+    analyzer.rewards.version += 1
+    counts = {act: rng.randrange(1, 5) for act in rng.sample(actions, size // 2)}
+    for act, count in counts.items():
+        session.count_action(state, act, count)
+
+    values = analyzer._score(analyzer.model, state, actions).tolist()
+    action_values = [v * (1 + analyzer.rewards.get(analyzer._keys.key(state, a), 0)) for v, a in zip(values, actions)]
+    counts = [counts.get(a, 0) + 1 for a in actions]
+    return state, actions, session, action_values, counts
+
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_selection_frequencies_match_distribution(analyzer, size):
+    state, actions, session, action_values, counts = scenario(analyzer, size)
+    q_values = [v + 0.1 / c for v, c in zip(action_values, counts)]
+    exact = [session.epsilon / size + (1 - session.epsilon) * q / sum(q_values) for q in q_values]
+    draws = 20000
+    rng = random.Random(2)
+    frequencies = Counter(analyzer._select(analyzer.model, session, state, actions, rng)[0] for _ in range(draws))
+    # 经验分布与理论分布的总变差距离，抽样误差的期望不超过 sqrt(k / (2πN))
+    distance = sum(abs(frequencies[a] / draws - p) for a, p in zip(actions, exact)) / 2
+    assert distance < 2 * np.sqrt(size / (2 * np.pi * draws))
+
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_selection_matches_scalar_chooser(analyzer, size, monkeypatch):
+    state, actions, session, action_values, counts = scenario(analyzer, size)
+    q_values = [v + 0.1 / c for v, c in zip(action_values, counts)]
+    chosen = []
+    for seed in range(200):
+        action, prob = analyzer._select(analyzer.model, session, state, actions, random.Random(seed))
+        draw = random.Random(seed)
+        col, expected_prob, exploited = _choose_one(action_values, counts, session.epsilon, draw.random(), draw.random())
+        assert (action, prob) == (actions[col], expected_prob)
+        if exploited:
+            # 利用时返回的概率就是该动作的Q值权重
+            assert abs(prob - q_values[col] / sum(q_values)) < 1e-12
+        chosen.append((action, prob))
+
+    # 强制逐个计算，与数组版本的选择和概率逐位一致
+    monkeypatch.setattr(analyzer_module, "_VECTOR_MIN_ACTIONS", size)
+    analyzer.cache.clear()
+    assert [analyzer._select(analyzer.model, session, state, actions, random.Random(seed))
+            for seed in range(200)] == chosen
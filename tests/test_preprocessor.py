@@ -0,0 +1,82 @@
+"""融合的单遍清洗/标准化与逐步执行的正则替换结果一致，多进程批量预处理与单进程结果一致，损坏的jieba词典缓存会重新构建"""
+
+import pickle
+import random
+import types
+
+import pytest
+
+from src.data.preprocessor import TextPreprocessor, load_jieba_dictionary
+
+from helpers import sample_documents
+
+# 随机拼接这些片段得到的噪声文本覆盖HTML标签、URL、邮箱、全角/半角标点和各种空白
+PIECES = ["人工智能", "Deep", "learning", "<b>", "</b>", "<a href='x'>", "http://example.com/a?b=1",
+          "https://t.cn/x", "user@mail.com", "a@b", "，", ",", "。", ".", "...", "！", "!!", "？", "?",
+          "；", "：", "\"", "'", "（", "）", "《", "》", "【", "】", "、", "\t", "\n", "\u3000", "\xa0",
+          " ", "  ", "😀", "#", "$", "%", "<", ">", "http", "@", "ĞÜŞ", "ΑΒΓ", "123", "中文"]
+
+
+def noisy_documents(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(PIECES) for _ in range(rng.randint(1, 400))) for _ in range(count)]
+
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    return TextPreprocessor()
+
+
+@pytest.mark.parametrize("text", sample_documents() + noisy_documents(300) + ["", " ", "\n\n"])
+def test_fused_matches_stepwise(preprocessor, text):
+    assert preprocessor.clean_text_fused(text) == preprocessor.clean_text(text)
+    assert preprocessor.normalize_text_fused(text) == preprocessor.normalize_text(text)
+    assert preprocessor.normalize_text_fused(text, False) == preprocessor.normalize_text(text, False)
+    cleaned = preprocessor.clean_text(text)
+    assert preprocessor.normalize_text_fused(cleaned) == preprocessor.normalize_text(cleaned)
+
+
+def test_parallel_batch_matches_serial(preprocessor, caplog):
+    texts = sample_documents() + noisy_documents(20)
+    serial = preprocessor.preprocess_batch(texts, workers=1)
+    assert preprocessor.preprocess_batch(texts, workers=2, chunksize=4) == serial
+    assert "并行预处理失败" not in caplog.text
+
+
+@pytest.fixture
+def small_jieba(tmp_path):
+    """只含几个词的jieba分词器，重新构建词典很快"""
+    import jieba
+    dictionary = tmp_path / "dict.txt"
+    dictionary.write_text("人工智能 10 n\n人工 5 n\n智能 5 n\n", encoding="utf-8")
+    return types.SimpleNamespace(dt=jieba.Tokenizer(str(dictionary)), __version__=jieba.__version__,
+                                 __file__=jieba.__file__, DEFAULT_DICT_NAME=jieba.DEFAULT_DICT_NAME)
+
+
+@pytest.mark.parametrize("content", [
+    b"not a pickle",
+    pickle.dumps(("signature", {}, 0))[:-3],
+    pickle.dumps([1, 2]),
+    pickle.dumps(None),
+])
+def test_invalid_dictionary_cache_is_rebuilt(tmp_path, small_jieba, content):
+    cache_path = tmp_path / "jieba_dict.pkl"
+    cache_path.write_bytes(content)
+    assert not load_jieba_dictionary(small_jieba, str(cache_path))
+    assert small_jieba.dt.FREQ["人工智能"] == 10 and small_jieba.dt.total == 20
+
+    small_jieba.dt.initialized = False
+    assert load_jieba_dictionary(small_jieba, str(cache_path))
+
+
+def test_cache_with_wrong_types_is_rebuilt(tmp_path, small_jieba):
+    cache_path = str(tmp_path / "jieba_dict.pkl")
+    load_jieba_dictionary(small_jieba, cache_path)
+    with open(cache_path, "rb") as f:
+        signature, freq, total = pickle.load(f)
+    for bad in ((signature, list(freq), total), (signature, freq, "20"), (signature, freq, True)):
+        with open(cache_path, "wb") as f:
+            pickle.dump(bad, f)
+        small_jieba.dt.initialized = False
+        assert not load_jieba_dictionary(small_jieba, cache_path)
+        assert small_jieba.dt.FREQ == freq and small_jieba.dt.total == total
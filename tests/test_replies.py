@@ -0,0 +1,65 @@
+"""批量生成回复：固定随机种子时与逐条生成的回复相同"""
+
+import copy
+import random
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.data.synthetic import synthetic_corpus
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return synthetic_corpus(40, 40, 120)
+
+
+@pytest.fixture(scope="module")
+def queries(texts):
+    rng = random.Random(5)
+    queries = [" ".join(rng.choice(texts).split()[:rng.choice([0, 1, 2, 3])]) for _ in range(60)]
+    # 含未登录词和超过最大长度的查询
+    queries[:3] = ["未登录词", "未登录词 " + queries[3], " ".join(texts[0].split()[:25])]
+    return queries
+
+
+def warmed_up(texts, queries, order, smoothing):
+    analyzer = TextAnalyzer()
+    analyzer.ngram_order = order
+    analyzer.smoothing = smoothing
+    analyzer.load_corpus(texts)
+    # 先在会话中积累一些动作计数和奖励，使多样性奖励和历史奖励都参与计算
+    random.seed(1)
+    for query in queries[:20]:
+        reply = analyzer.generate_reply(query)
+        analyzer.update_reward(query, reply, random.choice([1.0, -1.0, 0.5]))
+    analyzer.epsilon = 0.3
+    return analyzer
+
+
+@pytest.mark.parametrize("order, smoothing", [(3, "kneser_ney"), (3, "add_alpha"), (3, "none"),
+                                              (4, "kneser_ney"), (2, "kneser_ney")])
+def test_batch_matches_single(texts, queries, order, smoothing):
+    analyzer = warmed_up(texts, queries, order, smoothing)
+    base = copy.deepcopy(analyzer.session)
+    # 校验同步推进的批量路径本身，不按批大小退回逐条生成
+    analyzer.batch_reply_min_size = 0
+    seeds = list(range(len(queries)))
+    batch = analyzer.generate_replies(queries, session=copy.deepcopy(base), seeds=seeds)
+    single = [analyzer.generate_reply(query, session=copy.deepcopy(base), rng=random.Random(seed))
+              for query, seed in zip(queries, seeds)]
+    assert batch == single
+
+
+def test_small_batch_generates_one_by_one(texts, queries):
+    analyzer = warmed_up(texts, queries, 3, "kneser_ney")
+    analyzer.batch_reply_min_size = len(queries) + 1
+    seeds = list(range(len(queries)))
+    session = copy.deepcopy(analyzer.session)
+    expected = [analyzer.generate_reply(query, session=session, rng=random.Random(seed))
+                for query, seed in zip(queries, seeds)]
+    batch_session = copy.deepcopy(analyzer.session)
+    # 逐条生成时后面的回复能看到前面回复对会话的更新
+    assert analyzer.generate_replies(queries, session=batch_session, seeds=seeds) == expected
+    assert batch_session.reply_history == session.reply_history
+    assert batch_session.epsilon == session.epsilon
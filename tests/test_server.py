@@ -0,0 +1,105 @@
+"""推理服务：请求体字段类型校验，同一批中某一项出错时不影响其他请求，以及关闭时不阻塞事件循环"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.server import InferenceServer
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = TextAnalyzer()
+    analyzer.load_corpus(["今天 天气 很 好 。", "今天 心情 很 好 。"])
+    return analyzer
+
+
+def serve(analyzer, scenario):
+    """在新的事件循环中启动各端点的批处理任务（不监听端口），运行 scenario(server) 并返回其结果"""
+    async def main():
+        server = InferenceServer(analyzer, max_delay=0.05)
+        tasks = [asyncio.create_task(batcher.run()) for batcher in server.batchers.values()]
+        try:
+            return await asyncio.wait_for(scenario(server), 10)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            server.executor.shutdown(wait=True)
+    return asyncio.run(main())
+
+
+def post_all(server, *requests):
+    """在同一个批处理窗口内并发发出请求，返回 [(状态码, 响应), ...]"""
+    return asyncio.gather(*(server._dispatch("POST", path, body.encode()) for path, body in requests))
+
+
+@pytest.mark.parametrize("path,body", [
+    ("/feedback", '{"reply_id": "abc", "reward": 1}'),
+    ("/feedback", '{"reply_id": 0, "reward": "1"}'),
+    ("/feedback", '{"reply_id": 0, "reward": true}'),
+    ("/reply", '{"query": "x", "max_len": "5"}'),
+    ("/reply", '{"query": 1}'),
+    ("/predict", '{"context": ["x"]}'),
+])
+def test_bad_field_types_are_rejected(analyzer, path, body):
+    [(status, payload)] = serve(analyzer, lambda server: post_all(server, (path, body)))
+    assert status == 400 and 'error' in payload
+
+
+def test_failed_item_does_not_fail_batch(analyzer, monkeypatch):
+    reply = analyzer.generate_reply
+
+    def flaky(query, **kwargs):
+        if query == "坏":
+            raise RuntimeError("失败")
+        return reply(query, **kwargs)
+
+    monkeypatch.setattr(analyzer, "generate_reply", flaky)
+
+    async def scenario(server):
+        results = await post_all(server, ("/reply", '{"query": "今天"}'), ("/reply", '{"query": "坏"}'))
+        return results, server.batchers['reply'].batches
+
+    results, batches = serve(analyzer, scenario)
+    assert [status for status, _ in results] == [200, 500]
+    assert batches == 1
+
+
+def test_feedback_batch_reports_each_item(analyzer):
+    async def scenario(server):
+        [(_, payload)] = await post_all(server, ("/reply", '{"query": "今天"}'))
+        body = f'{{"reply_id": {payload["reply_id"]}, "reward": 1}}'
+        results = await post_all(server, ("/feedback", body), ("/feedback", '{"reply_id": 999999, "reward": 1}'))
+        return results, server.batchers['feedback'].batches
+
+    results, batches = serve(analyzer, scenario)
+    assert results == [(200, {'ok': True}), (200, {'ok': False})]
+    assert batches == 1
+
+
+def test_close_waits_for_tasks_without_blocking_loop(analyzer):
+    async def main():
+        server = InferenceServer(analyzer)
+        await server.start(0)
+        # 工作线程正在处理一批耗时的请求时关闭服务
+        server.executor.submit(time.sleep, 0.3)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        await server.close()
+        ticking.cancel()
+        assert all(task.done() for task in server._tasks)
+        with pytest.raises(RuntimeError):
+            server.executor.submit(time.sleep, 0)
+        return ticks
+
+    assert asyncio.run(main()) >= 10
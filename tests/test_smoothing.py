@@ -0,0 +1,64 @@
+"""平滑打分：概率在整个词表上归一，逐词、整组和批量打分的结果一致"""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.core.smoothing import SMOOTHING_METHODS, build_scorer
+from src.data.synthetic import synthetic_corpus
+
+ORDER = 4
+
+
+@pytest.fixture(scope="module")
+def store():
+    analyzer = TextAnalyzer()
+    analyzer.ngram_order = ORDER
+    analyzer.load_corpus(synthetic_corpus(40, 40, 120))
+    return analyzer.store
+
+
+@pytest.fixture(scope="module")
+def contexts(store):
+    rng = random.Random(5)
+    words = store.vocab.encode(" ".join(synthetic_corpus(5, 40, 120)).split()).tolist()
+    contexts = []
+    for _ in range(30):
+        i = rng.randrange(len(words) - ORDER)
+        contexts.append(words[i:i + rng.randint(0, ORDER - 1)])
+    # 未出现过的上下文
+    last = len(store.vocab) - 1
+    return contexts + [[last, last, last]]
+
+
+@pytest.mark.parametrize("method", ["add_alpha", "kneser_ney"])
+def test_probabilities_sum_to_one(store, contexts, method):
+    scorer = build_scorer(store, method)
+    all_ids = np.arange(len(store.vocab))
+    for context in contexts:
+        assert abs(scorer.score(context, all_ids).sum() - 1.0) < 1e-9, context
+
+
+@pytest.mark.parametrize("method", SMOOTHING_METHODS)
+def test_batched_scores_match_looped(store, contexts, method):
+    scorer = build_scorer(store, method)
+    rng = random.Random(6)
+    candidates = np.array([rng.sample(range(len(store.vocab)), 20) for _ in contexts])
+    looped = np.array([[scorer.score(context, [w])[0] for w in cands] for context, cands in zip(contexts, candidates)])
+    batched = np.array([scorer.score(context, cands) for context, cands in zip(contexts, candidates)])
+    assert np.allclose(looped, batched)
+
+    # 多个上下文一次打分，不足 order-1 个词时左侧以-1填充
+    padded = np.full((len(contexts), ORDER - 1), -1, dtype=np.int64)
+    for i, context in enumerate(contexts):
+        if context:
+            padded[i, -len(context):] = context
+    lengths = np.array([len(context) for context in contexts])
+    assert np.allclose(scorer.score_rows(store.context_rows(padded), lengths, candidates), batched)
+
+
+def test_unknown_method_is_rejected(store):
+    with pytest.raises(ValueError):
+        build_scorer(store, "good_turing")
@@ -0,0 +1,83 @@
+"""模型快照：保存后加载的模型与原模型一致，以及是否有未保存的变化"""
+
+import gc
+import os
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.data.synthetic import synthetic_corpus
+
+from helpers import assert_identical
+
+
+@pytest.fixture
+def texts():
+    return synthetic_corpus(40, 50, 300)
+
+
+def is_mapped(path):
+    # 文件被替换后，仍在映射的旧文件显示为 "路径 (deleted)"
+    with open("/proc/self/maps") as f:
+        return any(path in line for line in f)
+
+
+@pytest.mark.parametrize("with_corpus", [True, False])
+def test_round_trip_matches_built_model(tmp_path, texts, with_corpus):
+    path = str(tmp_path / "model.reko")
+    builder = TextAnalyzer()
+    builder.load_corpus(texts, doc_ids=[f"{i}.txt" for i in range(len(texts))])
+    reply = builder.generate_reply(texts[0].split()[0])
+    builder.update_reward(texts[0].split()[0], reply, 1.0)
+    builder.save(path)
+
+    loaded = TextAnalyzer()
+    loaded.load(path, with_corpus=with_corpus)
+    assert_identical(loaded.store, builder.store)
+    stats = builder.get_stats()
+    # 缓存命中率随使用情况变化，不属于模型
+    stats['cache_hit_rate'] = 0.0
+    assert loaded.get_stats() == stats
+    assert loaded.rewards.items() == builder.rewards.items()
+    assert loaded.corpus == (builder.corpus if with_corpus else {})
+    context = " ".join(texts[1].split()[:2])
+    assert loaded.predict_next(context) == builder.predict_next(context)
+
+
+def test_unsaved_changes_tracking(tmp_path, texts):
+    path = str(tmp_path / "model.reko")
+    analyzer = TextAnalyzer()
+    assert not analyzer.has_unsaved_changes
+    analyzer.load_corpus(texts)
+    assert analyzer.has_unsaved_changes
+    analyzer.save(path)
+    assert not analyzer.has_unsaved_changes
+
+    loaded = TextAnalyzer()
+    loaded.load(path)
+    assert not loaded.has_unsaved_changes
+    # 没有反馈日志时奖励只保存在快照中
+    reply = loaded.generate_reply(texts[0].split()[0])
+    loaded.update_reward(texts[0].split()[0], reply, 1.0)
+    assert loaded.has_unsaved_changes
+    loaded.save(path)
+    loaded.add_documents(texts[:1])
+    assert loaded.has_unsaved_changes
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="需要 /proc/self/maps")
+def test_save_releases_snapshot_mapping(tmp_path, texts):
+    path = str(tmp_path / "model.reko")
+    builder = TextAnalyzer()
+    builder.load_corpus(texts)
+    builder.save(path)
+
+    analyzer = TextAnalyzer()
+    analyzer.load(path)
+    assert is_mapped(path)
+    before = analyzer.predict_next(texts[0].split()[0])
+    analyzer.save(path)
+    gc.collect()
+    assert not is_mapped(path)
+    assert analyzer.predict_next(texts[0].split()[0]) == before
+    assert_identical(analyzer.store, builder.store)
@@ -0,0 +1,57 @@
+"""流式构建（按块读取、分批统计后归并）与一次性读入构建的模型逐位一致"""
+
+import pytest
+
+from src.core.analyzer import TextAnalyzer
+from src.data.synthetic import synthetic_corpus
+from src.utils.file_utils import FileUtils
+
+from helpers import assert_identical
+
+
+@pytest.fixture
+def paths(tmp_path):
+    texts = synthetic_corpus(30, 50, 300)
+    # 远大于块大小的文件，检验跨块n-gram不丢失
+    texts.append(" ".join(texts[:20]))
+    texts.append("")
+    paths = []
+    for i, text in enumerate(texts):
+        path = tmp_path / f"{i:03d}.txt"
+        path.write_text(text, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def read_all(paths, order=3):
+    analyzer = TextAnalyzer()
+    analyzer.ngram_order = order
+    analyzer.load_corpus([FileUtils.read_text_file(path) for path in paths], doc_ids=paths)
+    return analyzer
+
+
+@pytest.mark.parametrize("order", [2, 3, 4])
+@pytest.mark.parametrize("chunk_size,batch_tokens", [(64, 50), (1000, 300), (1 << 20, 1000000)])
+def test_load_stream_matches_full_read(paths, order, chunk_size, batch_tokens):
+    analyzer = TextAnalyzer()
+    analyzer.ngram_order = order
+    analyzer.stream_batch_tokens = batch_tokens
+    analyzer.load_stream(FileUtils.iter_documents(paths, chunk_size))
+    assert_identical(analyzer.store, read_all(paths, order).store)
+
+
+def test_add_stream_matches_full_read(paths):
+    analyzer = TextAnalyzer()
+    analyzer.stream_batch_tokens = 100
+    analyzer.load_stream(FileUtils.iter_documents(paths[:10], 64))
+    analyzer.add_stream(FileUtils.iter_documents(paths[10:], 64))
+    assert_identical(analyzer.store, read_all(paths).store)
+
+
+def test_streamed_documents_keep_no_text(paths):
+    analyzer = TextAnalyzer()
+    analyzer.load_stream(FileUtils.iter_documents(paths, 64))
+    assert set(analyzer.corpus) == set(paths[:-1])
+    assert all(text is None for text in analyzer.corpus.values())
+    with pytest.raises(ValueError):
+        analyzer.remove_documents(paths[:1])
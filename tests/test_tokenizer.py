@@ -0,0 +1,73 @@
+"""分词缓存：目录在首次写入时创建，相对路径按项目根目录解析，命中缓存时构建的模型与不使用缓存时逐位一致"""
+
+import os
+
+from src.core.analyzer import TextAnalyzer
+from src.core.evaluation import _batches
+from src.data.tokenizer import JiebaTokenizer, TokenCache, get_tokenizer
+from src.utils.config import get_config_manager, set_config
+
+from helpers import assert_identical, sample_documents
+
+
+def test_cache_directory_created_on_first_store(tmp_path):
+    directory = tmp_path / "tokens"
+    cache = TokenCache(str(directory), "jieba")
+    assert cache.get("你好") is None
+    assert not directory.exists()
+    cache.put("你好", ["你好"])
+    assert cache.get("你好") == ["你好"]
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_cache_round_trips_empty_document(tmp_path):
+    cache = TokenCache(str(tmp_path), "jieba")
+    cache.put("", [])
+    assert cache.get("") == []
+
+
+def test_relative_cache_path_resolves_against_project_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    set_config("paths.cache", "models/cache")
+    tokenizer = get_tokenizer("jieba")
+    root = get_config_manager().project_root
+    assert tokenizer.cache.directory == os.path.join(root, "models", "cache", "tokens")
+    assert not os.listdir(tmp_path)
+
+
+def test_evaluation_batches_count_tokens_not_spaces():
+    # jieba分词的中文文本不含空格，分批必须按词列表的长度计算
+    docs = [["人工", "智能", "是", "什么"]] * 5
+    assert [len(batch) for batch in _batches(iter(docs), 8)] == [2, 2, 1]
+
+
+def test_cached_tokens_build_identical_model(tmp_path):
+    set_config("analysis.tokenizer", "jieba")
+    texts = sample_documents()
+    stores = []
+    for tokenizer in (JiebaTokenizer(), JiebaTokenizer(str(tmp_path)), JiebaTokenizer(str(tmp_path))):
+        analyzer = TextAnalyzer()
+        analyzer.tokenizer = tokenizer
+        analyzer.load_corpus(texts)
+        stores.append(analyzer.store)
+    # 第二次写入缓存，第三次全部命中
+    assert tokenizer.cache.hits == len(texts)
+    for store in stores[1:]:
+        assert_identical(store, stores[0])
+
+
+def test_parallel_build_tokenizes_in_workers():
+    set_config("analysis.token_cache", False)
+    set_config("analysis.tokenizer", "jieba")
+    texts = sample_documents()
+    serial = TextAnalyzer()
+    serial.load_corpus(texts)
+
+    set_config("analysis.token_cache", True)
+    parallel = TextAnalyzer()
+    parallel.build_workers = 2
+    parallel.load_corpus(texts)
+    assert_identical(parallel.store, serial.store)
+    # 子进程写入的分词缓存可供之后的构建使用
+    cache = TokenCache(parallel.tokenizer.cache_dir, "jieba")
+    assert all(cache.get(text) is not None for text in texts)